@@ -0,0 +1,227 @@
+# aggregate.py
+
+"""Materialisierte Aggregattabellen über ``belegungsplan``/``verfugbarkeit``.
+
+* ``agg_minuten``: belegte und verfügbare Minuten pro (Segment, Wochentag,
+  Stunde). Überlappende Belegungen zählen einmal, wie in ``belegungsbitmap``.
+  Einrichtung, Stadtteil, Tag und Stunde sind daraus einfache Gruppierungen
+  über höchstens Segmente × 168 Zeilen.
+* ``agg_muster``: Anzahl Belegungen pro (Segment, Wochentag, Startminute,
+  Dauer, Bereich, Tätigkeit) – die gewichteten Nutzungsmuster für die
+  Clusterseiten und die Minuten nach Bereich/Tätigkeit.
+
+Der Importer hält beide Tabellen inkrementell aktuell: Nach einem Upsert
+werden nur die Segmente neu berechnet, deren Zeilen sich geändert haben
+(``python importer.py aggregate`` baut alles neu). Die Seiten lesen nur
+noch diese Tabellen; ihre Laufzeit hängt nicht mehr an der Anzahl der
+Rohbelegungen.
+"""
+
+import mysql.connector
+import numpy as np
+import pandas as pd
+
+import datenzugriff
+import raeumliche_zuordnung
+from belegungsbitmap import minuten_pro_slot
+from db import db_connection, db_cursor
+
+QUELLTABELLEN = ("belegungsplan", "verfugbarkeit")
+
+AGGREGAT_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS agg_minuten (
+        segment_id INT NOT NULL,
+        tag TINYINT NOT NULL,
+        stunde TINYINT NOT NULL,
+        belegte_minuten SMALLINT NOT NULL,
+        verfuegbare_minuten SMALLINT NOT NULL,
+        PRIMARY KEY (segment_id, tag, stunde),
+        KEY idx_agg_minuten_tag (tag, segment_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS agg_muster (
+        segment_id INT NOT NULL,
+        tag TINYINT NOT NULL,
+        start_min SMALLINT NOT NULL,
+        dauer_min FLOAT NOT NULL,
+        bereich VARCHAR(255) NOT NULL DEFAULT '',
+        taetigkeit VARCHAR(255) NOT NULL DEFAULT '',
+        anzahl INT NOT NULL,
+        KEY idx_agg_muster_segment (segment_id)
+    )
+    """,
+]
+
+MUSTER_SPALTEN = ["segment_id", "tag", "start_min", "dauer_min", "bereich", "taetigkeit", "anzahl"]
+MINUTEN_SPALTEN = ["segment_id", "tag", "stunde", "belegte_minuten", "verfuegbare_minuten"]
+
+
+# 🧮 Berechnung (rein, ohne Datenbank)
+def berechne_minuten(segment_ids, belegungen, verfuegbarkeiten):
+    """Zeilen von ``agg_minuten`` für ``segment_ids`` (nur Stunden mit Belegung oder Verfügbarkeit)."""
+    segment_ids = np.asarray(segment_ids)
+    segment_pos = pd.Series(np.arange(len(segment_ids)), index=segment_ids)
+    belegt = minuten_pro_slot(belegungen, segment_pos, 60)
+    verfuegbar = minuten_pro_slot(verfuegbarkeiten, segment_pos, 60)
+
+    seg, tag, stunde = np.nonzero(belegt | verfuegbar)
+    return pd.DataFrame({
+        "segment_id": segment_ids[seg].astype(np.int32),
+        "tag": tag.astype(np.int8),
+        "stunde": stunde.astype(np.int8),
+        "belegte_minuten": belegt[seg, tag, stunde].astype(np.int16),
+        "verfuegbare_minuten": verfuegbar[seg, tag, stunde].astype(np.int16),
+    })
+
+
+def berechne_muster(belegungen):
+    """Zeilen von ``agg_muster``: gleiche Belegungsmuster eines Segments zusammengefasst."""
+    df = belegungen[belegungen["dauer_min"].notna()]
+    df = pd.DataFrame({
+        "segment_id": df["segment_id"].to_numpy(),
+        "tag": df["tag"].to_numpy(),
+        "start_min": df["start_min"].to_numpy(),
+        "dauer_min": df["dauer_min"].to_numpy(dtype=np.float32),
+        "bereich": df["bereich"].astype(object).fillna("").to_numpy(),
+        "taetigkeit": df["taetigkeit"].astype(object).fillna("").to_numpy(),
+    })
+    schluessel = MUSTER_SPALTEN[:-1]
+    return df.groupby(schluessel, sort=False).size().reset_index(name="anzahl")[MUSTER_SPALTEN]
+
+
+# 💾 Pflege durch den Importer
+def _zeilen(df):
+    return list(df.astype(object).itertuples(index=False, name=None))
+
+
+def _ersetzen(cursor, tabelle, spalten, df, segment_ids, batch_groesse=5000):
+    if segment_ids is None:
+        cursor.execute(f"DELETE FROM {tabelle}")
+    else:
+        for i in range(0, len(segment_ids), batch_groesse):
+            teil = segment_ids[i:i + batch_groesse]
+            cursor.execute(f"DELETE FROM {tabelle} WHERE segment_id IN ({', '.join(['%s'] * len(teil))})", teil)
+    query = f"INSERT INTO {tabelle} ({', '.join(spalten)}) VALUES ({', '.join(['%s'] * len(spalten))})"
+    zeilen = _zeilen(df[spalten])
+    for i in range(0, len(zeilen), batch_groesse):
+        cursor.executemany(query, zeilen[i:i + batch_groesse])
+
+
+def _vorhanden():
+    with db_cursor(dictionary=False) as cursor:
+        cursor.execute("SHOW TABLES LIKE 'agg_muster'")
+        return cursor.fetchone() is not None
+
+
+def aktualisieren(segment_ids=None):
+    """Berechnet die Aggregate für ``segment_ids`` (``None`` = alle) neu; liefert (Minuten-, Musterzeilen)."""
+    if segment_ids is not None and not _vorhanden():
+        segment_ids = None  # Erstbefüllung: inkrementell gäbe es nur die geänderten Segmente
+    if segment_ids is not None:
+        segment_ids = sorted({int(s) for s in segment_ids})
+        if not segment_ids:
+            return 0, 0
+        betroffen = segment_ids
+    else:
+        datenzugriff.invalidieren("segmente")
+        betroffen = datenzugriff.segmente()["id"].tolist()
+
+    belegungen = datenzugriff.lade_intervalle("belegungsplan", datenzugriff.BELEGUNG_ZUSATZSPALTEN, segment_ids)
+    verfuegbarkeiten = datenzugriff.lade_intervalle("verfugbarkeit", segment_ids=segment_ids)
+    minuten = berechne_minuten(betroffen, belegungen, verfuegbarkeiten)
+    muster = berechne_muster(belegungen)
+
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(datenzugriff.VERSIONSTABELLE_DDL)
+        for ddl in AGGREGAT_DDL:
+            cursor.execute(ddl)
+        conn.commit()
+        _ersetzen(cursor, "agg_minuten", MINUTEN_SPALTEN, minuten, segment_ids)
+        _ersetzen(cursor, "agg_muster", MUSTER_SPALTEN, muster, segment_ids)
+        datenzugriff.version_erhoehen(cursor, "agg_minuten", "agg_muster")
+        conn.commit()
+        cursor.close()
+    return len(minuten), len(muster)
+
+
+# 📖 Lesen (gecacht, mit Fallback auf die Rohdaten, solange die Tabellen fehlen)
+def _lade_minuten():
+    try:
+        return datenzugriff.lade_frame(
+            f"SELECT {', '.join(MINUTEN_SPALTEN)} FROM agg_minuten",
+            spaltentypen={"segment_id": "int32", "tag": "int8", "stunde": "int8",
+                          "belegte_minuten": "int16", "verfuegbare_minuten": "int16"},
+        )
+    except mysql.connector.Error:
+        return berechne_minuten(
+            datenzugriff.segmente()["id"].to_numpy(), datenzugriff.belegungen(), datenzugriff.verfuegbarkeiten()
+        )
+
+
+def _lade_muster():
+    try:
+        return datenzugriff.lade_frame(
+            f"SELECT {', '.join(MUSTER_SPALTEN)} FROM agg_muster",
+            spaltentypen={"segment_id": "int32", "tag": "int8", "start_min": "int16", "dauer_min": "float32",
+                          "bereich": "category", "taetigkeit": "category", "anzahl": "int32"},
+        )
+    except mysql.connector.Error:
+        df = berechne_muster(datenzugriff.belegungen())
+        return df.astype({"bereich": "category", "taetigkeit": "category"})
+
+
+def minuten():
+    """``agg_minuten`` als DataFrame (gecacht)."""
+    df = datenzugriff.cache.hole(
+        ("aggregat", "agg_minuten"),
+        datenzugriff.aus_schnappschuss("agg_minuten", _lade_minuten),
+        tabellen=("agg_minuten", *QUELLTABELLEN, "segmente"),
+    )
+    return df.copy(deep=False)
+
+
+def muster():
+    """``agg_muster`` als DataFrame (gecacht)."""
+    df = datenzugriff.cache.hole(
+        ("aggregat", "agg_muster"),
+        datenzugriff.aus_schnappschuss("agg_muster", _lade_muster),
+        tabellen=("agg_muster", "belegungsplan"),
+    )
+    return df.copy(deep=False)
+
+
+def _segment_zuordnung():
+    """``segment_id`` → ``einrichtung_id``, ``stadtteil_id`` (erste Adresse des Segments)."""
+    def laden():
+        orte = datenzugriff.segment_standorte().drop_duplicates("segment_id")
+        orte = orte[["segment_id", "einrichtung_id", "adressen_id"]]
+        return orte.merge(raeumliche_zuordnung.zuordnung(), on="adressen_id", how="left").drop(columns=["adressen_id"])
+
+    return datenzugriff.cache.hole(
+        ("aggregat", "segment_zuordnung"),
+        laden,
+        tabellen=("segmente", "adressen", "geodaten", "geodaten_stadtteil", "stadtteile2"),
+    )
+
+
+def minuten_pro(*ebenen):
+    """Belegte/verfügbare Minuten gruppiert nach ``ebenen`` (segment_id, einrichtung_id, stadtteil_id, tag, stunde)."""
+    if {"einrichtung_id", "stadtteil_id"} & set(ebenen):
+        df, zuordnung = datenzugriff.gleichzeitig(minuten, _segment_zuordnung)
+        df = df.merge(zuordnung, on="segment_id")
+    else:
+        df = minuten()
+    werte = ["belegte_minuten", "verfuegbare_minuten"]
+    return df.groupby(list(ebenen), as_index=False, observed=True)[werte].sum()
+
+
+def nutzungsminuten_pro(*ebenen):
+    """Gebuchte Minuten (Anzahl × Dauer) und Anzahl Belegungen gruppiert nach ``ebenen`` aus ``agg_muster``."""
+    df = muster()
+    if {"einrichtung_id", "stadtteil_id"} & set(ebenen):
+        df = df.merge(_segment_zuordnung(), on="segment_id")
+    df = df.assign(minuten=df["anzahl"] * df["dauer_min"].astype(np.float64))
+    return df.groupby(list(ebenen), as_index=False, observed=True)[["anzahl", "minuten"]].sum()
@@ -0,0 +1,212 @@
+# auslastung.py
+
+"""Auslastung (belegte / verfügbare Minuten) pro Einrichtung, Wochentag und Stunde.
+
+Gelesen wird aus der Aggregattabelle ``agg_minuten`` (siehe ``aggregate``);
+Wochentag- und Einrichtungsfilter gehen direkt in die SQL-Abfrage, ein
+einzelner Tag lädt also nur die Zeilen dieses Tages. Solange die Aggregate
+fehlen, werden die Intervalle aus ``belegungsplan``/``verfugbarkeit`` gelesen –
+ebenfalls gefiltert über den gespeicherten Schlüssel ``wochentag_int`` und
+den Join auf ``segmente``.
+
+In beiden Fällen entsteht in einem Durchlauf ein Array (Einrichtung × Tag ×
+Stunde); alle Sichten der Seite sind danach nur noch Summen über dessen
+Achsen. Überlappende Belegungen desselben Segments zählen wie in
+``belegungsbitmap`` nur einmal.
+"""
+
+import mysql.connector
+import numpy as np
+import pandas as pd
+
+import datenzugriff
+from belegungsbitmap import minuten_pro_slot
+
+STUNDEN = 24
+MAX_ERGEBNISSE = 32
+
+cache = datenzugriff.VersionierterCache(max_eintraege=MAX_ERGEBNISSE)
+
+
+def _filter(tag_ausdruck, tage, einrichtung_ids):
+    bedingungen, params = [], []
+    if tage is not None:
+        bedingungen.append(f"{tag_ausdruck} IN ({', '.join(['%s'] * len(tage))})")
+        params += tage
+    if einrichtung_ids is not None:
+        bedingungen.append(f"s.einrichtung_id IN ({', '.join(['%s'] * len(einrichtung_ids))})")
+        params += einrichtung_ids
+    return bedingungen, params
+
+
+def minuten_abfrage(tage=None, einrichtung_ids=None):
+    """SQL und Parameter für ``lade_minuten``."""
+    bedingungen, params = _filter("a.tag", tage, einrichtung_ids)
+    where = f"WHERE {' AND '.join(bedingungen)}" if bedingungen else ""
+    return f"""
+        SELECT a.segment_id, a.tag, a.stunde, a.belegte_minuten, a.verfuegbare_minuten
+        FROM agg_minuten a
+        JOIN segmente s ON s.id = a.segment_id
+        {where}
+    """, params
+
+
+def lade_minuten(tage=None, einrichtung_ids=None):
+    """Zeilen aus ``agg_minuten``, in SQL auf Tage und Einrichtungen gefiltert."""
+    query, params = minuten_abfrage(tage, einrichtung_ids)
+    return datenzugriff.lade_frame(query, params, spaltentypen={
+        "segment_id": "int32", "tag": "int8", "stunde": "int8",
+        "belegte_minuten": "int16", "verfuegbare_minuten": "int16",
+    })
+
+
+def intervall_abfrage(tabelle, tage=None, einrichtung_ids=None, tag_ausdruck="t.wochentag_int"):
+    """SQL und Parameter für ``lade_intervalle``."""
+    bedingungen, params = _filter(tag_ausdruck, tage, einrichtung_ids)
+    bedingungen = ["t.start IS NOT NULL", "t.ende IS NOT NULL", f"{tag_ausdruck} IS NOT NULL", *bedingungen]
+    return f"""
+        SELECT t.segment_id, {tag_ausdruck} AS tag,
+               TIME_TO_SEC(t.start) DIV 60 AS start_min,
+               TIME_TO_SEC(t.ende) DIV 60 AS ende_min
+        FROM {tabelle} t
+        JOIN segmente s ON s.id = t.segment_id
+        WHERE {" AND ".join(bedingungen)}
+    """, params
+
+
+def _lade_intervalle(tabelle, tage, einrichtung_ids, tag_ausdruck):
+    query, params = intervall_abfrage(tabelle, tage, einrichtung_ids, tag_ausdruck)
+    return datenzugriff.tagesende_normalisieren(datenzugriff.lade_frame(query, params, spaltentypen={
+        "segment_id": "int32", "tag": "int8", "start_min": "int16", "ende_min": "int16",
+    }))
+
+
+def lade_intervalle(tabelle, tage=None, einrichtung_ids=None):
+    """Intervalle aus ``belegungsplan``/``verfugbarkeit``, bereits in SQL auf Tage und Einrichtungen gefiltert."""
+    try:
+        return _lade_intervalle(tabelle, tage, einrichtung_ids, "t.wochentag_int")
+    except mysql.connector.Error:
+        # wochentag_int noch nicht angelegt (python importer.py wochentage) → aus dem Text ableiten
+        return _lade_intervalle(tabelle, tage, einrichtung_ids, datenzugriff.WOCHENTAG_INT_SQL)
+
+
+def _mit_quote(df):
+    verfuegbar = df["verfuegbare_minuten"].where(df["verfuegbare_minuten"] > 0)
+    df["auslastung_%"] = df["belegte_minuten"] / verfuegbar * 100
+    return df
+
+
+class Auslastung:
+    """Belegte und verfügbare Minuten pro (Einrichtung, Tag, Stunde) für eine Auswahl."""
+
+    def __init__(self, einrichtung_ids, belegt, verfuegbar, tage=range(7)):
+        self.einrichtung_ids = einrichtung_ids
+        self.belegt = belegt
+        self.verfuegbar = verfuegbar
+        self.tage = np.asarray(list(tage), dtype=np.int8)
+
+    @classmethod
+    def aus_aggregat(cls, segmente, minuten, tage=range(7)):
+        """Aus ``agg_minuten``-Zeilen (Segment, Tag, Stunde, Minuten)."""
+        einrichtung_ids = np.unique(segmente["einrichtung_id"].to_numpy())
+        einrichtung = pd.Series(segmente["einrichtung_id"].to_numpy(), index=segmente["id"].to_numpy())
+        zeilen_einrichtung = einrichtung.reindex(minuten["segment_id"].to_numpy()).to_numpy()
+        # Segmente, die (nicht mehr) in ``segmente`` stehen, gehören zu keiner Einrichtung
+        gueltig = ~pd.isna(zeilen_einrichtung)
+        minuten = minuten[gueltig]
+        pos = np.searchsorted(einrichtung_ids, zeilen_einrichtung[gueltig])
+        index = (pos, minuten["tag"].to_numpy(dtype=np.intp), minuten["stunde"].to_numpy(dtype=np.intp))
+
+        form = (len(einrichtung_ids), 7, STUNDEN)
+        belegt = np.zeros(form, dtype=np.int32)
+        verfuegbar = np.zeros(form, dtype=np.int32)
+        np.add.at(belegt, index, minuten["belegte_minuten"].to_numpy())
+        np.add.at(verfuegbar, index, minuten["verfuegbare_minuten"].to_numpy())
+        return cls(einrichtung_ids, belegt, verfuegbar, tage)
+
+    @classmethod
+    def aus_intervallen(cls, segmente, belegungen, verfuegbarkeiten, tage=range(7)):
+        """Aus Intervall-Frames (``segment_id``, ``tag``, ``start_min``, ``ende_min``)."""
+        einrichtung_ids, einrichtung_pos = np.unique(segmente["einrichtung_id"].to_numpy(), return_inverse=True)
+        segment_pos = pd.Series(np.arange(len(segmente)), index=segmente["id"].to_numpy())
+
+        form = (len(einrichtung_ids), 7, STUNDEN)
+        belegt = np.zeros(form, dtype=np.int32)
+        verfuegbar = np.zeros(form, dtype=np.int32)
+        np.add.at(belegt, einrichtung_pos, minuten_pro_slot(belegungen, segment_pos, 60))
+        np.add.at(verfuegbar, einrichtung_pos, minuten_pro_slot(verfuegbarkeiten, segment_pos, 60))
+        return cls(einrichtung_ids, belegt, verfuegbar, tage)
+
+    def pro_einrichtung_tag(self):
+        """Lange Tabelle: ``einrichtung_id``, ``tag``, Minuten und Auslastung."""
+        belegt = self.belegt[:, self.tage].sum(axis=2)
+        verfuegbar = self.verfuegbar[:, self.tage].sum(axis=2)
+        return _mit_quote(pd.DataFrame({
+            "einrichtung_id": np.repeat(self.einrichtung_ids, len(self.tage)),
+            "tag": np.tile(self.tage, len(self.einrichtung_ids)),
+            "belegte_minuten": belegt.ravel(),
+            "verfuegbare_minuten": verfuegbar.ravel(),
+        }))
+
+    def pro_einrichtung(self):
+        """Auslastung jeder Einrichtung über alle gewählten Tage (Minuten-gewichtet)."""
+        return _mit_quote(pd.DataFrame({
+            "einrichtung_id": self.einrichtung_ids,
+            "belegte_minuten": self.belegt[:, self.tage].sum(axis=(1, 2)),
+            "verfuegbare_minuten": self.verfuegbar[:, self.tage].sum(axis=(1, 2)),
+        }))
+
+    def pro_tag(self):
+        return _mit_quote(pd.DataFrame({
+            "tag": self.tage,
+            "belegte_minuten": self.belegt[:, self.tage].sum(axis=(0, 2)),
+            "verfuegbare_minuten": self.verfuegbar[:, self.tage].sum(axis=(0, 2)),
+        }))
+
+    def pro_stunde(self):
+        return _mit_quote(pd.DataFrame({
+            "stunde": np.arange(STUNDEN, dtype=np.int8),
+            "belegte_minuten": self.belegt[:, self.tage].sum(axis=(0, 1)),
+            "verfuegbare_minuten": self.verfuegbar[:, self.tage].sum(axis=(0, 1)),
+        }))
+
+
+def _lade_minuten_oder_none(tage, einrichtung_ids):
+    try:
+        return lade_minuten(tage, einrichtung_ids)
+    except mysql.connector.Error:
+        return None  # Aggregate noch nicht angelegt (python importer.py aggregate)
+
+
+def _berechne(tage, einrichtung_ids):
+    if tage == () or einrichtung_ids == ():
+        leer = pd.DataFrame(columns=["segment_id", "tag", "start_min", "ende_min"])
+        return Auslastung.aus_intervallen(datenzugriff.segmente().iloc[:0], leer, leer, tage or ())
+
+    # Segmente und Minuten sind unabhängige Abfragen → parallel über den Pool
+    segmente, minuten = datenzugriff.gleichzeitig(
+        datenzugriff.segmente, lambda: _lade_minuten_oder_none(tage, einrichtung_ids)
+    )
+    if einrichtung_ids is not None:
+        segmente = segmente[segmente["einrichtung_id"].isin(einrichtung_ids)]
+    auswahl = range(7) if tage is None else tage
+    if minuten is not None:
+        return Auslastung.aus_aggregat(segmente, minuten, auswahl)
+
+    # Fallback aus den Rohintervallen, beide Tabellen gleichzeitig
+    belegungen, verfuegbarkeiten = datenzugriff.gleichzeitig(
+        lambda: lade_intervalle("belegungsplan", tage, einrichtung_ids),
+        lambda: lade_intervalle("verfugbarkeit", tage, einrichtung_ids),
+    )
+    return Auslastung.aus_intervallen(segmente, belegungen, verfuegbarkeiten, auswahl)
+
+
+def berechne(tage=None, einrichtung_ids=None):
+    """Gecachte ``Auslastung`` für die Wochentage ``tage`` (0 = Mo) und Einrichtungen; ``None`` = alle."""
+    tage = None if tage is None else tuple(sorted({int(t) for t in tage}))
+    einrichtung_ids = None if einrichtung_ids is None else tuple(sorted({int(e) for e in einrichtung_ids}))
+    return cache.hole(
+        ("auslastung", tage, einrichtung_ids),
+        lambda: _berechne(tage, einrichtung_ids),
+        tabellen=("segmente", "belegungsplan", "verfugbarkeit", "agg_minuten"),
+    )
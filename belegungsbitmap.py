@@ -0,0 +1,57 @@
+# belegungsbitmap.py
+
+"""Belegte Minuten pro Segment, Wochentag und Zeitslot als NumPy-Array.
+
+``minuten_pro_slot`` verdichtet Intervalle (``belegungsplan`` bzw.
+``verfugbarkeit``) zu einem ``uint8``-Array der Form (Segmente × 7 Tage ×
+Slots), das angibt, wie viele Minuten eines Slots belegt sind. Überlappende
+Intervalle desselben Segments zählen dabei nur einmal. ``aggregate`` baut
+daraus die Aggregattabellen, ``auslastung`` rechnet ohne Aggregate direkt
+darauf.
+
+Die materialisierte Wochenbelegung selbst liegt nicht mehr als Array pro
+Prozess vor, sondern in ``agg_minuten``: belegte und verfügbare Minuten pro
+Segment × Wochentag × Stunde, vom Importer nach jedem Import für die
+geänderten Segmente nachgezogen und über den Schnappschuss zwischen den
+Prozessen geteilt. Auslastung und Heatmaps sind Reduktionen darüber;
+minutengenaue Abfragen (Belegung zu einem Zeitpunkt, freie Zeitfenster)
+laufen über ``belegungsindex`` bzw. ``freie_fenster`` auf den Intervallen,
+weil ein Slot keine exakte Minute beantworten kann.
+"""
+
+import numpy as np
+
+MINUTEN_PRO_SLOT = 15
+
+
+def minuten_pro_slot(frame, segment_pos, slot_minuten=MINUTEN_PRO_SLOT):
+    """Verdichtet Intervalle zu belegten Minuten pro (Segment, Tag, Slot).
+
+    ``slot_minuten`` muss 1440 teilen und ≤ 255 sein (``uint8``).
+    """
+    n_seg = len(segment_pos)
+    slots = 24 * 60 // slot_minuten
+    ergebnis = np.zeros((n_seg, 7, slots), dtype=np.uint8)
+    if frame.empty or n_seg == 0:
+        return ergebnis
+
+    pos = segment_pos.reindex(frame["segment_id"].to_numpy()).to_numpy()
+    tag = frame["tag"].to_numpy(dtype=np.intp)
+    start = frame["start_min"].to_numpy(dtype=np.intp)
+    ende = frame["ende_min"].to_numpy(dtype=np.intp)
+
+    gueltig = ~np.isnan(pos) & (start < ende)
+    pos, tag, start, ende = pos[gueltig].astype(np.intp), tag[gueltig], start[gueltig], ende[gueltig]
+
+    # Pro Tag ein Differenzen-Array über die Minuten, damit der Speicherbedarf klein bleibt
+    for t in range(7):
+        auswahl = tag == t
+        if not auswahl.any():
+            continue
+        diff = np.zeros((n_seg, 24 * 60 + 1), dtype=np.int16)
+        np.add.at(diff, (pos[auswahl], start[auswahl]), 1)
+        np.add.at(diff, (pos[auswahl], ende[auswahl]), -1)
+        belegt = np.cumsum(diff[:, :-1], axis=1, dtype=np.int16) > 0
+        ergebnis[:, t, :] = belegt.reshape(n_seg, slots, slot_minuten).sum(axis=2)
+    return ergebnis
+
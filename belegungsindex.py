@@ -0,0 +1,80 @@
+# belegungsindex.py
+
+"""In-Memory-Intervallindex für "Wer ist an Wochentag X um T belegt/verfügbar?".
+
+Pro Wochentag werden die Intervalle nach Startminute sortiert. Eine
+Stichabfrage zum Zeitpunkt ``t`` braucht nur den Bereich der Intervalle,
+deren Start in ``(t - längste Dauer, t]`` liegt – zwei Binärsuchen und ein
+kurzer Vektorvergleich statt eines Tabellenscans in MySQL.
+"""
+
+import numpy as np
+
+import datenzugriff
+
+
+class IntervallIndex:
+    """Sortierte-Endpunkte-Index über ein Intervall-Frame (``tag``, ``start_min``, ``ende_min``)."""
+
+    def __init__(self, frame):
+        self.frame = frame
+        self._segment = frame["segment_id"].to_numpy()
+        self._start, self._ende, self._zeile, self._max_dauer = [], [], [], []
+
+        tage = frame["tag"].to_numpy()
+        start = frame["start_min"].to_numpy(dtype=np.int32)
+        ende = frame["ende_min"].to_numpy(dtype=np.int32)
+
+        for tag in range(7):
+            zeilen = np.flatnonzero(tage == tag)
+            reihenfolge = zeilen[np.argsort(start[zeilen], kind="stable")]
+            self._start.append(start[reihenfolge])
+            self._ende.append(ende[reihenfolge])
+            self._zeile.append(reihenfolge)
+            dauer = ende[reihenfolge] - start[reihenfolge]
+            self._max_dauer.append(int(dauer.max()) if len(dauer) else 0)
+
+    def stich(self, tag, minute):
+        """Zeilenpositionen aller Intervalle mit ``start <= minute < ende``."""
+        start = self._start[tag]
+        bis = np.searchsorted(start, minute, side="right")
+        von = np.searchsorted(start, minute - self._max_dauer[tag], side="right")
+        treffer = self._ende[tag][von:bis] > minute
+        return self._zeile[tag][von:bis][treffer]
+
+    def zeilen(self, tag, minute):
+        """Die getroffenen Intervalle als DataFrame."""
+        return self.frame.iloc[self.stich(tag, minute)]
+
+    def segmente(self, tag, minute):
+        """Eindeutige Segment-IDs der getroffenen Intervalle."""
+        return np.unique(self._segment[self.stich(tag, minute)])
+
+
+def belegungsindex():
+    return datenzugriff.cache.hole(
+        ("index", "belegungsplan"),
+        lambda: IntervallIndex(datenzugriff.belegungen()),
+        tabellen=("belegungsplan",),
+    )
+
+
+def verfuegbarkeitsindex():
+    return datenzugriff.cache.hole(
+        ("index", "verfugbarkeit"),
+        lambda: IntervallIndex(datenzugriff.verfuegbarkeiten()),
+        tabellen=("verfugbarkeit",),
+    )
+
+
+def belegungen_zu(tag, minute):
+    """Alle Belegungen, die an Wochentag ``tag`` (0 = Mo) zur Minute ``minute`` laufen."""
+    return belegungsindex().zeilen(tag, minute)
+
+
+def belegte_segmente(tag, minute):
+    return belegungsindex().segmente(tag, minute)
+
+
+def verfuegbare_segmente(tag, minute):
+    return verfuegbarkeitsindex().segmente(tag, minute)
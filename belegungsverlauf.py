@@ -0,0 +1,183 @@
+# belegungsverlauf.py
+
+"""Belegung eines ganzen Wochentags in Viertelstunden-Frames (06:00–22:00).
+
+Statt pro Sliderschritt eine Stichabfrage zu machen und die Karte neu zu
+bauen, werden alle ``FRAMES`` Zeitpunkte eines Tages in einem Durchlauf
+über dessen Belegungen berechnet: Jede Belegung ``[start, ende)`` trägt
+über ein Differenzen-Array +1/−1 in ihre Frames ein, eine kumulierte Summe
+liefert danach für jeden Schlüssel (Segment, optional × Bereich) und jeden
+Frame, ob er aktiv ist – mit derselben Semantik wie ``belegungsindex``
+(``start <= t < ende``).
+
+Die Karten bekommen pro Standort und Frame ein Gewicht und spielen den Tag
+im Browser ab; Vor- und Zurückspulen braucht keinen Server-Roundtrip.
+
+Standort ist die Einrichtung (Koordinaten ihrer ersten Adresse), Gewicht
+die Anzahl aktiver Segmente oder deren Fläche (``GEWICHTE``) – derselbe
+Punkt pro Halle wie bei ``heatpunkte`` für einen einzelnen Zeitpunkt, statt
+eines Punkts pro Belegung × Adresse.
+"""
+
+import numpy as np
+import pandas as pd
+
+import datenzugriff
+
+START_MIN = 6 * 60
+ENDE_MIN = 22 * 60
+SCHRITT_MIN = 15
+FRAMES = (ENDE_MIN - START_MIN) // SCHRITT_MIN
+ZEITPUNKTE = np.arange(START_MIN, ENDE_MIN, SCHRITT_MIN)
+
+GEWICHTE = {"segmente": "Aktive Segmente", "flaeche": "Belegte Fläche (m²)"}
+
+
+def zeit_text(minute):
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+
+def aktiv(belegungen, schluessel_pos, anzahl):
+    """Bool-Matrix (``anzahl`` × ``FRAMES``): Schlüssel hat zum Frame-Zeitpunkt eine laufende Belegung.
+
+    ``schluessel_pos`` ordnet jeder Zeile von ``belegungen`` eine Zeile der Matrix zu.
+    """
+    start = belegungen["start_min"].to_numpy(dtype=np.int32)
+    ende = belegungen["ende_min"].to_numpy(dtype=np.int32)
+    # Erster Frame mit t >= start, erster Frame mit t >= ende (jeweils auf [0, FRAMES] begrenzt)
+    von = np.clip(-((START_MIN - start) // SCHRITT_MIN), 0, FRAMES)
+    bis = np.clip(-((START_MIN - ende) // SCHRITT_MIN), 0, FRAMES)
+    gueltig = bis > von
+
+    differenzen = np.zeros((anzahl, FRAMES + 1), dtype=np.int32)
+    np.add.at(differenzen, (schluessel_pos[gueltig], von[gueltig]), 1)
+    np.add.at(differenzen, (schluessel_pos[gueltig], bis[gueltig]), -1)
+    return np.cumsum(differenzen[:, :FRAMES], axis=1) > 0
+
+
+# 📍 Ein Standort pro Einrichtung, Gewicht pro Segment
+class _Standorte:
+    """Segment → Standort (Einrichtung) und Segmentgewicht für ``GEWICHTE``."""
+
+    def __init__(self, segmente, orte):
+        self.einrichtung_ids = orte["einrichtung_id"].to_numpy()
+        self.koordinaten = orte[["breitengrad", "laengengrad"]].to_numpy(dtype=np.float64)
+
+        segmente = segmente[segmente["einrichtung_id"].isin(self.einrichtung_ids)].sort_values("id")
+        self.segment_ids = segmente["id"].to_numpy()
+        self.ort_pos = np.searchsorted(self.einrichtung_ids, segmente["einrichtung_id"].to_numpy())
+        flaeche = segmente["flaeche"].astype(np.float64)
+        self.gewicht = {
+            "segmente": np.ones(len(segmente)),
+            # Fehlende Flächen zählen mit dem Median, statt die Halle verschwinden zu lassen
+            "flaeche": flaeche.fillna(flaeche.median()).fillna(0).to_numpy(),
+        }
+
+    def zeilen(self, segment_ids):
+        """Positionen der bekannten ``segment_ids`` und Maske, welche davon bekannt sind."""
+        pos = np.minimum(np.searchsorted(self.segment_ids, segment_ids), max(len(self.segment_ids) - 1, 0))
+        bekannt = (self.segment_ids[pos] == segment_ids) if len(self.segment_ids) else np.zeros(len(segment_ids), bool)
+        return pos[bekannt], bekannt
+
+
+def _standorte():
+    return datenzugriff.cache.hole(
+        ("verlauf", "standorte"),
+        lambda: _Standorte(*datenzugriff.gleichzeitig(datenzugriff.segmente, datenzugriff.einrichtung_standorte)),
+        tabellen=("segmente", "adressen", "geodaten"),
+    )
+
+
+def heatpunkte(segment_ids, gewicht="segmente"):
+    """Ein Punkt pro Einrichtung mit aktiven ``segment_ids``: Koordinaten und Gewicht (Summe je Segment)."""
+    orte = _standorte()
+    zeilen, _ = orte.zeilen(np.unique(np.asarray(segment_ids)))
+    summe = np.bincount(orte.ort_pos[zeilen], weights=orte.gewicht[gewicht][zeilen], minlength=len(orte.einrichtung_ids))
+    aktiv = np.flatnonzero(summe)
+    return pd.DataFrame({
+        "einrichtung_id": orte.einrichtung_ids[aktiv],
+        "breitengrad": orte.koordinaten[aktiv, 0],
+        "laengengrad": orte.koordinaten[aktiv, 1],
+        "gewicht": summe[aktiv],
+    })
+
+
+def _berechne(tag, gruppe, gewicht):
+    belegungen = datenzugriff.belegungen()
+    belegungen = belegungen[belegungen["tag"] == tag]
+    if gruppe is not None:
+        belegungen = belegungen[belegungen[gruppe].notna()]
+        gruppen = belegungen[gruppe].cat.remove_unused_categories()
+        namen, gruppen_pos = list(gruppen.cat.categories), gruppen.cat.codes.to_numpy()
+    else:
+        namen, gruppen_pos = [None], np.zeros(len(belegungen), dtype=np.intp)
+
+    # Schlüssel = (Segment, Gruppe)
+    segment_ids = np.unique(belegungen["segment_id"].to_numpy())
+    segment_pos = np.searchsorted(segment_ids, belegungen["segment_id"].to_numpy())
+    aktive = aktiv(belegungen, segment_pos * len(namen) + gruppen_pos, len(segment_ids) * len(namen))
+    aktive = aktive.reshape(len(segment_ids), len(namen), FRAMES)
+
+    # Auf Standorte verteilen: Summe der Segmentgewichte aktiver Segmente je Einrichtung
+    orte = _standorte()
+    zeilen, bekannt = orte.zeilen(segment_ids)
+    gewichte = np.zeros((len(orte.einrichtung_ids), len(namen), FRAMES), dtype=np.float64)
+    np.add.at(
+        gewichte, orte.ort_pos[zeilen], aktive[bekannt] * orte.gewicht[gewicht][zeilen, None, None]
+    )
+    return Tagesverlauf(orte.koordinaten, namen, gewichte)
+
+
+class Tagesverlauf:
+    """Gewichte je Standort × Gruppe × Frame für einen Wochentag."""
+
+    def __init__(self, koordinaten, gruppen, gewichte):
+        self.koordinaten = koordinaten
+        self.gruppen = gruppen
+        self.gewichte = gewichte
+
+    @property
+    def zeiten(self):
+        return [zeit_text(m) for m in ZEITPUNKTE.tolist()]
+
+    def heatmap_frames(self):
+        """Pro Frame ``[[lat, lon, gewicht], …]`` (Gewichte über den ganzen Tag auf 0..1 normiert)."""
+        gewichte = self.gewichte.sum(axis=1)
+        maximum = gewichte.max(initial=0) or 1
+        frames = []
+        for frame in range(FRAMES):
+            orte = np.flatnonzero(gewichte[:, frame])
+            frames.append(np.column_stack([
+                self.koordinaten[orte], gewichte[orte, frame] / maximum,
+            ]).round(6).tolist())
+        return frames
+
+    def punkte(self):
+        """Eine Zeile pro durchgehend aktivem Abschnitt eines (Standort, Gruppe): Koordinaten, Gruppe, Frames.
+
+        ``frames`` ist lückenlos (z. B. 08–10 Uhr und 14–16 Uhr sind zwei Zeilen),
+        weil Zeitebenen einen Punkt über die ganze Spanne seiner Zeiten zeigen.
+        """
+        ort, gruppe = np.nonzero(self.gewichte.any(axis=2))
+        zeilen = []
+        for o, g in zip(ort, gruppe):
+            frames = np.flatnonzero(self.gewichte[o, g])
+            for abschnitt in np.split(frames, np.flatnonzero(np.diff(frames) != 1) + 1):
+                zeilen.append((o, g, abschnitt.tolist()))
+        ort, gruppe, frames = zip(*zeilen) if zeilen else ((), (), ())
+        ort, gruppe = np.asarray(ort, dtype=np.intp), np.asarray(gruppe, dtype=np.intp)
+        return pd.DataFrame({
+            "breitengrad": self.koordinaten[ort, 0],
+            "laengengrad": self.koordinaten[ort, 1],
+            "gruppe": np.array(self.gruppen, dtype=object)[gruppe],
+            "frames": list(frames),
+        })
+
+
+def tagesverlauf(tag, gruppe=None, gewicht="segmente"):
+    """Gecachter ``Tagesverlauf`` für Wochentag ``tag`` (0 = Mo), optional nach Spalte ``gruppe`` getrennt."""
+    return datenzugriff.cache.hole(
+        ("verlauf", tag, gruppe, gewicht),
+        lambda: _berechne(tag, gruppe, gewicht),
+        tabellen=("belegungsplan", "segmente", "adressen", "geodaten"),
+    )
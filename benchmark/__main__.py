@@ -0,0 +1,156 @@
+# benchmark/__main__.py
+
+"""Benchmark der Seiten-Datenpfade gegen synthetische Daten, mit Vergleich zur Baseline.
+
+Beispiele::
+
+    python -m benchmark                          # Ersatzdatenbank (SQLite), heutiger Bestand
+    python -m benchmark --faktor 10 --baseline   # 10× Bestand, Messung als Baseline speichern
+    DB_NAME=sport_bench python -m benchmark --quelle mysql --laden
+    python -m benchmark --schnappschuss          # Tabellen per mmap aus einem Schnappschuss
+
+Pro Szenario wird ``kalt`` (alle Caches leer) und ``warm`` (direkt danach,
+wie ein zweiter Rerun) gemessen, jeweils der Median über
+``--wiederholungen``. Liegt eine Messung mehr als ``--toleranz`` über der
+gespeicherten Baseline (``benchmark/baselines/<quelle>-f<faktor>.json``),
+endet der Lauf mit Exit-Code 1.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import clusterdienst
+import datenzugriff
+import db
+import instrumentierung
+import schnappschuss
+from benchmark import ersatzdb, laden, szenarien
+
+BASELINE_VERZEICHNIS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+RAUSCHEN_MS = 10.0  # kleinere Abweichungen gelten nie als Regression
+
+
+def _baseline_pfad(quelle, faktor):
+    return os.path.join(BASELINE_VERZEICHNIS, f"{quelle}-f{faktor:g}.json")
+
+
+def _einmal(funktion):
+    messung = instrumentierung.seite("benchmark")
+    start = time.perf_counter()
+    funktion()
+    ms = (time.perf_counter() - start) * 1000
+    db_zeilen = sum(s["zeilen"] or 0 for s in messung.stufen if s["art"] == "db")
+    return ms, db_zeilen
+
+
+def messe(namen, wiederholungen):
+    """``{szenario: {"kalt_ms", "warm_ms", "db_zeilen"}}`` (Mediane)."""
+    ergebnisse = {}
+    for name in namen:
+        funktion = szenarien.SZENARIEN[name]
+        kalt, warm, zeilen = [], [], 0
+        for _ in range(wiederholungen):
+            szenarien.caches_leeren()
+            ms, zeilen = _einmal(funktion)
+            kalt.append(ms)
+            warm.append(_einmal(funktion)[0])
+        ergebnisse[name] = {
+            "kalt_ms": round(statistics.median(kalt), 1),
+            "warm_ms": round(statistics.median(warm), 1),
+            "db_zeilen": zeilen,
+        }
+    return ergebnisse
+
+
+def vergleiche(ergebnisse, baseline, toleranz):
+    """Zeilen für die Ausgabe und die Namen der Regressionen."""
+    zeilen, regressionen = [], []
+    for name, werte in ergebnisse.items():
+        alt = baseline.get(name, {})
+        for art in ("kalt_ms", "warm_ms"):
+            vorher = alt.get(art)
+            markierung = ""
+            if vorher is not None:
+                delta = werte[art] - vorher
+                markierung = f"{delta / vorher:+.0%}" if vorher else ""
+                if delta > RAUSCHEN_MS and werte[art] > vorher * (1 + toleranz):
+                    markierung += " ❌"
+                    regressionen.append(f"{name}.{art}")
+            zeilen.append(f"{name:<22} {art:<8} {werte[art]:>10.1f} ms  Baseline: "
+                          f"{'-' if vorher is None else f'{vorher:.1f} ms':>12}  {markierung}")
+    return zeilen, regressionen
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Seiten-Datenpfade gegen synthetische Daten messen.")
+    parser.add_argument("--quelle", choices=["ersatz", "mysql"], default="ersatz",
+                        help="Eingebettete SQLite-Ersatzdatenbank oder die konfigurierte MySQL (DB_*)")
+    parser.add_argument("--faktor", type=float, default=1, help="Datenmenge relativ zum heutigen Bestand (bis 100)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--laden", action="store_true",
+                        help="MySQL: Tabellen der Datenbank durch synthetische Daten ersetzen")
+    parser.add_argument("--szenario", nargs="*", choices=list(szenarien.SZENARIEN), help="Nur diese Szenarien")
+    parser.add_argument("--wiederholungen", type=int, default=3)
+    parser.add_argument("--toleranz", type=float, default=0.25, help="Erlaubte Verlangsamung (0.25 = 25 %%)")
+    parser.add_argument("--baseline", action="store_true", help="Messung als neue Baseline speichern")
+    parser.add_argument("--schnappschuss", action="store_true",
+                        help="Vorher einen Schnappschuss exportieren und die Tabellen daraus lesen")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as arbeitsverzeichnis:
+        # Gespeicherte Clusterings des Benchmarks nie mit denen der App mischen
+        clusterdienst.MODELL_VERZEICHNIS = os.path.join(arbeitsverzeichnis, "modelle")
+
+        start = time.perf_counter()
+        if args.quelle == "ersatz":
+            pfad = os.path.join(arbeitsverzeichnis, "ersatz.sqlite")
+            umfang = laden.in_ersatzdb(pfad, args.faktor, args.seed)
+            db.verbindungen_umleiten(lambda: ersatzdb.Verbindung(pfad))
+        elif args.laden:
+            if db.DB_CONFIG["database"] == "techlabs_projekt":
+                parser.error("--laden überschreibt Tabellen – bitte eine eigene Datenbank per DB_NAME wählen")
+            umfang = laden.in_mysql(args.faktor, args.seed)
+        else:
+            umfang = {}
+        if umfang:
+            print(f"🧪 Daten ({time.perf_counter() - start:.1f} s): "
+                  + ", ".join(f"{name} {anzahl:,}" for name, anzahl in umfang.items()))
+
+        if args.schnappschuss:
+            schnappschuss.VERZEICHNIS = os.path.join(arbeitsverzeichnis, "schnappschuss")
+            schnappschuss.exportieren(ausgabe=lambda _: None)
+
+        datenzugriff.invalidieren()
+        ergebnisse = messe(args.szenario or list(szenarien.SZENARIEN), args.wiederholungen)
+        db.verbindungen_umleiten(None)
+
+    pfad = _baseline_pfad(args.quelle + ("-schnappschuss" if args.schnappschuss else ""), args.faktor)
+    baseline = {}
+    if os.path.exists(pfad):
+        with open(pfad, encoding="utf-8") as datei:
+            baseline = json.load(datei)["szenarien"]
+
+    zeilen, regressionen = vergleiche(ergebnisse, baseline, args.toleranz)
+    print("\n".join(zeilen))
+
+    if args.baseline:
+        os.makedirs(BASELINE_VERZEICHNIS, exist_ok=True)
+        with open(pfad, "w", encoding="utf-8") as datei:
+            json.dump({"quelle": args.quelle, "faktor": args.faktor, "seed": args.seed,
+                       "szenarien": {**baseline, **ergebnisse}}, datei, indent=2, ensure_ascii=False)
+            datei.write("\n")
+        print(f"💾 Baseline gespeichert: {os.path.relpath(pfad)}")
+        return 0
+    if regressionen:
+        print(f"❌ Langsamer als die Baseline: {', '.join(regressionen)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+# benchmark/ersatzdb.py
+
+"""Eingebettete Ersatzdatenbank (SQLite) mit der Schnittstelle der mysql-connector-Verbindungen.
+
+Die Seiten-Module stellen ihre Abfragen in MySQL-SQL. Die wenigen
+MySQL-Eigenheiten der Lesepfade werden beim ``execute`` übersetzt:
+
+* ``%s``-Platzhalter → ``?``
+* ``TIME_TO_SEC(x)`` → registrierte Funktion (``HH:MM:SS`` → Sekunden)
+* ``a DIV b`` → ``CAST(a / b AS INTEGER)``
+* ``LEFT(x, n)`` → ``substr(x, 1, n)``
+
+Fehler von SQLite kommen als ``mysql.connector.Error`` heraus, damit die
+Fallbacks der Module (fehlende Aggregate, fehlendes ``wochentag_int``)
+genauso greifen wie gegen MySQL.
+"""
+
+import re
+import sqlite3
+
+import mysql.connector
+
+_DIV = re.compile(r"(\w+\([^()]*\)|\w+)\s+DIV\s+(\d+)", re.IGNORECASE)
+_LEFT = re.compile(r"\bLEFT\(\s*([\w.]+)\s*,\s*(\d+)\s*\)", re.IGNORECASE)
+
+
+def _time_to_sec(wert):
+    if wert is None:
+        return None
+    stunden, minuten, sekunden = (int(t) for t in str(wert).split(":"))
+    return float(stunden * 3600 + minuten * 60 + sekunden)
+
+
+def uebersetze(sql):
+    """MySQL-SQL der Lesepfade → SQLite-SQL."""
+    sql = _LEFT.sub(r"substr(\1, 1, \2)", sql)
+    sql = _DIV.sub(r"CAST(\1 / \2 AS INTEGER)", sql)
+    return sql.replace("%s", "?")
+
+
+class _Cursor:
+    def __init__(self, cursor, dictionary):
+        self._cursor = cursor
+        self._dictionary = dictionary
+
+    def _ausfuehren(self, methode, sql, params):
+        try:
+            return methode(uebersetze(sql), params if params is not None else ())
+        except sqlite3.Error as fehler:
+            raise mysql.connector.errors.ProgrammingError(msg=str(fehler)) from fehler
+
+    def execute(self, sql, params=None):
+        self._ausfuehren(self._cursor.execute, sql, params)
+
+    def executemany(self, sql, zeilen):
+        self._ausfuehren(self._cursor.executemany, sql, zeilen)
+
+    @property
+    def column_names(self):
+        return tuple(d[0] for d in self._cursor.description or ())
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def _zeilen(self, zeilen):
+        if not self._dictionary:
+            return zeilen
+        spalten = self.column_names
+        return [dict(zip(spalten, z)) for z in zeilen]
+
+    def fetchone(self):
+        zeile = self._cursor.fetchone()
+        return zeile if zeile is None else self._zeilen([zeile])[0]
+
+    def fetchmany(self, size=1):
+        return self._zeilen(self._cursor.fetchmany(size))
+
+    def fetchall(self):
+        return self._zeilen(self._cursor.fetchall())
+
+    def close(self):
+        self._cursor.close()
+
+
+class Verbindung:
+    """Eine SQLite-Verbindung, die sich wie eine gepoolte mysql-connector-Verbindung bedienen lässt."""
+
+    def __init__(self, pfad):
+        self._conn = sqlite3.connect(pfad, check_same_thread=False)
+        self._conn.create_function("TIME_TO_SEC", 1, _time_to_sec, deterministic=True)
+
+    def cursor(self, dictionary=False, buffered=None):
+        return _Cursor(self._conn.cursor(), dictionary)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        self._conn.close()
+
+
+def schreibe_tabellen(pfad, tabellen):
+    """Legt ``tabellen`` (Name → DataFrame) in der SQLite-Datei ``pfad`` neu an."""
+    conn = sqlite3.connect(pfad)
+    try:
+        for name, df in tabellen.items():
+            df.to_sql(name, conn, if_exists="replace", index=False, chunksize=50000)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def indizieren(pfad, indizes):
+    """Legt Indizes an; ``indizes`` wie ``schema.INDIZES`` (Tabelle → {Name: Spalten})."""
+    conn = sqlite3.connect(pfad)
+    try:
+        for tabelle, definitionen in indizes.items():
+            for name, spalten in definitionen.items():
+                conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {tabelle} ({', '.join(spalten)})")
+        conn.commit()
+    finally:
+        conn.close()
@@ -0,0 +1,81 @@
+# benchmark/laden.py
+
+"""Synthetische Tabellen in die Ersatzdatenbank oder eine lokale MySQL schreiben."""
+
+import datenzugriff
+import db
+import schema
+from benchmark import ersatzdb, synthetisch
+
+# Tabellen, die der Benchmark in einer MySQL-Datenbank neu anlegt
+MYSQL_DDL = {
+    "stadtteile2": """
+        CREATE TABLE stadtteile2 (
+            id INT PRIMARY KEY, nr_statist VARCHAR(16), name VARCHAR(255), stadtbezirk VARCHAR(255),
+            shape_area DOUBLE, shape_len DOUBLE, geom_wkt LONGTEXT
+        )""",
+    "einwohner": "CREATE TABLE einwohner (jahr SMALLINT, stadtteil VARCHAR(255), bevoelkerung INT)",
+    "einrichtungen": "CREATE TABLE einrichtungen (id INT PRIMARY KEY, name VARCHAR(255), typ VARCHAR(255))",
+    "segmente": """
+        CREATE TABLE segmente (
+            id INT PRIMARY KEY, einrichtung_id INT, name VARCHAR(255), laenge FLOAT, breite FLOAT, flaeche FLOAT
+        )""",
+    "adressen": """
+        CREATE TABLE adressen (
+            id INT PRIMARY KEY, einrichtung_id INT, strasse VARCHAR(255), hausnr VARCHAR(16),
+            plz VARCHAR(8), ort VARCHAR(255)
+        )""",
+    "geodaten": """
+        CREATE TABLE geodaten (
+            adressen_id INT, breitengrad DOUBLE, laengengrad DOUBLE, stadtteil VARCHAR(255)
+        )""",
+    "belegungsplan": """
+        CREATE TABLE belegungsplan (
+            id INT PRIMARY KEY, segment_id INT, wochentag VARCHAR(16), wochentag_int TINYINT,
+            start TIME, ende TIME, dauer TIME, bereich VARCHAR(255), nutzer_gruppen VARCHAR(255),
+            taetigkeit VARCHAR(255)
+        )""",
+    "verfugbarkeit": """
+        CREATE TABLE verfugbarkeit (
+            id INT PRIMARY KEY, segment_id INT, wochentag VARCHAR(16), wochentag_int TINYINT,
+            start TIME, ende TIME
+        )""",
+}
+
+
+def in_ersatzdb(pfad, faktor=1, seed=0):
+    """Erzeugt Roh- und abgeleitete Tabellen in der SQLite-Datei ``pfad``; liefert Zeilen pro Tabelle."""
+    tabellen = synthetisch.erzeuge(faktor, seed)
+    alle = {**tabellen, **synthetisch.abgeleitete_tabellen(tabellen)}
+    ersatzdb.schreibe_tabellen(pfad, alle)
+    ersatzdb.indizieren(pfad, schema.INDIZES)
+    return {name: len(df) for name, df in alle.items()}
+
+
+def in_mysql(faktor=1, seed=0, batch_groesse=5000):
+    """Ersetzt die Tabellen der konfigurierten MySQL-Datenbank durch synthetische Daten.
+
+    Die abgeleiteten Tabellen entstehen über die echten Pflegepfade
+    (``schema.migrieren``, ``raeumliche_zuordnung``, ``aggregate``).
+    """
+    import aggregate
+    import raeumliche_zuordnung
+
+    tabellen = synthetisch.erzeuge(faktor, seed)
+    with db.db_connection() as conn:
+        cursor = conn.cursor()
+        for name, df in tabellen.items():
+            cursor.execute(f"DROP TABLE IF EXISTS {name}")
+            cursor.execute(MYSQL_DDL[name])
+            query = f"INSERT INTO {name} ({', '.join(df.columns)}) VALUES ({', '.join(['%s'] * len(df.columns))})"
+            zeilen = list(df.astype(object).where(df.notna(), None).itertuples(index=False, name=None))
+            for i in range(0, len(zeilen), batch_groesse):
+                cursor.executemany(query, zeilen[i:i + batch_groesse])
+        schema.migrieren(cursor, ausgabe=lambda _: None)
+        cursor.execute(datenzugriff.VERSIONSTABELLE_DDL)
+        datenzugriff.version_erhoehen(cursor, *tabellen)
+        conn.commit()
+        cursor.close()
+    raeumliche_zuordnung.speichere_zuordnung()
+    aggregate.aktualisieren()
+    return {name: len(df) for name, df in tabellen.items()}
@@ -0,0 +1,214 @@
+# benchmark/synthetisch.py
+
+"""Synthetischer Datenbestand in der Größenordnung von Münster, skalierbar bis 100×.
+
+``erzeuge(faktor)`` liefert die Tabellen ``stadtteile2``, ``einwohner``,
+``einrichtungen``, ``segmente``, ``adressen``, ``geodaten``,
+``belegungsplan`` und ``verfugbarkeit`` als DataFrames mit den Spalten der
+Produktivtabellen. ``faktor`` skaliert Einrichtungen (und damit Segmente,
+Belegungen und Verfügbarkeiten) linear; die Stadtteile bleiben gleich.
+Gleicher ``seed`` → gleiche Daten, die Läufe sind also vergleichbar.
+
+``abgeleitete_tabellen`` berechnet dazu ``agg_minuten``, ``agg_muster``,
+``geodaten_stadtteil`` und ``daten_version`` mit denselben Funktionen wie
+Importer und Aggregatpflege.
+"""
+
+import numpy as np
+import pandas as pd
+import shapely
+
+import aggregate
+import datenzugriff
+import raeumliche_zuordnung
+
+# 📏 Größen bei faktor = 1 (ungefähr der heutige Bestand)
+EINRICHTUNGEN = 250
+SEGMENTE_PRO_EINRICHTUNG = (1, 4)
+BELEGUNGEN_PRO_SEGMENT_TAG = 6
+JAHRE = [2019, 2020, 2021, 2022, 2023]
+
+# Stadtgebiet als Raster aus 9 × 5 Stadtteilen (≈ Münster: 45 statistische Bezirke)
+GEBIET = {"lon": (7.52, 7.74), "lat": (51.90, 52.02)}
+RASTER = (9, 5)
+
+TYPEN = ["Sporthalle", "Turnhalle", "Schulsporthalle", "Gymnastikraum", "Mehrzweckhalle"]
+SEGMENTNAMEN = ["Gesamtspielfläche", "Hallendrittel 1", "Hallendrittel 2", "Hallendrittel 3"]
+BEREICHE = ["Schulsport", "Vereinssport", "Freizeitsport", "Hochschulsport"]
+NUTZERGRUPPEN = ["Kinder", "Jugendliche", "Erwachsene", "Senioren", "Gemischt"]
+TAETIGKEITEN = [
+    "Badminton", "Basketball", "Volleyball", "Beach-Volleyball", "Handball", "Fußball", "Hallenfußball",
+    "Futsal", "Tischtennis", "Turnen", "Kinderturnen", "Geräteturnen", "Gymnastik", "Gesundheitssport",
+    "Rehasport", "Yoga", "Pilates", "Zumba", "Tanzen", "Ballett", "Judo", "Karate", "Taekwondo",
+    "Ringen", "Boxen", "Fechten", "Floorball", "Unihockey", "Inline-Hockey", "Rollkunstlauf",
+    "Leichtathletik", "Rhythmische Sportgymnastik", "Trampolin", "Prellball", "Faustball",
+    "Korfball", "Sitzvolleyball", "Rollstuhlbasketball", "Ultimate Frisbee", "Schulsport",
+]
+DAUERN = np.array([45, 60, 90, 90, 120])
+
+
+def _zeit(minuten):
+    minuten = np.asarray(minuten)
+    return [f"{m // 60:02d}:{m % 60:02d}:00" for m in minuten.tolist()]
+
+
+def _stadtteile():
+    spalten, zeilen = RASTER
+    lon = np.linspace(*GEBIET["lon"], spalten + 1)
+    lat = np.linspace(*GEBIET["lat"], zeilen + 1)
+    datensaetze = []
+    for i in range(spalten):
+        for j in range(zeilen):
+            nr = 11 + len(datensaetze)
+            polygon = shapely.box(lon[i], lat[j], lon[i + 1], lat[j + 1])
+            datensaetze.append({
+                "id": len(datensaetze) + 1,
+                "nr_statist": str(nr),
+                "name": f"{nr} Stadtteil {nr}",
+                "stadtbezirk": f"Bezirk {i // 2 + 1}",
+                "shape_area": polygon.area,
+                "shape_len": polygon.length,
+                "geom_wkt": polygon.wkt,
+            })
+    return pd.DataFrame(datensaetze)
+
+
+def _einwohner(stadtteile, rng):
+    basis = rng.integers(3000, 20000, len(stadtteile))
+    return pd.DataFrame([
+        {"jahr": jahr, "stadtteil": name.split(" ", 1)[1], "bevoelkerung": int(b * (1 + 0.01 * k))}
+        for k, jahr in enumerate(JAHRE)
+        for name, b in zip(stadtteile["name"], basis)
+    ])
+
+
+def _einrichtungen_und_orte(anzahl, rng):
+    ids = np.arange(1, anzahl + 1)
+    einrichtungen = pd.DataFrame({
+        "id": ids,
+        "name": [f"Halle {i}" for i in ids],
+        "typ": rng.choice(TYPEN, anzahl),
+    })
+    adressen = pd.DataFrame({
+        "id": ids,
+        "einrichtung_id": ids,
+        "strasse": [f"Sportweg {i}" for i in ids],
+        "hausnr": rng.integers(1, 200, anzahl).astype(str),
+        "plz": rng.choice(["48143", "48145", "48147", "48149", "48151", "48153", "48155", "48157"], anzahl),
+        "ort": "Münster",
+    })
+    # Punkte leicht nach innen versetzt, damit keiner genau auf einer Stadtteilgrenze liegt
+    geodaten = pd.DataFrame({
+        "adressen_id": ids,
+        "breitengrad": rng.uniform(GEBIET["lat"][0] + 1e-4, GEBIET["lat"][1] - 1e-4, anzahl),
+        "laengengrad": rng.uniform(GEBIET["lon"][0] + 1e-4, GEBIET["lon"][1] - 1e-4, anzahl),
+        "stadtteil": None,
+    })
+    return einrichtungen, adressen, geodaten
+
+
+def _segmente(einrichtungen, rng):
+    anzahl = rng.integers(SEGMENTE_PRO_EINRICHTUNG[0], SEGMENTE_PRO_EINRICHTUNG[1] + 1, len(einrichtungen))
+    einrichtung_id = np.repeat(einrichtungen["id"].to_numpy(), anzahl)
+    position = np.concatenate([np.arange(n) for n in anzahl])
+    laenge = rng.choice([15.0, 27.0, 45.0], len(einrichtung_id)).astype(np.float32)
+    breite = rng.choice([15.0, 22.0, 27.0], len(einrichtung_id)).astype(np.float32)
+    return pd.DataFrame({
+        "id": np.arange(1, len(einrichtung_id) + 1),
+        "einrichtung_id": einrichtung_id,
+        "name": np.array(SEGMENTNAMEN)[position],
+        "laenge": laenge,
+        "breite": breite,
+        "flaeche": laenge * breite,
+    })
+
+
+def _belegungsplan(segmente, rng):
+    zeilen = len(segmente) * 7 * BELEGUNGEN_PRO_SEGMENT_TAG
+    segment_id = np.repeat(segmente["id"].to_numpy(), 7 * BELEGUNGEN_PRO_SEGMENT_TAG)
+    tag = np.tile(np.repeat(np.arange(7), BELEGUNGEN_PRO_SEGMENT_TAG), len(segmente))
+    # Startzeiten im Viertelstundenraster, abends dichter als vormittags
+    start = (np.clip(rng.normal(16.5, 3.0, zeilen), 7, 21.5) * 4).astype(int) * 15
+    dauer = rng.choice(DAUERN, zeilen)
+    ende = np.minimum(start + dauer, 23 * 60 + 45)
+    belegt = rng.random(zeilen) < 0.8  # nicht jeder Slot ist in jeder Woche belegt
+    return pd.DataFrame({
+        "id": np.arange(1, belegt.sum() + 1),
+        "segment_id": segment_id[belegt],
+        "wochentag": np.array([t[:2] for t in datenzugriff.WOCHENTAGE])[tag[belegt]],
+        "wochentag_int": tag[belegt],
+        "start": _zeit(start[belegt]),
+        "ende": _zeit(ende[belegt]),
+        "dauer": _zeit(ende[belegt] - start[belegt]),
+        "bereich": rng.choice(BEREICHE, belegt.sum()),
+        "nutzer_gruppen": rng.choice(NUTZERGRUPPEN, belegt.sum()),
+        "taetigkeit": rng.choice(TAETIGKEITEN, belegt.sum()),
+    })
+
+
+def _verfugbarkeit(segmente, rng):
+    segment_id = np.repeat(segmente["id"].to_numpy(), 7)
+    tag = np.tile(np.arange(7), len(segmente))
+    offen = (tag < 5) | (rng.random(len(tag)) < 0.6)  # am Wochenende nicht jede Halle
+    start = np.where(tag[offen] < 5, 8 * 60, 9 * 60)
+    ende = np.where(tag[offen] < 5, 22 * 60, 20 * 60)
+    return pd.DataFrame({
+        "id": np.arange(1, offen.sum() + 1),
+        "segment_id": segment_id[offen],
+        "wochentag": np.array(datenzugriff.WOCHENTAGE)[tag[offen]],
+        "wochentag_int": tag[offen],
+        "start": _zeit(start),
+        "ende": _zeit(ende),
+    })
+
+
+def erzeuge(faktor=1, seed=0):
+    """Rohtabellen (Name → DataFrame) für ``faktor`` × den heutigen Bestand."""
+    rng = np.random.default_rng(seed)
+    stadtteile = _stadtteile()
+    einrichtungen, adressen, geodaten = _einrichtungen_und_orte(int(round(EINRICHTUNGEN * faktor)), rng)
+    segmente = _segmente(einrichtungen, rng)
+    return {
+        "stadtteile2": stadtteile,
+        "einwohner": _einwohner(stadtteile, rng),
+        "einrichtungen": einrichtungen,
+        "segmente": segmente,
+        "adressen": adressen,
+        "geodaten": geodaten,
+        "belegungsplan": _belegungsplan(segmente, rng),
+        "verfugbarkeit": _verfugbarkeit(segmente, rng),
+    }
+
+
+def _intervalle(df, zusatzspalten=()):
+    """Intervall-Frame wie ``datenzugriff.lade_intervalle``, direkt aus den Rohtabellen."""
+    minuten = {
+        s: pd.to_timedelta(df[s]).dt.total_seconds().floordiv(60).astype(np.int16)
+        for s in ("start", "ende")
+    }
+    frame = pd.DataFrame({
+        "segment_id": df["segment_id"].to_numpy(dtype=np.int32),
+        "start_min": minuten["start"].to_numpy(),
+        "ende_min": minuten["ende"].to_numpy(),
+        "tag": df["wochentag_int"].to_numpy(dtype=np.int8),
+    })
+    for spalte in zusatzspalten:
+        frame[spalte] = df[spalte].astype("category").to_numpy()
+    return datenzugriff.tagesende_normalisieren(frame)
+
+
+def abgeleitete_tabellen(tabellen):
+    """``agg_minuten``, ``agg_muster``, ``geodaten_stadtteil`` und ``daten_version`` zu ``tabellen``."""
+    belegungen = _intervalle(tabellen["belegungsplan"], ["bereich", "nutzer_gruppen", "taetigkeit"])
+    belegungen["dauer_min"] = (
+        pd.to_timedelta(tabellen["belegungsplan"]["dauer"]).dt.total_seconds().to_numpy(dtype=np.float32) / 60
+    )
+    verfuegbarkeiten = _intervalle(tabellen["verfugbarkeit"])
+    zuordnung = raeumliche_zuordnung.ordne_zu(tabellen["stadtteile2"], tabellen["geodaten"])
+    namen = [*tabellen, "agg_minuten", "agg_muster", "geodaten_stadtteil"]
+    return {
+        "agg_minuten": aggregate.berechne_minuten(tabellen["segmente"]["id"].to_numpy(), belegungen, verfuegbarkeiten),
+        "agg_muster": aggregate.berechne_muster(belegungen),
+        "geodaten_stadtteil": zuordnung,
+        "daten_version": pd.DataFrame({"tabelle": namen, "version": 1}),
+    }
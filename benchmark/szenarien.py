@@ -0,0 +1,103 @@
+# benchmark/szenarien.py
+
+"""Die Datenpfade der Seiten, ohne Streamlit aufrufbar.
+
+Jedes Szenario macht dieselben Modulaufrufe wie die zugehörige Seite bei
+einem typischen Rerun (Standardauswahl der Widgets) bis einschließlich des
+fertigen Karten-HTML; nur das Einbetten in die Seite fehlt.
+"""
+
+import glob
+import os
+
+import folium
+from folium.plugins import HeatMap
+import numpy as np
+
+import aggregate
+import auslastung
+import belegungsindex
+import belegungsverlauf
+import clusterdienst
+import datenzugriff
+import freie_fenster
+import kennzahlen_wuerfel
+import karten
+import segment_aehnlichkeit
+import stadtteil_geometrie
+import taetigkeitssuche
+
+MONTAG, NACHMITTAG = 0, 16 * 60
+
+
+def freie_hallen():
+    segmente = datenzugriff.segmente()
+    verfuegbar = belegungsindex.verfuegbare_segmente(MONTAG, NACHMITTAG)
+    belegt = belegungsindex.belegte_segmente(MONTAG, NACHMITTAG)
+    gesamt = segmente.loc[segmente["name"] == "Gesamtspielfläche", "id"].to_numpy()
+    frei = np.setdiff1d(verfuegbar, np.intersect1d(belegt, gesamt))
+    freie = segmente[segmente["id"].isin(frei)].groupby("einrichtung_id", observed=True)["id"].nunique()
+    orte = datenzugriff.standorte()
+    return orte[orte["einrichtung_id"].isin(freie.index)]
+
+
+def freie_zeitfenster():
+    return freie_fenster.suche_freie_fenster(tage=list(range(7)))
+
+
+def belegungs_heatmap():
+    punkte = belegungsverlauf.heatpunkte(belegungsindex.belegte_segmente(MONTAG, NACHMITTAG))
+    punkte["gewicht"] /= punkte["gewicht"].max()
+    m = folium.Map(location=[51.9607, 7.6261], zoom_start=12)
+    HeatMap(punkte[["breitengrad", "laengengrad", "gewicht"]].to_numpy().tolist(), radius=20, blur=15).add_to(m)
+    return karten.karte_html(m)
+
+
+def auslastungs_heatmap():
+    df = kennzahlen_wuerfel.wuerfel().kennzahlen(2023)
+    df["farbe"] = np.where(df["minuten_pro_1000"].isna(), "#cccccc", "#2ECC71")
+    df["tooltip"] = df["name"]
+    m = folium.Map(location=[51.96, 7.63], zoom_start=stadtteil_geometrie.STANDARD_ZOOM)
+    stadtteil_geometrie.choropleth_layer(df[["farbe", "tooltip"]]).add_to(m)
+    return karten.karte_html(m)
+
+
+def auslastungsanalyse():
+    ergebnis = auslastung.berechne()
+    return ergebnis.pro_einrichtung_tag(), ergebnis.pro_einrichtung(), ergebnis.pro_stunde()
+
+
+def nutzungsmuster():
+    return [clusterdienst.clustering(name).labels(4) for name in clusterdienst.MERKMALSSAETZE]
+
+
+def segmenttypisierung():
+    modell = segment_aehnlichkeit.modell()
+    segment_id = modell.frame["segment_id"].iloc[0]
+    return segment_aehnlichkeit.einrichtungsinfos([segment_id, *modell.aehnliche(segment_id)["segment_id"]])
+
+
+def taetigkeit_suche():
+    taetigkeitssuche.suche("ball", 10)
+    return taetigkeitssuche.index().belegungen_zu("Badminton", tag=MONTAG, von=NACHMITTAG, bis=18 * 60)
+
+
+SZENARIEN = {
+    "freie_hallen": freie_hallen,
+    "freie_zeitfenster": freie_zeitfenster,
+    "belegungs_heatmap": belegungs_heatmap,
+    "auslastungs_heatmap": auslastungs_heatmap,
+    "auslastungsanalyse": auslastungsanalyse,
+    "nutzungsmuster": nutzungsmuster,
+    "segmenttypisierung": segmenttypisierung,
+    "taetigkeit_suche": taetigkeit_suche,
+}
+
+
+def caches_leeren():
+    """Alle Prozess-Caches und gespeicherten Clusterings verwerfen (Kaltstart)."""
+    datenzugriff.invalidieren()
+    auslastung.cache.invalidieren()
+    karten.cache.invalidieren()
+    for pfad in glob.glob(os.path.join(clusterdienst.MODELL_VERZEICHNIS, "*.npz")):
+        os.remove(pfad)
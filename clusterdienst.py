@@ -0,0 +1,184 @@
+# clusterdienst.py
+
+"""Clustering der Belegungen für die Nutzungsmuster-Seiten – einmal pro Datenstand.
+
+Geclustert werden die gewichteten Nutzungsmuster aus ``agg_muster`` (siehe
+``aggregate``): gleiche Belegungen zählen als ein Punkt mit Gewicht
+``anzahl`` statt als viele Zeilen.
+
+Für jeden Merkmalssatz werden alle k-Werte des Sliders auf einmal mit
+``MiniBatchKMeans`` gerechnet (nur solche mit höchstens so vielen Clustern
+wie Mustern, siehe ``Clustering.k_werte``); Labels und Zentren werden pro Version von
+``belegungsplan``/``agg_muster`` gecacht und als ``.npz`` auf Platte abgelegt, sodass auch
+weitere Prozesse und Neustarts sie nur noch laden. Eine Änderung von ``k``
+im UI ist damit ein Lookup.
+
+Kommen neue Belegungen hinzu (neue Version), startet die Neuberechnung
+von den Zentren der letzten gespeicherten Version (Warmstart) statt von
+vorn – bei unverändertem Muster konvergiert das in wenigen Mini-Batches.
+"""
+
+import glob
+import os
+import tempfile
+
+import numpy as np
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.preprocessing import StandardScaler
+
+import aggregate
+import datenzugriff
+import instrumentierung
+
+K_WERTE = range(2, 9)
+BATCH_GROESSE = 4096
+MODELL_VERZEICHNIS = os.environ.get(
+    "MODELL_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".modellcache")
+)
+
+
+# 🔧 Merkmalssätze: gewichteter Zeilen-Frame (``anzahl``) + Spalten, über die geclustert wird
+def _gewichtete_muster(muster, gruppen):
+    df = muster.groupby(gruppen, observed=True, sort=True, as_index=False)["anzahl"].sum()
+    df["wochentag"] = np.array(datenzugriff.WOCHENTAGE)[df["tag"].to_numpy()]
+    df["start_stunde"] = df["start_min"].to_numpy(dtype=np.float32) / 60
+    df["dauer_minuten"] = df["dauer_min"].to_numpy(dtype=np.float32)
+    return df
+
+
+def _merkmale_nutzung(muster):
+    df = _gewichtete_muster(muster, ["tag", "start_min", "dauer_min", "bereich"])
+    df["bereich_code"] = df["bereich"].cat.codes
+    return df, ["start_stunde", "dauer_minuten", "bereich_code"]
+
+
+def _merkmale_sportarten(muster):
+    muster = muster[muster["taetigkeit"].notna() & (muster["taetigkeit"] != "")]
+    df = _gewichtete_muster(muster, ["taetigkeit", "tag", "start_min", "dauer_min", "bereich"])
+    df["taetigkeit"] = df["taetigkeit"].cat.remove_unused_categories()
+    df["sportart_code"] = df["taetigkeit"].cat.codes
+    return df, ["sportart_code", "tag", "start_stunde", "dauer_minuten"]
+
+
+MERKMALSSAETZE = {
+    "nutzung": _merkmale_nutzung,
+    "sportarten": _merkmale_sportarten,
+}
+
+
+class Clustering:
+    """Labels und Zentren für alle ``K_WERTE`` über einen Merkmalssatz."""
+
+    def __init__(self, frame, merkmale, labels, zentren):
+        self.frame = frame
+        self.merkmale = merkmale
+        self._labels = labels
+        self._zentren = zentren
+
+    @property
+    def k_werte(self):
+        """Die berechneten k – bei wenigen Mustern weniger als ``K_WERTE``."""
+        return sorted(self._labels)
+
+    def labels(self, k):
+        return self._labels[k]
+
+    def zentren(self, k):
+        """Clusterzentren im ursprünglichen (unskalierten) Merkmalsraum."""
+        return self._zentren[k]
+
+
+def _k_werte(zeilen):
+    # MiniBatchKMeans braucht mindestens so viele Punkte wie Cluster
+    return [k for k in K_WERTE if k <= zeilen]
+
+
+def _pfad(name, version):
+    return os.path.join(MODELL_VERZEICHNIS, f"{name}-v{version}.npz")
+
+
+def _lade_gespeichert(pfad, zeilen):
+    if not os.path.exists(pfad):
+        return None
+    with np.load(pfad) as daten:
+        if int(daten["zeilen"]) != zeilen:
+            return None
+        labels = {k: daten[f"labels_{k}"] for k in K_WERTE if f"labels_{k}" in daten}
+        zentren = {k: daten[f"zentren_{k}"] for k in K_WERTE if f"zentren_{k}" in daten}
+    return (labels, zentren) if sorted(labels) == _k_werte(zeilen) else None
+
+
+def _letzte_zentren(name, ausser):
+    """Zentren der zuletzt gespeicherten Version als Startwerte für den Warmstart."""
+    kandidaten = [p for p in glob.glob(os.path.join(MODELL_VERZEICHNIS, f"{name}-v*.npz")) if p != ausser]
+    if not kandidaten:
+        return {}
+    with np.load(max(kandidaten, key=os.path.getmtime)) as daten:
+        return {k: daten[f"zentren_{k}"] for k in K_WERTE if f"zentren_{k}" in daten}
+
+
+def _speichern(name, pfad, zeilen, labels, zentren):
+    os.makedirs(MODELL_VERZEICHNIS, exist_ok=True)
+    # Erst in eine temporäre Datei, dann atomar umbenennen – andere Worker lesen nie halbe Dateien
+    fd, tmp = tempfile.mkstemp(dir=MODELL_VERZEICHNIS, suffix=".npz")
+    with os.fdopen(fd, "wb") as datei:
+        np.savez_compressed(
+            datei, zeilen=zeilen,
+            **{f"labels_{k}": v for k, v in labels.items()},
+            **{f"zentren_{k}": v for k, v in zentren.items()},
+        )
+    os.replace(tmp, pfad)
+
+    # Ältere Versionen werden nicht mehr gebraucht (Warmstart nutzt nur die jeweils letzte)
+    for alt in glob.glob(os.path.join(MODELL_VERZEICHNIS, f"{name}-v*.npz")):
+        if alt != pfad:
+            os.remove(alt)
+
+
+def _fit(X, gewicht, scaler, startzentren):
+    labels, zentren = {}, {}
+    for k in _k_werte(len(X)):
+        start = startzentren.get(k)
+        if start is not None and start.shape == (k, X.shape[1]):
+            modell = MiniBatchKMeans(n_clusters=k, init=scaler.transform(start), n_init=1,
+                                     batch_size=BATCH_GROESSE, random_state=42)
+        else:
+            modell = MiniBatchKMeans(n_clusters=k, n_init=3, batch_size=BATCH_GROESSE, random_state=42)
+        labels[k] = modell.fit_predict(X, sample_weight=gewicht).astype(np.int8)
+        zentren[k] = scaler.inverse_transform(modell.cluster_centers_)
+    return labels, zentren
+
+
+def _berechne(name):
+    frame, merkmale = MERKMALSSAETZE[name](aggregate.muster())
+    if frame.empty:
+        return Clustering(frame, merkmale, {}, {})
+
+    X_roh = frame[merkmale].to_numpy(dtype=np.float32)
+    gewicht = frame["anzahl"].to_numpy(dtype=np.float64)
+    scaler = StandardScaler().fit(X_roh, sample_weight=gewicht)
+    X = scaler.transform(X_roh)
+
+    versionen = datenzugriff.lade_versionen()
+    version = versionen.get("belegungsplan")
+    if version is not None and versionen.get("agg_muster") is not None:
+        version = f"{version}.{versionen['agg_muster']}"
+    pfad = _pfad(name, version) if version is not None else None
+    gespeichert = _lade_gespeichert(pfad, len(frame)) if pfad else None
+    if gespeichert is not None:
+        return Clustering(frame, merkmale, *gespeichert)
+
+    with instrumentierung.stufe("modell", f"cluster {name}", zeilen=len(frame)):
+        labels, zentren = _fit(X, gewicht, scaler, _letzte_zentren(name, pfad) if pfad else {})
+    if pfad:
+        _speichern(name, pfad, len(frame), labels, zentren)
+    return Clustering(frame, merkmale, labels, zentren)
+
+
+def clustering(name):
+    """Gecachtes Clustering für den Merkmalssatz ``name`` (siehe ``MERKMALSSAETZE``)."""
+    return datenzugriff.cache.hole(
+        ("cluster", name),
+        lambda: _berechne(name),
+        tabellen=("belegungsplan", "agg_muster"),
+    )
@@ -0,0 +1,527 @@
+# datenzugriff.py
+
+"""Gemeinsamer, gecachter Zugriff auf die (fast) statischen Tabellen.
+
+Die Tabellen werden einmal pro Prozess geladen und als typisierte
+DataFrames im Speicher gehalten. Ein Eintrag gilt ``CACHE_TTL`` Sekunden;
+danach wird in ``daten_version`` nachgesehen, ob der Importer die Tabelle
+inzwischen geändert hat. Nur dann wird neu geladen.
+
+Die zurückgegebenen DataFrames sind flache Kopien der Cache-Einträge:
+Spalten hinzufügen ist unproblematisch, Werte in-place ändern nicht.
+
+Liegt ein aktueller Schnappschuss vor (``schnappschuss``, Verzeichnis in
+``DATEN_SCHNAPPSCHUSS``), werden die großen Tabellen nicht aus MySQL
+geladen, sondern per mmap aus dessen Dateien geöffnet – mehrere
+Streamlit-Prozesse teilen sich dann eine physische Kopie.
+
+Geladen wird gestreamt: ``lade_frame`` holt das Ergebnis über einen
+ungepufferten Cursor in Blöcken von ``CHUNK_ZEILEN`` Zeilen und schreibt
+jeden Block direkt in typisierte Spaltenpuffer (Kategorie-Codes, int16,
+float32, …). Es liegen also nie alle Zeilen gleichzeitig als Python-Tupel
+oder -Dicts im Speicher.
+"""
+
+import contextvars
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import mysql.connector
+import numpy as np
+import pandas as pd
+
+import instrumentierung
+import schnappschuss
+from db import POOL_SIZE, db_cursor
+
+CACHE_TTL = float(os.environ.get("DATEN_CACHE_TTL", "600"))
+CHUNK_ZEILEN = int(os.environ.get("DATEN_CHUNK_ZEILEN", "50000"))
+# Höchstens die Hälfte der Pool-Verbindungen für parallele Lader – der Rest bleibt für andere Sessions
+PARALLELE_LADER = int(os.environ.get("DATEN_PARALLELE_LADER", max(1, POOL_SIZE // 2)))
+
+# 🔖 Versionstabelle – wird vom Importer bei jeder Änderung hochgezählt
+VERSIONSTABELLE_DDL = """
+    CREATE TABLE IF NOT EXISTS daten_version (
+        tabelle VARCHAR(64) NOT NULL PRIMARY KEY,
+        version BIGINT NOT NULL DEFAULT 0,
+        geaendert_am TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    )
+"""
+
+# 🔧 Spaltentypen der Stammdaten (nicht aufgeführte Spalten bleiben unverändert)
+TABELLEN = {
+    "stadtteile2": {
+        "id": "int32", "nr_statist": "category", "name": "object",
+        "stadtbezirk": "category", "shape_area": "float64", "shape_len": "float64",
+        "geom_wkt": "object",
+    },
+    "einwohner": {
+        "jahr": "int16", "stadtteil": "category", "bevoelkerung": "int32",
+    },
+    "einrichtungen": {
+        "id": "int32", "name": "object", "typ": "category",
+    },
+    "segmente": {
+        "id": "int32", "einrichtung_id": "int32", "name": "category",
+        "laenge": "float32", "breite": "float32", "flaeche": "float32",
+    },
+    "adressen": {
+        "id": "int32", "einrichtung_id": "int32", "strasse": "object",
+        "hausnr": "object", "plz": "category", "ort": "category",
+    },
+    "geodaten": {
+        "adressen_id": "int32", "breitengrad": "float64", "laengengrad": "float64",
+        "stadtteil": "category",
+    },
+}
+
+
+# 📅 Wochentage: belegungsplan nutzt "Mo", verfugbarkeit "Montag" → intern 0 (Mo) … 6 (So)
+WOCHENTAGE = ["Montag", "Dienstag", "Mittwoch", "Donnerstag", "Freitag", "Samstag", "Sonntag"]
+WOCHENTAG_NR = {**{name: i for i, name in enumerate(WOCHENTAGE)},
+                **{name[:2]: i for i, name in enumerate(WOCHENTAGE)}}
+
+# 🔢 Gespeicherter Wochentag-Schlüssel ``wochentag_int`` (0 = Mo … 6 = So) in beiden Tabellen
+WOCHENTAG_TABELLEN = ("belegungsplan", "verfugbarkeit")
+WOCHENTAG_INT_SQL = "CASE LEFT(wochentag, 2) {} END".format(
+    " ".join(f"WHEN '{name[:2]}' THEN {i}" for i, name in enumerate(WOCHENTAGE))
+)
+
+
+def wochentag_int_ergaenzen(cursor, tabelle):
+    """Legt ``wochentag_int`` (+ Index) bei Bedarf an und füllt es aus ``wochentag``; liefert geänderte Zeilen."""
+    cursor.execute(
+        """
+        SELECT COUNT(*) FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = %s AND column_name = 'wochentag_int'
+        """,
+        (tabelle,),
+    )
+    (vorhanden,) = cursor.fetchone()
+    if not vorhanden:
+        cursor.execute(f"ALTER TABLE {tabelle} ADD COLUMN wochentag_int TINYINT NULL AFTER wochentag")
+    cursor.execute(
+        """
+        SELECT COUNT(*) FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+        """,
+        (tabelle, f"idx_{tabelle}_wochentag_int"),
+    )
+    (indiziert,) = cursor.fetchone()
+    if not indiziert:
+        cursor.execute(f"CREATE INDEX idx_{tabelle}_wochentag_int ON {tabelle} (wochentag_int, segment_id)")
+    cursor.execute(
+        f"UPDATE {tabelle} SET wochentag_int = {WOCHENTAG_INT_SQL} "
+        f"WHERE NOT (wochentag_int <=> {WOCHENTAG_INT_SQL})"
+    )
+    return cursor.rowcount
+
+
+def version_erhoehen(cursor, *tabellen):
+    """Markiert Tabellen als geändert (vom Importer im selben Commit aufzurufen)."""
+    cursor.executemany(
+        """
+        INSERT INTO daten_version (tabelle, version) VALUES (%s, 1)
+        ON DUPLICATE KEY UPDATE version = version + 1
+        """,
+        [(t,) for t in tabellen],
+    )
+
+
+def lade_versionen():
+    """Aktuelle Versionen aller Tabellen; leer, falls es die Versionstabelle nicht gibt."""
+    try:
+        with instrumentierung.stufe("db", "daten_version"), db_cursor(dictionary=False) as cursor:
+            cursor.execute("SELECT tabelle, version FROM daten_version")
+            return dict(cursor.fetchall())
+    except mysql.connector.Error:
+        return {}
+
+
+class VersionierterCache:
+    """Prozessweiter Cache mit TTL und Versionsprüfung gegen ``daten_version``."""
+
+    def __init__(self, ttl=CACHE_TTL, max_eintraege=None):
+        self.ttl = ttl
+        self.max_eintraege = max_eintraege
+        self._eintraege = OrderedDict()
+        self._lock = threading.Lock()
+        self._ladesperren = {}
+
+    def hole(self, schluessel, lader, tabellen=()):
+        """Liefert den Wert zu ``schluessel`` und lädt ihn bei Bedarf über ``lader()``."""
+        eintrag = self._gueltiger_eintrag(schluessel, tabellen)
+        if eintrag is not None:
+            return eintrag["wert"]
+
+        with self._lock:
+            sperre = self._ladesperren.setdefault(schluessel, threading.Lock())
+
+        # 🔒 Nur ein Thread lädt, parallele Reruns warten auf dessen Ergebnis
+        with sperre:
+            eintrag = self._gueltiger_eintrag(schluessel, tabellen)
+            if eintrag is not None:
+                return eintrag["wert"]
+            versionen = lade_versionen() if tabellen else {}
+            with instrumentierung.stufe("laden", " ".join(str(t) for t in schluessel[:2])):
+                wert = lader()
+            with self._lock:
+                self._eintraege[schluessel] = {
+                    "wert": wert,
+                    "geladen": time.monotonic(),
+                    "versionen": {t: versionen.get(t) for t in tabellen},
+                }
+                # 🧹 Bei begrenzter Größe den am längsten ungenutzten Eintrag verwerfen
+                if self.max_eintraege is not None:
+                    while len(self._eintraege) > self.max_eintraege:
+                        verworfen, _ = self._eintraege.popitem(last=False)
+                        self._ladesperren.pop(verworfen, None)
+            return wert
+
+    def _gueltiger_eintrag(self, schluessel, tabellen):
+        with self._lock:
+            eintrag = self._eintraege.get(schluessel)
+            if eintrag is not None:
+                self._eintraege.move_to_end(schluessel)
+        if eintrag is None:
+            return None
+        if time.monotonic() - eintrag["geladen"] < self.ttl:
+            return eintrag
+
+        # ⏱️ TTL abgelaufen: nur neu laden, wenn sich eine Tabelle geändert hat
+        versionen = lade_versionen() if tabellen else {}
+        aktuell = {t: versionen.get(t) for t in tabellen}
+        if tabellen and None not in aktuell.values() and aktuell == eintrag["versionen"]:
+            with self._lock:
+                eintrag["geladen"] = time.monotonic()
+            return eintrag
+        return None
+
+    def invalidieren(self, tabelle=None):
+        """Verwirft alle Einträge oder nur die, die von ``tabelle`` abhängen."""
+        with self._lock:
+            if tabelle is None:
+                self._eintraege.clear()
+            else:
+                self._eintraege = OrderedDict(
+                    (k, e) for k, e in self._eintraege.items() if tabelle not in e["versionen"]
+                )
+
+
+cache = VersionierterCache()
+
+
+def invalidieren(tabelle=None):
+    cache.invalidieren(tabelle)
+
+
+# ⚡ Unabhängige Lader parallel über den Verbindungspool
+_lader_pool = None
+_lader_pool_lock = threading.Lock()
+
+
+def _get_lader_pool():
+    global _lader_pool
+    if _lader_pool is None:
+        with _lader_pool_lock:
+            if _lader_pool is None:
+                _lader_pool = ThreadPoolExecutor(max_workers=PARALLELE_LADER, thread_name_prefix="lader")
+    return _lader_pool
+
+
+def gleichzeitig(*lader):
+    """Führt voneinander unabhängige Lader parallel aus; Ergebnisse in derselben Reihenfolge.
+
+    Jeder Lader holt sich seine Verbindung selbst aus dem Pool, die Seite
+    wartet also nur so lange wie der langsamste. Der aufrufende Thread
+    übernimmt den ersten Lader selbst. Jeder Worker läuft in einer Kopie des
+    aktuellen Kontexts, damit die Messung (``instrumentierung``) beim Rerun
+    der Seite landet.
+
+    Gewartet wird nie auf einen Lader, der noch in der Warteschlange steht:
+    den führt der Aufrufer selbst aus. Hält er dabei eine Cache-Ladesperre,
+    auf die gerade alle Worker warten, gibt es so keinen Deadlock – auch
+    nicht bei verschachtelten Aufrufen aus Workern heraus.
+    """
+    if len(lader) < 2 or PARALLELE_LADER < 2:
+        return [lade() for lade in lader]
+    pool = _get_lader_pool()
+    futures = [pool.submit(contextvars.copy_context().run, lade) for lade in lader[1:]]
+    try:
+        ergebnisse = [lader[0]()]
+    except BaseException:
+        for future in futures:
+            if not future.cancel():
+                future.exception()  # laufende zu Ende kommen lassen – keine verwaisten Verbindungen
+        raise
+    for future, lade in zip(futures, lader[1:]):
+        ergebnisse.append(lade() if future.cancel() else future.result())
+    return ergebnisse
+
+
+def _typisieren(serie, typ):
+    try:
+        return serie.astype(typ)
+    except (TypeError, ValueError):
+        # NULL-Werte in Integer-Spalten → nullable Integer
+        return serie.astype(typ.capitalize())
+
+
+class _Spaltenpuffer:
+    """Sammelt eine Ergebnisspalte blockweise in typisierten Arrays."""
+
+    def __init__(self, typ=None):
+        self.typ = typ
+        self.teile = []
+        self.kategorien = {}
+        try:
+            self.numerisch = typ is not None and np.dtype(typ).kind in "iuf"
+        except TypeError:
+            self.numerisch = False  # z. B. "category", "Int32"
+
+    def anhaengen(self, werte):
+        if self.typ == "category":
+            # Kategorien wachsen über alle Blöcke, pro Zeile wird nur der Code gespeichert
+            kategorien = self.kategorien
+            self.teile.append(np.fromiter(
+                (-1 if w is None else kategorien.setdefault(w, len(kategorien)) for w in werte),
+                dtype=np.int32, count=len(werte),
+            ))
+        elif self.numerisch:
+            try:
+                self.teile.append(np.array(werte, dtype=self.typ))
+            except (TypeError, ValueError):
+                # NULL im Block → float64 mit NaN, wird am Ende nullable
+                self.teile.append(np.array(werte, dtype=np.float64))
+        else:
+            self.teile.append(werte)
+
+    def spalte(self):
+        if self.typ == "category":
+            codes = np.concatenate(self.teile) if self.teile else np.empty(0, dtype=np.int32)
+            return pd.Categorical.from_codes(codes, categories=list(self.kategorien))
+        if self.numerisch:
+            werte = np.concatenate(self.teile) if self.teile else np.empty(0, dtype=self.typ)
+            if werte.dtype != np.dtype(self.typ):
+                return _typisieren(pd.Series(werte), self.typ).array
+            return werte
+        werte = [w for teil in self.teile for w in teil]
+        if self.typ == "object":
+            return pd.Series(werte, dtype=object).array
+        serie = pd.Series(werte, dtype=None if werte else object)
+        return _typisieren(serie, self.typ).array if self.typ else serie.array
+
+
+def lade_frame(query, params=None, spaltentypen=None, chunk_zeilen=None):
+    """Führt ``query`` aus und liefert das Ergebnis als typisierten DataFrame.
+
+    ``spaltentypen`` bildet Spaltennamen auf pandas-/NumPy-Typen ab; nicht
+    aufgeführte Spalten behalten den von pandas erkannten Typ.
+    """
+    spaltentypen = spaltentypen or {}
+    name = instrumentierung.abfrage_name(query)
+    with instrumentierung.stufe("db", name) as messung, db_cursor(dictionary=False, buffered=False) as cursor:
+        cursor.execute(query, params)
+        spalten = list(cursor.column_names)
+        puffer = [_Spaltenpuffer(spaltentypen.get(s)) for s in spalten]
+        anzahl = 0
+        while True:
+            zeilen = cursor.fetchmany(chunk_zeilen or CHUNK_ZEILEN)
+            if not zeilen:
+                break
+            anzahl += len(zeilen)
+            for spaltenpuffer, werte in zip(puffer, zip(*zeilen)):
+                spaltenpuffer.anhaengen(werte)
+        messung["zeilen"] = anzahl
+    with instrumentierung.stufe("frame", name, zeilen=anzahl) as messung:
+        df = pd.DataFrame({s: p.spalte() for s, p in zip(spalten, puffer)}, columns=spalten)
+        messung["bytes"] = instrumentierung.frame_bytes(df)
+    return df
+
+
+def aus_schnappschuss(name, lader):
+    """Lader für ``cache.hole``: erst der Schnappschuss von ``name``, falls er zur ``daten_version`` passt."""
+    def laden():
+        if schnappschuss.VERZEICHNIS:
+            with instrumentierung.stufe("schnappschuss", name) as messung:
+                df = schnappschuss.lade(name, lade_versionen().get(name))
+                messung["zeilen"] = None if df is None else len(df)
+            if df is not None:
+                return df
+        return lader()
+    return laden
+
+
+def _tabelle(name):
+    df = cache.hole(
+        ("tabelle", name),
+        aus_schnappschuss(name, lambda: lade_frame(f"SELECT * FROM {name}", spaltentypen=TABELLEN[name])),
+        tabellen=(name,),
+    )
+    return df.copy(deep=False)
+
+
+# 📦 Stammdaten
+def stadtteile():
+    return _tabelle("stadtteile2")
+
+
+def einwohner(jahr=None):
+    df = _tabelle("einwohner")
+    if jahr is not None:
+        df = df[df["jahr"] == jahr]
+    return df
+
+
+def einrichtungen():
+    return _tabelle("einrichtungen")
+
+
+def segmente():
+    return _tabelle("segmente")
+
+
+def adressen():
+    return _tabelle("adressen")
+
+
+def geodaten():
+    return _tabelle("geodaten")
+
+
+# 🔗 Abgeleitete Sichten
+def standorte():
+    """Adressen mit Koordinaten (adressen ⋈ geodaten), eine Zeile pro Adresse."""
+    def laden():
+        adr, geo = gleichzeitig(adressen, geodaten)
+        return adr.merge(geo, left_on="id", right_on="adressen_id", suffixes=("", "_geo"))
+
+    df = cache.hole(("sicht", "standorte"), laden, tabellen=("adressen", "geodaten"))
+    return df.copy(deep=False)
+
+
+def einrichtung_standorte():
+    """Ein Standort pro Einrichtung: die erste Adresse mit Koordinaten, sortiert nach ``einrichtung_id``."""
+    def laden():
+        orte = standorte().dropna(subset=["breitengrad", "laengengrad"]).sort_values("id")
+        orte = orte.drop_duplicates("einrichtung_id").sort_values("einrichtung_id")
+        return orte.drop(columns=["id", "adressen_id"]).reset_index(drop=True)
+
+    df = cache.hole(("sicht", "einrichtung_standorte"), laden, tabellen=("adressen", "geodaten"))
+    return df.copy(deep=False)
+
+
+SEGMENT_KENNZAHLEN_SQL = """
+    SELECT s.id AS segment_id,
+           s.name AS segment_name,
+           e.name AS einrichtung_name,
+           s.laenge,
+           s.breite,
+           s.flaeche,
+           COUNT(DISTINCT b.taetigkeit) AS sportarten_vielfalt,
+           COUNT(DISTINCT b.bereich) AS bereichs_vielfalt
+    FROM segmente s
+    JOIN einrichtungen e ON e.id = s.einrichtung_id
+    LEFT JOIN belegungsplan b ON b.segment_id = s.id
+    GROUP BY s.id, s.name, e.name, s.laenge, s.breite, s.flaeche
+"""
+
+
+def segment_kennzahlen():
+    """Segmente mit Einrichtung, Maßen und Nutzungsvielfalt aus dem Belegungsplan."""
+    df = cache.hole(
+        ("sicht", "segment_kennzahlen"),
+        lambda: lade_frame(SEGMENT_KENNZAHLEN_SQL, spaltentypen={
+            "segment_id": "int32", "laenge": "float32", "breite": "float32",
+            "flaeche": "float32", "sportarten_vielfalt": "int16", "bereichs_vielfalt": "int16",
+        }),
+        tabellen=("segmente", "einrichtungen", "belegungsplan"),
+    )
+    return df.copy(deep=False)
+
+
+def segment_standorte():
+    """Segmente mit Einrichtung und Koordinaten, eine Zeile pro Segment × Adresse."""
+    def laden():
+        seg, orte = gleichzeitig(segmente, standorte)
+        return (
+            seg[["id", "einrichtung_id", "name"]]
+            .rename(columns={"id": "segment_id", "name": "segment_name"})
+            .merge(orte.drop(columns=["id"]), on="einrichtung_id")
+        )
+
+    df = cache.hole(("sicht", "segment_standorte"), laden, tabellen=("segmente", "adressen", "geodaten"))
+    return df.copy(deep=False)
+
+
+# ⏱️ Zeitintervalle aus belegungsplan / verfugbarkeit (Minuten seit Mitternacht)
+TAGESENDE_MIN = 24 * 60
+
+
+def tagesende_normalisieren(df):
+    """``ende_min == 0`` (Ende 00:00) als Tagesende 1440 – einmal beim Laden, für alle Sichten gleich."""
+    df.loc[df["ende_min"] == 0, "ende_min"] = TAGESENDE_MIN
+    return df
+
+
+def intervall_abfrage(tabelle, zusatzspalten=None, segment_ids=None):
+    """SQL und Parameter für ``lade_intervalle``."""
+    zusatzspalten = zusatzspalten or {}
+    spalten = "".join(f", {ausdruck} AS {name}" for name, (ausdruck, _) in zusatzspalten.items())
+    filter_sql, params = "", None
+    if segment_ids is not None:
+        segment_ids = [int(s) for s in segment_ids] or [-1]
+        filter_sql = f" AND segment_id IN ({', '.join(['%s'] * len(segment_ids))})"
+        params = segment_ids
+    return f"""
+        SELECT segment_id, wochentag,
+               TIME_TO_SEC(start) DIV 60 AS start_min,
+               TIME_TO_SEC(ende) DIV 60 AS ende_min{spalten}
+        FROM {tabelle}
+        WHERE start IS NOT NULL AND ende IS NOT NULL{filter_sql}
+    """, params
+
+
+def lade_intervalle(tabelle, zusatzspalten=None, segment_ids=None):
+    """``zusatzspalten``: Name → (SQL-Ausdruck, Typ) für weitere Spalten; ``segment_ids`` schränkt in SQL ein."""
+    zusatzspalten = zusatzspalten or {}
+    query, params = intervall_abfrage(tabelle, zusatzspalten, segment_ids)
+    df = lade_frame(query, params, spaltentypen={
+        "segment_id": "int32", "wochentag": "category", "start_min": "int16", "ende_min": "int16",
+        **{name: typ for name, (_, typ) in zusatzspalten.items()},
+    })
+    df["tag"] = df["wochentag"].map(WOCHENTAG_NR)
+    df = df.dropna(subset=["tag"]).reset_index(drop=True)
+    df["tag"] = df["tag"].astype("int8")
+    return tagesende_normalisieren(df.drop(columns=["wochentag"]))
+
+
+BELEGUNG_ZUSATZSPALTEN = {
+    "dauer_min": ("TIME_TO_SEC(dauer) / 60", "float32"),
+    "bereich": ("bereich", "category"),
+    "nutzer_gruppen": ("nutzer_gruppen", "category"),
+    "taetigkeit": ("taetigkeit", "category"),
+}
+
+
+def belegungen():
+    """Alle Belegungen mit Wochentag-Nr., Start/Ende in Minuten und Nutzungsangaben."""
+    df = cache.hole(
+        ("tabelle", "belegungsplan"),
+        aus_schnappschuss("belegungsplan", lambda: lade_intervalle("belegungsplan", BELEGUNG_ZUSATZSPALTEN)),
+        tabellen=("belegungsplan",),
+    )
+    return df.copy(deep=False)
+
+
+def verfuegbarkeiten():
+    """Alle Verfügbarkeitsfenster mit Wochentag-Nr. und Start/Ende in Minuten."""
+    df = cache.hole(
+        ("tabelle", "verfugbarkeit"),
+        aus_schnappschuss("verfugbarkeit", lambda: lade_intervalle("verfugbarkeit")),
+        tabellen=("verfugbarkeit",),
+    )
+    return df.copy(deep=False)
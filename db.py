@@ -1,11 +1,126 @@
 # db.py
 
+import os
+import threading
+import time
+from contextlib import contextmanager
+
 import mysql.connector
+from mysql.connector import pooling
+
+# 🔧 Verbindungsdaten (per Umgebungsvariable überschreibbar)
+DB_CONFIG = {
+    "host": os.environ.get("DB_HOST", "localhost"),
+    "user": os.environ.get("DB_USER", "root"),
+    "password": os.environ.get("DB_PASSWORD", "Techlabs#2025"),
+    "database": os.environ.get("DB_NAME", "techlabs_projekt"),
+}
+
+# 🔧 Pool-Einstellungen
+POOL_NAME = "sportstaetten"
+POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "8"))
+CHECKOUT_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "10"))
+HEALTH_CHECK = os.environ.get("DB_POOL_HEALTH_CHECK", "1") != "0"
+
+_pool = None
+_pool_lock = threading.Lock()
+_verbindungsfabrik = None
+
+
+def verbindungen_umleiten(fabrik):
+    """Ersetzt den Pool durch ``fabrik()`` (z. B. die Ersatzdatenbank des Benchmarks); ``None`` = wieder der Pool.
+
+    Die Fabrik liefert Objekte mit der Schnittstelle einer mysql-connector-
+    Verbindung (``cursor``, ``commit``, ``close``).
+    """
+    global _verbindungsfabrik
+    _verbindungsfabrik = fabrik
+
+
+def _get_pool():
+    """Liefert den prozessweiten Pool und legt ihn beim ersten Zugriff an."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = pooling.MySQLConnectionPool(
+                    pool_name=POOL_NAME,
+                    pool_size=POOL_SIZE,
+                    pool_reset_session=True,
+                    **DB_CONFIG
+                )
+    return _pool
+
+
+def get_db_connection(timeout=None):
+    """Leiht eine Verbindung aus dem Pool aus.
+
+    Ist der Pool erschöpft, wird bis zu ``timeout`` Sekunden auf eine freie
+    Verbindung gewartet. ``close()`` gibt die Verbindung an den Pool zurück.
+    """
+    if _verbindungsfabrik is not None:
+        return _verbindungsfabrik()
+    pool = _get_pool()
+    deadline = time.monotonic() + (CHECKOUT_TIMEOUT if timeout is None else timeout)
+    wartezeit = 0.01
+
+    while True:
+        try:
+            conn = pool.get_connection()
+        except pooling.PoolError:
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(wartezeit)
+            wartezeit = min(wartezeit * 2, 0.2)
+            continue
+
+        if HEALTH_CHECK:
+            try:
+                # 🩺 Tote Verbindungen (Timeout, Server-Neustart) vor der Ausgabe erneuern
+                conn.ping(reconnect=True, attempts=1, delay=0)
+            except mysql.connector.Error:
+                conn.close()
+                if time.monotonic() >= deadline:
+                    raise
+                continue
+        return conn
+
+
+@contextmanager
+def db_connection(timeout=None):
+    """Kontextmanager: Verbindung ausleihen und garantiert zurückgeben."""
+    conn = get_db_connection(timeout)
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+@contextmanager
+def db_cursor(dictionary=True, timeout=None, buffered=None):
+    """Kontextmanager: Cursor auf einer gepoolten Verbindung.
+
+    ``buffered=False`` liefert einen ungepufferten Cursor, der die Zeilen erst
+    beim ``fetchmany`` vom Server holt (Streaming großer Ergebnismengen).
+    """
+    with db_connection(timeout) as conn:
+        cursor = conn.cursor(dictionary=dictionary, buffered=buffered)
+        try:
+            yield cursor
+        except BaseException:
+            # Abbruch mitten im Streaming: ``close()`` würde mit "Unread result found"
+            # den eigentlichen Fehler überdecken – Restzeilen verwerfen, Folgefehler schlucken
+            try:
+                _restzeilen_verwerfen(conn, buffered)
+                cursor.close()
+            except Exception:
+                pass
+            raise
+        _restzeilen_verwerfen(conn, buffered)
+        cursor.close()
+
 
-def get_db_connection():
-    return mysql.connector.connect(
-        host="localhost",
-        user="root",
-        password="Techlabs#2025",
-        database="techlabs_projekt"
-    )
+def _restzeilen_verwerfen(conn, buffered):
+    """Liest ein nicht vollständig abgeholtes Ergebnis zu Ende (nur ungepufferte Cursor)."""
+    if buffered is False and getattr(conn, "unread_result", False):
+        conn.consume_results()
@@ -0,0 +1,108 @@
+# diagramme.py
+
+"""Serverseitige Ausdünnung großer Punktmengen für Altair-Streudiagramme.
+
+Altair schickt jede Zeile des DataFrames als JSON an den Browser. Bei den
+Clusterseiten sind das alle Belegungen – und weil Startzeit und Dauer auf
+einem groben Raster liegen, sind die meisten Punkte exakte Duplikate. Vor dem
+Zeichnen wird die Punktmenge deshalb auf höchstens ``MAX_PUNKTE`` Marks
+begrenzt, entweder
+
+* ``"aggregiert"``: gewichtete Punkte je (x-Zelle, y-Zelle, Farbe) mit der
+  Anzahl als Kreisgröße – Duplikate fallen exakt zusammen, oder
+* ``"stichprobe"``: geschichtete Zufallsstichprobe, jede Farbe (Cluster) mit
+  ihrem Anteil, aber mindestens einem Punkt.
+"""
+
+import os
+
+import altair as alt
+import numpy as np
+import pandas as pd
+
+MAX_PUNKTE = int(os.environ.get("DIAGRAMM_MAX_PUNKTE", 5000))
+RASTER = 200  # Zellen je Achse beim Aggregieren
+MODI = {"aggregiert": "Aggregiert (gewichtet)", "stichprobe": "Stichprobe je Cluster"}
+
+
+def _zellen(werte, raster):
+    werte = werte.to_numpy(dtype=np.float64)
+    lo, hi = np.nanmin(werte), np.nanmax(werte)
+    schritt = (hi - lo) / raster if hi > lo else 1.0
+    return np.minimum(((werte - lo) / schritt).astype(np.int64), raster - 1)
+
+
+def aggregiere(df, x, y, farbe, max_punkte=MAX_PUNKTE, raster=RASTER, gewicht=None):
+    """Gewichtete Punkte je (x, y, ``farbe``)-Zelle; Position = gewichteter Mittelwert, ``anzahl`` = Gewicht.
+
+    ``gewicht`` ist eine optionale Spalte mit Zeilengewichten (z. B. bereits
+    zusammengefasste Belegungen); ohne zählt jede Zeile einfach. Passen die
+    Zellen nicht unter ``max_punkte``, wird das Raster halbiert; bleibt es
+    darüber, gewinnen die schwersten Zellen.
+    """
+    df = df[df[x].notna() & df[y].notna()]
+    w = np.ones(len(df)) if gewicht is None else df[gewicht].to_numpy(dtype=np.float64)
+    while True:
+        zellen = pd.DataFrame({
+            "_x": _zellen(df[x], raster),
+            "_y": _zellen(df[y], raster),
+            farbe: df[farbe].to_numpy(),
+            "_wx": df[x].to_numpy(dtype=np.float64) * w,
+            "_wy": df[y].to_numpy(dtype=np.float64) * w,
+            "anzahl": w,
+        })
+        punkte = (
+            zellen.groupby(["_x", "_y", farbe], observed=True, sort=False)[["_wx", "_wy", "anzahl"]]
+            .sum()
+            .reset_index()
+        )
+        punkte[x] = punkte["_wx"] / punkte["anzahl"]
+        punkte[y] = punkte["_wy"] / punkte["anzahl"]
+        punkte = punkte[[farbe, x, y, "anzahl"]]
+        if len(punkte) <= max_punkte or raster <= 2:
+            break
+        raster //= 2
+    if len(punkte) > max_punkte:
+        punkte = punkte.nlargest(max_punkte, "anzahl")
+    return punkte
+
+
+def stichprobe(df, farbe, max_punkte=MAX_PUNKTE, seed=42):
+    """Geschichtete Stichprobe: jede ``farbe`` proportional, mindestens ein Punkt, zusammen ≤ ``max_punkte``.
+
+    Bei gewichteten Zeilen wird über die Zeilen (Muster) gezogen, nicht über die Gewichte.
+    """
+    if len(df) <= max_punkte:
+        return df
+    groessen = df[farbe].value_counts()
+    groessen = groessen[groessen > 0]
+    quote = np.maximum(1, np.floor(groessen * max_punkte / len(df))).astype(int)
+
+    gemischt = df.iloc[np.random.default_rng(seed).permutation(len(df))]
+    position = gemischt.groupby(farbe, observed=True).cumcount().to_numpy()
+    grenze = gemischt[farbe].map(quote).to_numpy()
+    return gemischt[position < grenze].head(max_punkte)
+
+
+def streudiagramm(df, x, y, farbe, titel, tooltip, modus="aggregiert", max_punkte=MAX_PUNKTE, gewicht=None):
+    """Altair-Streudiagramm über ausgedünnte Punkte; ``titel`` bildet Spalte → Achsen-/Legendentitel ab.
+
+    Im Modus ``"aggregiert"`` stehen nur ``x``, ``y``, ``farbe`` und ``anzahl``
+    im Tooltip, im Modus ``"stichprobe"`` die angegebenen ``tooltip``-Spalten.
+    Liefert ``(chart, anzahl_marks)``.
+    """
+    encoding = {
+        "x": alt.X(f"{x}:Q", title=titel[x]),
+        "y": alt.Y(f"{y}:Q", title=titel[y]),
+        "color": alt.Color(f"{farbe}:N", title=titel[farbe]),
+    }
+    if modus == "aggregiert":
+        punkte = aggregiere(df, x, y, farbe, max_punkte, gewicht=gewicht)
+        encoding["size"] = alt.Size("anzahl:Q", title="Belegungen", scale=alt.Scale(range=[20, 600]))
+        encoding["tooltip"] = [farbe, alt.Tooltip(x, format=".2f"), alt.Tooltip(y, format=".0f"), "anzahl"]
+        chart = alt.Chart(punkte).mark_circle(opacity=0.7)
+    else:
+        punkte = stichprobe(df[list(dict.fromkeys([x, y, farbe, *tooltip]))], farbe, max_punkte)
+        encoding["tooltip"] = tooltip
+        chart = alt.Chart(punkte).mark_circle(size=70)
+    return chart.encode(**encoding).interactive(), len(punkte)
@@ -0,0 +1,150 @@
+# freie_fenster.py
+
+"""Suche nach freien Zeitfenstern: "≥ N freie Segmente für ≥ X Minuten zwischen A und B".
+
+Pro Segment und Wochentag werden die Belegungen von den Verfügbarkeiten
+abgezogen (Intervall-Subtraktion). Das Ergebnis ist pro Datenstand gecacht.
+Eine Suche schneidet diese freien Intervalle nur noch auf das gewünschte
+Zeitfenster zu und sucht pro Einrichtung die Fenster, in denen dieselben
+Segmente durchgehend frei sind.
+"""
+
+from collections import defaultdict
+from itertools import groupby
+
+import pandas as pd
+
+import datenzugriff
+
+
+def _vereinigen(intervalle):
+    """Sortiert und verschmilzt überlappende bzw. aneinanderstoßende Intervalle."""
+    ergebnis = []
+    for start, ende in sorted(intervalle):
+        if ergebnis and start <= ergebnis[-1][1]:
+            ergebnis[-1][1] = max(ergebnis[-1][1], ende)
+        else:
+            ergebnis.append([start, ende])
+    return [(s, e) for s, e in ergebnis]
+
+
+def _abziehen(basis, abzug):
+    """Basis-Intervalle minus Abzug-Intervalle (beide sortiert und verschmolzen)."""
+    ergebnis = []
+    i = 0
+    for start, ende in basis:
+        while i < len(abzug) and abzug[i][1] <= start:
+            i += 1
+        j = i
+        while j < len(abzug) and abzug[j][0] < ende:
+            if abzug[j][0] > start:
+                ergebnis.append((start, abzug[j][0]))
+            start = max(start, abzug[j][1])
+            j += 1
+        if start < ende:
+            ergebnis.append((start, ende))
+    return ergebnis
+
+
+def _intervalle_pro_segment_tag(frame):
+    zeilen = sorted(zip(
+        frame["segment_id"].tolist(), frame["tag"].tolist(),
+        frame["start_min"].tolist(), frame["ende_min"].tolist(),
+    ))
+    return {
+        schluessel: _vereinigen((s, e) for _, _, s, e in gruppe)
+        for schluessel, gruppe in groupby(zeilen, key=lambda z: (z[0], z[1]))
+    }
+
+
+def _berechne_freie_intervalle():
+    verfuegbar = _intervalle_pro_segment_tag(datenzugriff.verfuegbarkeiten())
+    belegt = _intervalle_pro_segment_tag(datenzugriff.belegungen())
+    return {
+        schluessel: frei
+        for schluessel, intervalle in verfuegbar.items()
+        if (frei := _abziehen(intervalle, belegt.get(schluessel, [])))
+    }
+
+
+def freie_intervalle():
+    """Freie Intervalle (Minuten) pro (segment_id, tag): Verfügbarkeit minus Belegung."""
+    return datenzugriff.cache.hole(
+        ("fenster", "freie_intervalle"),
+        _berechne_freie_intervalle,
+        tabellen=("belegungsplan", "verfugbarkeit"),
+    )
+
+
+def _gemeinsame_fenster(intervalle, min_segmente):
+    """Längste Zeitfenster, in denen dieselben ≥ ``min_segmente`` Segmente durchgehend frei sind.
+
+    Ein Fenster beginnt immer an einem Intervallstart und endet am
+    ``min_segmente``-größten Ende der dann laufenden Intervalle. Fenster, die
+    in einem früheren enthalten sind, entfallen. Liefert ``(start, ende, anzahl)``.
+    """
+    fenster = []
+    bisheriges_ende = -1
+    for start in sorted({s for s, _ in intervalle}):
+        enden = sorted((e for s, e in intervalle if s <= start < e), reverse=True)
+        if len(enden) < min_segmente:
+            continue
+        ende = enden[min_segmente - 1]
+        if ende <= bisheriges_ende:
+            continue
+        bisheriges_ende = ende
+        fenster.append((start, ende, sum(1 for e in enden if e >= ende)))
+    return fenster
+
+
+def suche_freie_fenster(min_segmente=1, min_dauer=90, von=16 * 60, bis=22 * 60,
+                        tage=range(7), einrichtung_ids=None):
+    """Alle Zeitfenster mit ≥ ``min_segmente`` gleichzeitig freien Segmenten für ≥ ``min_dauer`` Minuten.
+
+    ``von``/``bis`` sind Minuten seit Mitternacht, ``tage`` Wochentag-Nummern
+    (0 = Montag). Ergebnis: ein DataFrame, pro Einrichtung nach Dauer und
+    Anzahl freier Segmente gerankt (``rang`` 1 = bester Slot), Einrichtungen
+    nach ihrem besten Slot sortiert.
+    """
+    tage = set(tage)
+    segmente = datenzugriff.segmente()
+    einrichtung_von = dict(zip(segmente["id"].tolist(), segmente["einrichtung_id"].tolist()))
+    if einrichtung_ids is not None:
+        einrichtung_ids = set(einrichtung_ids)
+
+    # Freie Intervalle auf [von, bis) zuschneiden und pro Einrichtung & Tag sammeln
+    pro_einrichtung_tag = defaultdict(list)
+    for (segment_id, tag), intervalle in freie_intervalle().items():
+        einrichtung_id = einrichtung_von.get(segment_id)
+        if tag not in tage or einrichtung_id is None:
+            continue
+        if einrichtung_ids is not None and einrichtung_id not in einrichtung_ids:
+            continue
+        for start, ende in intervalle:
+            start, ende = max(start, von), min(ende, bis)
+            if ende - start >= min_dauer:
+                pro_einrichtung_tag[(einrichtung_id, tag)].append((start, ende))
+
+    treffer = []
+    for (einrichtung_id, tag), intervalle in pro_einrichtung_tag.items():
+        if len(intervalle) < min_segmente:
+            continue
+        for start, ende, anzahl in _gemeinsame_fenster(intervalle, min_segmente):
+            if ende - start >= min_dauer:
+                treffer.append((einrichtung_id, tag, start, ende, ende - start, anzahl))
+
+    spalten = ["einrichtung_id", "tag", "start_min", "ende_min", "dauer_min", "freie_segmente"]
+    df = pd.DataFrame(treffer, columns=spalten)
+    df = df.merge(datenzugriff.einrichtungen()[["id", "name", "typ"]],
+                  left_on="einrichtung_id", right_on="id").drop(columns=["id"])
+    df["wochentag"] = [datenzugriff.WOCHENTAGE[t] for t in df["tag"]]
+
+    # 🏅 Ranking: lange Fenster mit vielen freien Segmenten zuerst
+    df = df.sort_values(["dauer_min", "freie_segmente", "tag", "start_min"],
+                        ascending=[False, False, True, True])
+    df["rang"] = df.groupby("einrichtung_id").cumcount() + 1
+    bester = df.groupby("einrichtung_id")["dauer_min"].transform("max")
+    df = df.assign(_bester=bester).sort_values(
+        ["_bester", "einrichtung_id", "rang"], ascending=[False, True, True]
+    ).drop(columns=["_bester"])
+    return df.reset_index(drop=True)
@@ -0,0 +1,333 @@
+# importer.py
+
+"""Bulk-Importer für die Quelldaten (ersetzt die Einfüge-Schleifen aus import/import.ipynb).
+
+Jeder Import lädt die Datei zuerst in eine Staging-Tabelle (``<tabelle>_staging``,
+gleiche Struktur wie die Zieltabelle) – per ``executemany`` in Batches oder per
+``LOAD DATA LOCAL INFILE``. Danach:
+
+* ``--voll``: atomarer Tausch per ``RENAME TABLE`` – die Seiten lesen bis zur
+  letzten Millisekunde den alten Stand, danach den neuen.
+* sonst (inkrementell): Upsert über den natürlichen Schlüssel in einer
+  Transaktion. Der Schlüssel ist nicht eindeutig; jede Schlüsselgruppe, deren
+  Zeilen sich geändert haben, wird komplett ersetzt, unveränderte Gruppen werden
+  übersprungen. Ein erneuter Lauf mit derselben Datei ändert nichts.
+
+Bei ``belegungsplan``/``verfugbarkeit`` wird zusätzlich der Wochentag-Schlüssel
+``wochentag_int`` (0 = Mo … 6 = So) aus ``wochentag`` berechnet. Anschließend
+wird ``daten_version`` hochgezählt, damit alle Caches neu laden, und die
+Aggregattabellen (``aggregate.py``) werden für die geänderten Segmente
+nachgezogen. Ist ``DATEN_SCHNAPPSCHUSS`` gesetzt, schreibt jeder Lauf am Ende
+einen neuen Schnappschuss (``schnappschuss.py``) für die Seiten.
+
+Beispiele::
+
+    python importer.py einwohner Wohnberechtigte-Bevoelkerung.csv
+    python importer.py stadtteile stadtteil_statistischer_bezirk.shp --voll
+    python importer.py belegungsplan belegungsplan.csv --load-data
+    DATEN_SCHNAPPSCHUSS=/srv/sport/schnappschuss python importer.py schnappschuss
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import mysql.connector
+import pandas as pd
+
+import aggregate
+import datenzugriff
+import raeumliche_zuordnung
+import schnappschuss
+from db import DB_CONFIG, db_connection
+
+BATCH_GROESSE = 5000
+
+# 🔑 Natürliche Schlüssel für den inkrementellen Upsert
+SCHLUESSEL = {
+    "einwohner": ("jahr", "stadtteil"),
+    "stadtteile2": ("nr_statist",),
+    "belegungsplan": ("segment_id", "wochentag", "start", "ende"),
+    "verfugbarkeit": ("segment_id", "wochentag", "start"),
+}
+
+
+# 📂 Quelldateien einlesen
+def lies_einwohner(pfad, trennzeichen=";"):
+    df = pd.read_csv(pfad, sep=trennzeichen)
+    df["jahr"] = pd.to_datetime(df["ZEIT"], dayfirst=True).dt.year
+    df = df.rename(columns={"RAUM": "stadtteil", "WERT": "bevoelkerung"})
+    return df[["jahr", "stadtteil", "bevoelkerung"]]
+
+
+def lies_stadtteile(pfad):
+    import geopandas as gpd
+
+    gdf = gpd.read_file(pfad)
+    # Münster-Shapefiles kommen meist ohne CRS in EPSG:25832 (ETRS89 / UTM 32N)
+    if gdf.crs is None:
+        gdf = gdf.set_crs(epsg=25832)
+    if gdf.crs.to_epsg() != 4326:
+        gdf = gdf.to_crs(epsg=4326)
+    return pd.DataFrame({
+        "nr_statist": gdf["NR_STATIST"],
+        "name": gdf["NAME_STATI"],
+        "stadtbezirk": gdf["STADTBEZIR"],
+        "shape_area": gdf["SHAPE_AREA"].astype(float),
+        "shape_len": gdf["SHAPE_LEN"].astype(float),
+        "geom_wkt": gdf.geometry.to_wkt(),
+    })
+
+
+def lies_tabelle(pfad, trennzeichen=";"):
+    """CSV, deren Spaltennamen denen der Zieltabelle entsprechen."""
+    return pd.read_csv(pfad, sep=trennzeichen, dtype=str, keep_default_na=False, na_values=[""])
+
+
+# 📥 Laden in die Staging-Tabelle
+def _zeilen(df):
+    return list(df.astype(object).where(df.notna(), None).itertuples(index=False, name=None))
+
+
+def _lade_executemany(cursor, tabelle, df, batch_groesse):
+    spalten = ", ".join(f"`{s}`" for s in df.columns)
+    platzhalter = ", ".join(["%s"] * len(df.columns))
+    query = f"INSERT INTO {tabelle} ({spalten}) VALUES ({platzhalter})"
+    zeilen = _zeilen(df)
+    for i in range(0, len(zeilen), batch_groesse):
+        # mysql-connector fasst executemany bei INSERT zu einem Multi-Row-INSERT zusammen
+        cursor.executemany(query, zeilen[i:i + batch_groesse])
+
+
+# LOAD DATA liest ohne ENCLOSED BY mit ESCAPED BY '\\': diese Zeichen müssen im Feld maskiert sein
+_INFILE_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r", "\0": "\\0"})
+
+
+def _infile_zeilen(df):
+    """Zeilen im Standardformat von LOAD DATA (Tab-getrennt, ``\\N`` = NULL, keine Anführungszeichen).
+
+    Die Werte sind dieselben wie bei ``executemany`` (``_zeilen``) – nur als Text.
+    """
+    felder = [
+        df[s].astype(object).where(df[s].notna(), None).map(str, na_action="ignore")
+        .str.translate(_INFILE_ESCAPES).fillna("\\N")
+        for s in df.columns
+    ]
+    zeilen = felder[0]
+    for feld in felder[1:]:
+        zeilen = zeilen + "\t" + feld
+    return zeilen
+
+
+def _lade_infile(tabelle, df):
+    spalten = ", ".join(f"`{s}`" for s in df.columns)
+    with tempfile.NamedTemporaryFile("w", suffix=".tsv", delete=False, encoding="utf-8", newline="") as datei:
+        for zeile in _infile_zeilen(df):
+            datei.write(zeile + "\n")
+    try:
+        # LOCAL INFILE muss pro Verbindung freigeschaltet werden → eigene Verbindung statt Pool
+        conn = mysql.connector.connect(**DB_CONFIG, allow_local_infile=True)
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"LOAD DATA LOCAL INFILE %s INTO TABLE {tabelle} "
+                "CHARACTER SET utf8mb4 FIELDS TERMINATED BY '\\t' ENCLOSED BY '' ESCAPED BY '\\\\' "
+                "LINES TERMINATED BY '\\n' "
+                f"({spalten})",
+                (datei.name,),
+            )
+            conn.commit()
+            cursor.close()
+        finally:
+            conn.close()
+    finally:
+        os.remove(datei.name)
+
+
+# 🔁 Übernahme aus Staging
+def _tauschen(cursor, tabelle, staging):
+    alt = f"{tabelle}_alt"
+    cursor.execute(f"DROP TABLE IF EXISTS {alt}")
+    cursor.execute(f"RENAME TABLE {tabelle} TO {alt}, {staging} TO {tabelle}")
+    cursor.execute(f"DROP TABLE {alt}")
+
+
+def _upsert(cursor, tabelle, staging, spalten, schluessel):
+    """Ersetzt alle Schlüsselgruppen, deren Zeilen sich geändert haben; liefert die Anzahl eingefügter Zeilen.
+
+    Der natürliche Schlüssel ist nicht eindeutig (mehrere Belegungen desselben
+    Slots mit anderem Verein oder anderer Tätigkeit). Verglichen wird deshalb je
+    Schlüssel die ganze Zeilenmenge samt Duplikaten: Weicht sie ab, werden alle
+    Zeilen des Schlüssels gelöscht und alle Zeilen der Datei dazu eingefügt.
+    """
+    gruppen = f"{staging}_schluessel"
+    spaltenliste = ", ".join(f"`{s}`" for s in spalten)
+    schluesselliste = ", ".join(f"`{s}`" for s in schluessel)
+
+    def gleicher_schluessel(a, b):
+        return " AND ".join(f"{a}.`{s}` <=> {b}.`{s}`" for s in schluessel)
+
+    # Schlüssel, bei denen eine Zeile (mit Vielfachheit) nur auf einer Seite vorkommt
+    cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS {gruppen}")
+    cursor.execute(f"""
+        CREATE TEMPORARY TABLE {gruppen} AS
+        SELECT DISTINCT {schluesselliste} FROM (
+            SELECT {spaltenliste} FROM (
+                SELECT {spaltenliste}, 1 AS anzahl FROM {staging}
+                UNION ALL
+                SELECT {", ".join(f"t.`{s}`" for s in spalten)}, -1 FROM {tabelle} t
+                WHERE EXISTS (SELECT 1 FROM {staging} s WHERE {gleicher_schluessel("t", "s")})
+            ) zeilen
+            GROUP BY {spaltenliste}
+            HAVING SUM(anzahl) <> 0
+        ) abweichend
+    """)
+    # Unveränderte Gruppen verwerfen, geänderte komplett ersetzen
+    cursor.execute(
+        f"DELETE FROM {staging} WHERE NOT EXISTS "
+        f"(SELECT 1 FROM {gruppen} g WHERE {gleicher_schluessel('g', staging)})"
+    )
+    cursor.execute(f"SELECT COUNT(*) FROM {staging}")
+    (geaendert,) = cursor.fetchone()
+    if geaendert:
+        cursor.execute(f"DELETE t FROM {tabelle} t JOIN {gruppen} g ON {gleicher_schluessel('t', 'g')}")
+        cursor.execute(f"INSERT INTO {tabelle} ({spaltenliste}) SELECT {spaltenliste} FROM {staging}")
+    cursor.execute(f"DROP TEMPORARY TABLE {gruppen}")
+    return geaendert
+
+
+def importiere(tabelle, df, voll=False, load_data=False, batch_groesse=BATCH_GROESSE):
+    """Lädt ``df`` über eine Staging-Tabelle nach ``tabelle``; liefert die Anzahl geänderter Zeilen."""
+    staging = f"{tabelle}_staging"
+    spalten = list(df.columns)
+    mit_wochentag = tabelle in datenzugriff.WOCHENTAG_TABELLEN and "wochentag" in spalten
+
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(datenzugriff.VERSIONSTABELLE_DDL)
+        if mit_wochentag:
+            datenzugriff.wochentag_int_ergaenzen(cursor, tabelle)
+            conn.commit()
+        cursor.execute(f"DROP TABLE IF EXISTS {staging}")
+        cursor.execute(f"CREATE TABLE {staging} LIKE {tabelle}")
+
+        if load_data:
+            _lade_infile(staging, df)
+        else:
+            _lade_executemany(cursor, staging, df, batch_groesse)
+            conn.commit()
+
+        if mit_wochentag and "wochentag_int" not in spalten:
+            cursor.execute(f"UPDATE {staging} SET wochentag_int = {datenzugriff.WOCHENTAG_INT_SQL}")
+            spalten.append("wochentag_int")
+
+        segment_ids = None
+        if voll:
+            _tauschen(cursor, tabelle, staging)
+            geaendert = len(df)
+        else:
+            geaendert = _upsert(cursor, tabelle, staging, spalten, SCHLUESSEL[tabelle])
+            if geaendert and tabelle in aggregate.QUELLTABELLEN:
+                # Nach dem Upsert stehen in Staging genau die Zeilen der geänderten Schlüsselgruppen
+                cursor.execute(f"SELECT DISTINCT segment_id FROM {staging}")
+                segment_ids = [s for (s,) in cursor.fetchall() if s is not None]
+
+        if geaendert:
+            datenzugriff.version_erhoehen(cursor, tabelle)
+        conn.commit()
+        cursor.execute(f"DROP TABLE IF EXISTS {staging}")
+        cursor.close()
+
+    if geaendert and tabelle in aggregate.QUELLTABELLEN:
+        aggregate.aktualisieren(segment_ids)
+    return geaendert
+
+
+LESER = {
+    "einwohner": ("einwohner", lies_einwohner),
+    "stadtteile": ("stadtteile2", lambda pfad, trennzeichen: lies_stadtteile(pfad)),
+    "belegungsplan": ("belegungsplan", lies_tabelle),
+    "verfugbarkeit": ("verfugbarkeit", lies_tabelle),
+}
+
+
+def zuordnung_aktualisieren():
+    zugeordnet, ohne = raeumliche_zuordnung.speichere_zuordnung()
+    print(f"🗺️ Stadtteil-Zuordnung: {zugeordnet} Standorte zugeordnet, {ohne} außerhalb aller Stadtteile")
+
+
+def aggregate_neu_berechnen():
+    minuten, muster = aggregate.aktualisieren()
+    print(f"🧮 Aggregate: {minuten} Zeilen agg_minuten, {muster} Zeilen agg_muster")
+
+
+def schnappschuss_exportieren():
+    start = time.perf_counter()
+    pfad = schnappschuss.exportieren()
+    print(f"📸 Schnappschuss: {pfad} ({time.perf_counter() - start:.1f} s)")
+
+
+def wochentage_normalisieren():
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(datenzugriff.VERSIONSTABELLE_DDL)
+        for tabelle in datenzugriff.WOCHENTAG_TABELLEN:
+            geaendert = datenzugriff.wochentag_int_ergaenzen(cursor, tabelle)
+            if geaendert:
+                datenzugriff.version_erhoehen(cursor, tabelle)
+            conn.commit()
+            print(f"📅 {tabelle}: wochentag_int für {geaendert} Zeilen gesetzt")
+        cursor.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Quelldaten in die Sportstätten-Datenbank importieren.")
+    parser.add_argument("art", choices=sorted(LESER) + ["aggregate", "schnappschuss", "wochentage", "zuordnung"],
+                        help="Welche Daten importiert werden (zuordnung: nur Standorte → Stadtteile neu berechnen, "
+                             "wochentage: nur wochentag_int aus wochentag nachziehen, "
+                             "aggregate: Aggregattabellen komplett neu berechnen, "
+                             "schnappschuss: nur den Schnappschuss für die Seiten neu schreiben)")
+    parser.add_argument("datei", nargs="?", help="Pfad zur CSV- bzw. Shapefile-Datei")
+    parser.add_argument("--voll", action="store_true",
+                        help="Tabelle komplett ersetzen (atomarer Tausch) statt inkrementell upserten")
+    parser.add_argument("--load-data", action="store_true",
+                        help="LOAD DATA LOCAL INFILE statt executemany verwenden")
+    parser.add_argument("--batch", type=int, default=BATCH_GROESSE, help="Zeilen pro executemany-Batch")
+    parser.add_argument("--trennzeichen", default=";", help="Feldtrenner der CSV-Datei")
+    args = parser.parse_args(argv)
+    if args.art == "schnappschuss" and not schnappschuss.VERZEICHNIS:
+        parser.error("DATEN_SCHNAPPSCHUSS ist nicht gesetzt")
+
+    if args.art == "zuordnung":
+        zuordnung_aktualisieren()
+    elif args.art == "wochentage":
+        wochentage_normalisieren()
+    elif args.art == "aggregate":
+        aggregate_neu_berechnen()
+    elif args.art != "schnappschuss":
+        if args.datei is None:
+            parser.error("für diesen Import wird eine Datei benötigt")
+
+        tabelle, leser = LESER[args.art]
+        start = time.perf_counter()
+        df = leser(args.datei, trennzeichen=args.trennzeichen)
+        geaendert = importiere(tabelle, df, voll=args.voll, load_data=args.load_data, batch_groesse=args.batch)
+        dauer = time.perf_counter() - start
+        print(f"✅ {tabelle}: {len(df)} Zeilen gelesen, {geaendert} geändert ({dauer:.1f} s)")
+
+        # Neue Stadtteilgrenzen → Standorte neu zuordnen
+        if tabelle == "stadtteile2" and geaendert:
+            zuordnung_aktualisieren()
+        if not geaendert:
+            return 0
+
+    # 📸 Neuer Stand für die Seiten (unveränderte Tabellen werden nur verlinkt)
+    if schnappschuss.VERZEICHNIS:
+        schnappschuss_exportieren()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
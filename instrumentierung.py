@@ -0,0 +1,213 @@
+# instrumentierung.py
+
+"""Messpunkte für Datenbank, DataFrame-Aufbau, Modelle und Karten.
+
+Jede Etappe (``with stufe("db", "belegungsplan") as s: ...``) misst die
+Wandzeit und nimmt optional Zeilen und Bytes auf (``s["zeilen"] = ...``).
+Die Messwerte landen an drei Stellen:
+
+* in der Messung des aktuellen Reruns (``seite()`` zu Beginn einer Seite
+  startet sie) – sichtbar im Diagnose-Panel in der Sidebar, das nur mit
+  ``?diagnose=1`` in der URL oder ``DIAGNOSE_PANEL=1`` erscheint,
+* als eine JSON-Zeile pro Etappe im Logger ``instrumentierung``
+  (``INSTRUMENTIERUNG_LOG=1`` schreibt sie nach stderr),
+* in prozessweiten Summen pro (Art, Name), abrufbar über ``metriken()``.
+
+Die Messung hängt an einer ``ContextVar``; Worker-Threads, die mit
+``contextvars.copy_context()`` gestartet werden, schreiben in denselben Rerun.
+"""
+
+import contextvars
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+import pandas as pd
+
+PANEL_AN = os.environ.get("DIAGNOSE_PANEL", "0") == "1"
+MAX_DEBUG_ZEILEN = 15
+MAX_METRIKEN = 20
+
+logger = logging.getLogger("instrumentierung")
+if os.environ.get("INSTRUMENTIERUNG_LOG", "0") == "1" and not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+
+_ZEILE = "{art:<10} {name:<36.36} {ms:>10} {zeilen:>10} {bytes:>12}"
+
+_aktuell = contextvars.ContextVar("instrumentierung_messung", default=None)
+_ebene = contextvars.ContextVar("instrumentierung_ebene", default=0)
+
+
+class Messung:
+    """Alle Etappen und Debug-Tabellen eines Reruns."""
+
+    def __init__(self, seite, panel=False):
+        self.seite = seite
+        self.rerun = uuid.uuid4().hex[:8]
+        self.start = time.perf_counter()
+        self.stufen = []
+        self.debug = []
+        self.panel = None
+        self._gezeichnet = self._debug_gezeichnet = 0
+        self._lock = threading.Lock()
+        self._thread = threading.get_ident()
+        if panel:
+            import streamlit as st
+
+            # Kopfzeile als Platzhalter, darunter wächst die Liste – jede Etappe wird genau einmal gezeichnet
+            with st.sidebar.expander("🛠️ Diagnose", expanded=True):
+                self.panel = st.container()
+                self._kopf = self.panel.empty()
+                self._zeilen = self.panel.container()
+                self._zeilen.text(_ZEILE.format(art="art", name="name", ms="ms", zeilen="zeilen", bytes="bytes"))
+                self._debug = self.panel.container()
+                # Prozess-Summen einmal pro Rerun (Stand vor diesem Rerun) statt nach jeder Etappe
+                st.caption("Prozess-Metriken (seit Start, vor diesem Rerun)")
+                st.dataframe(metriken().head(MAX_METRIKEN), hide_index=True)
+
+    def hinzufuegen(self, eintrag):
+        with self._lock:
+            self.stufen.append(eintrag)
+        self.zeichnen()
+
+    def tabelle(self):
+        with self._lock:
+            stufen = list(self.stufen)
+        df = pd.DataFrame(stufen, columns=["art", "name", "ebene", "ms", "zeilen", "bytes"])
+        df["name"] = ["· " * e + n for e, n in zip(df["ebene"], df["name"])]
+        return df.drop(columns=["ebene"])
+
+    def zeichnen(self):
+        """Zeichnet nur, was seit dem letzten Aufruf dazugekommen ist (plus die Kopfzeile)."""
+        # Streamlit-Elemente nur aus dem Skript-Thread, Worker schreiben nur in die Liste
+        if self.panel is None or threading.get_ident() != self._thread:
+            return
+        import streamlit as st
+
+        with self._lock:
+            neu = self.stufen[self._gezeichnet:]
+            self._gezeichnet = len(self.stufen)
+        gesamt = (time.perf_counter() - self.start) * 1000
+        self._kopf.caption(f"Rerun {self.rerun} · {self._gezeichnet} Etappen · {gesamt:,.0f} ms bisher")
+        for eintrag in neu:
+            self._zeilen.text(_ZEILE.format(
+                art=eintrag["art"],
+                name="· " * eintrag["ebene"] + eintrag["name"],
+                ms=f"{eintrag['ms']:,.1f}",
+                zeilen="" if eintrag["zeilen"] is None else f"{eintrag['zeilen']:,}",
+                bytes="" if eintrag["bytes"] is None else f"{eintrag['bytes']:,}",
+            ))
+        with self._debug:
+            for titel, df in self.debug[self._debug_gezeichnet:]:
+                st.write(titel, df)
+        self._debug_gezeichnet = len(self.debug)
+
+
+def _panel_gewuenscht():
+    if PANEL_AN:
+        return True
+    import streamlit as st
+    from streamlit import runtime
+
+    if not runtime.exists():
+        return False  # außerhalb von Streamlit (Importer, Benchmark, Skripte)
+    return st.query_params.get("diagnose") == "1"
+
+
+def seite(name):
+    """Startet die Messung eines Reruns der Seite ``name`` (direkt nach ``st.set_page_config``)."""
+    messung = Messung(name, panel=_panel_gewuenscht())
+    _aktuell.set(messung)
+    _ebene.set(0)
+    return messung
+
+
+def aktuelle_messung():
+    return _aktuell.get()
+
+
+# 📈 Prozessweite Summen pro (Art, Name)
+_metriken = {}
+_metriken_lock = threading.Lock()
+
+
+def _verbuchen(eintrag):
+    with _metriken_lock:
+        m = _metriken.setdefault((eintrag["art"], eintrag["name"]), {
+            "anzahl": 0, "ms_summe": 0.0, "ms_max": 0.0, "zeilen": 0, "bytes": 0,
+        })
+        m["anzahl"] += 1
+        m["ms_summe"] += eintrag["ms"]
+        m["ms_max"] = max(m["ms_max"], eintrag["ms"])
+        m["zeilen"] += eintrag["zeilen"] or 0
+        m["bytes"] += eintrag["bytes"] or 0
+
+
+def metriken():
+    """Summen aller Etappen seit Prozessstart, langsamste zuerst."""
+    with _metriken_lock:
+        zeilen = [{"art": art, "name": name, **werte} for (art, name), werte in _metriken.items()]
+    df = pd.DataFrame(zeilen, columns=["art", "name", "anzahl", "ms_summe", "ms_max", "zeilen", "bytes"])
+    df["ms_mittel"] = df["ms_summe"] / df["anzahl"]
+    return df.sort_values("ms_summe", ascending=False, ignore_index=True)
+
+
+def metriken_zuruecksetzen():
+    with _metriken_lock:
+        _metriken.clear()
+
+
+@contextmanager
+def stufe(art, name, zeilen=None, bytes=None):
+    """Misst eine Etappe; im gelieferten Dict können ``zeilen`` und ``bytes`` nachgetragen werden."""
+    ebene = _ebene.get()
+    token = _ebene.set(ebene + 1)
+    eintrag = {"art": art, "name": str(name), "ebene": ebene, "ms": 0.0, "zeilen": zeilen, "bytes": bytes}
+    start = time.perf_counter()
+    try:
+        yield eintrag
+    finally:
+        eintrag["ms"] = (time.perf_counter() - start) * 1000
+        _ebene.reset(token)
+        _verbuchen(eintrag)
+        messung = _aktuell.get()
+        if messung is not None:
+            messung.hinzufuegen(eintrag)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({
+                "seite": messung.seite if messung else None,
+                "rerun": messung.rerun if messung else None,
+                **eintrag,
+                "ms": round(eintrag["ms"], 2),
+            }, default=str))
+
+
+def frame_bytes(df):
+    """Speicher der Spalten (ohne Inhalte von Python-Objekten – billig auch für große Frames)."""
+    return int(df.memory_usage(index=False).sum())
+
+
+_FROM = re.compile(r"\bFROM\s+`?(\w+)", re.IGNORECASE)
+
+
+def abfrage_name(query):
+    """Kurzname einer SQL-Abfrage für die Messung: die erste Tabelle hinter ``FROM``."""
+    treffer = _FROM.search(query)
+    return treffer.group(1) if treffer else query.split(None, 1)[0].lower()
+
+
+def debug(titel, df):
+    """Hilfstabelle für das Diagnose-Panel statt eines ``st.write`` auf der Seite."""
+    messung = _aktuell.get()
+    if messung is None or messung.panel is None:
+        return
+    messung.debug.append((titel, df.head(MAX_DEBUG_ZEILEN)))
+    messung.zeichnen()
@@ -0,0 +1,77 @@
+# karten.py
+
+"""Gemeinsames Rendering der Folium-Karten – komplett im Speicher.
+
+Statt jede Karte per ``m.save(...)`` ins Arbeitsverzeichnis zu schreiben und
+wieder einzulesen, wird das HTML direkt erzeugt und pro Schlüssel (die
+Abfrageparameter der Seite) gecacht. So gibt es weder Datei-I/O pro Rerun
+noch Konflikte, wenn zwei Sessions gleichzeitig dieselbe Karte erzeugen.
+
+Punktkarten bündeln Belegungen pro Einrichtung (``pro_einrichtung``) und
+übertragen die Marker als ein JSON-Array an ``FastMarkerCluster``
+(``marker_cluster``): Die Seitengröße wächst mit der Zahl der Hallen,
+nicht mit der Zahl der Belegungen, und der Browser clustert selbst.
+"""
+
+from folium.plugins import FastMarkerCluster
+import streamlit.components.v1 as components
+
+import datenzugriff
+import instrumentierung
+
+MAX_KARTEN = 64
+
+# Eigener, größenbegrenzter Cache: gerenderte Karten sind groß, es gibt viele Parameterkombinationen
+cache = datenzugriff.VersionierterCache(max_eintraege=MAX_KARTEN)
+
+
+# 📍 Ein Marker pro Einrichtung: [lat, lon, popup, farbe] je Zeile, im Browser zu Markern gemacht
+MARKER_CALLBACK = """
+function (zeile) {
+    var marker = L.circleMarker(new L.LatLng(zeile[0], zeile[1]), {
+        radius: 8, color: zeile[3], fillColor: zeile[3], fill: true, fillOpacity: 0.7
+    });
+    marker.bindPopup(zeile[2]);
+    return marker;
+}
+"""
+
+
+def pro_einrichtung(belegungen):
+    """``belegungen`` (mit ``segment_id``) plus Einrichtung und deren Standort; Belegungen ohne Standort fallen weg."""
+    segmente, orte = datenzugriff.gleichzeitig(datenzugriff.segmente, datenzugriff.einrichtung_standorte)
+    zuordnung = segmente[["id", "einrichtung_id"]].rename(columns={"id": "segment_id"})
+    return belegungen.merge(zuordnung, on="segment_id").merge(orte, on="einrichtung_id")
+
+
+def marker_cluster(punkte):
+    """``FastMarkerCluster`` aus ``punkte`` (Spalten ``breitengrad``, ``laengengrad``, ``popup``, ``farbe``)."""
+    daten = punkte[["breitengrad", "laengengrad", "popup", "farbe"]].to_numpy().tolist()
+    return FastMarkerCluster(
+        daten, callback=MARKER_CALLBACK, options={"disableClusteringAtZoom": 15, "spiderfyOnMaxZoom": False},
+    )
+
+
+def karte_html(m):
+    """Vollständiges HTML-Dokument einer Folium-Karte (wie ``m.save``, nur ohne Datei)."""
+    with instrumentierung.stufe("karte", "rendern") as messung:
+        html = m.get_root().render()
+        messung["bytes"] = len(html)
+    return html
+
+
+def gerenderte_karte(schluessel, baue_karte, tabellen=()):
+    """HTML zur Karte ``schluessel``; ``baue_karte()`` läuft nur bei einem Cache-Miss.
+
+    ``tabellen`` sind die Tabellen, aus denen die Karte entsteht – ändert der
+    Importer eine davon, wird die Karte neu gerendert.
+    """
+    return cache.hole(schluessel, lambda: karte_html(baue_karte()), tabellen=tabellen)
+
+
+def zeige_karte(schluessel, baue_karte, tabellen=(), height=600):
+    """Rendert (oder holt aus dem Cache) und bettet die Karte in die Seite ein."""
+    with instrumentierung.stufe("karte", schluessel[0]) as messung:
+        html = gerenderte_karte(schluessel, baue_karte, tabellen)
+        messung["bytes"] = len(html)
+        components.html(html, height=height)
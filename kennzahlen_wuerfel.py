@@ -0,0 +1,134 @@
+# kennzahlen_wuerfel.py
+
+"""Kennzahlenwürfel Stadtteil × Jahr für die Auslastungs-Heatmap.
+
+Einmal pro Datenstand werden die Aggregate (``agg_minuten``, ``agg_muster``)
+und die Einwohnerzahlen aller Jahre auf die Stadtteil-IDs abgebildet und als
+Arrays abgelegt – die Namensnormalisierung der Einwohnerdaten passiert dabei
+genau einmal. Jahreswechsel oder eine Aufschlüsselung nach Wochentag bzw.
+Bereich sind danach nur noch Array-Zugriffe über die Stadtteile, ohne SQL
+und ohne Merge.
+
+* ``belegte_minuten``: Stadtteil × Wochentag aus ``agg_minuten``
+  (überlappende Belegungen eines Segments zählen einmal).
+* ``bevoelkerung``: Stadtteil × Jahr, ``NaN`` ohne Einwohnerdaten.
+* Bereich: Stadtteil × Bereich aus ``agg_muster`` (Anzahl × Dauer, also
+  gebuchte Minuten – Überlappungen zählen mehrfach). Diese Dimension wird
+  erst beim ersten Zugriff auf den Würfel gebaut und bleibt an ihm hängen,
+  damit der Kaltstart der Gesamtansicht ``agg_muster`` nicht laden muss.
+"""
+
+import re
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+import aggregate
+import datenzugriff
+
+TABELLEN = (
+    "agg_minuten", "agg_muster", *aggregate.QUELLTABELLEN, "segmente", "adressen", "geodaten",
+    "geodaten_stadtteil", "stadtteile2", "einwohner",
+)
+
+
+def stadtteil_name(name):
+    """Stadtteilname ohne vorangestellte Nummer (``"11 Aaseestadt"`` → ``"Aaseestadt"``)."""
+    return re.sub(r"^\d+\s*", "", str(name)).strip()
+
+
+class Wuerfel:
+    """Kennzahlen je Stadtteil (Zeilen in der Reihenfolge von ``stadtteil_ids``)."""
+
+    def __init__(self, stadtteile, minuten, einwohner):
+        self.stadtteil_ids = stadtteile["id"].to_numpy()
+        self.namen = stadtteile["name"].map(stadtteil_name).to_numpy(dtype=object)
+        self.zeile = zeile = pd.Series(np.arange(len(self.stadtteil_ids)), index=self.stadtteil_ids)
+
+        minuten = minuten[minuten["stadtteil_id"].isin(zeile.index)]
+        minuten_zeile = zeile[minuten["stadtteil_id"].astype(np.int64)].to_numpy()
+        self.belegte_minuten = np.zeros((len(zeile), 7))
+        np.add.at(
+            self.belegte_minuten,
+            (minuten_zeile, minuten["tag"].to_numpy(dtype=np.intp)),
+            minuten["belegte_minuten"].to_numpy(dtype=np.float64),
+        )
+        # Stadtteile ganz ohne Segmente haben keine Daten (statt 0 Minuten)
+        self.vorhanden = np.zeros(len(zeile), dtype=bool)
+        self.vorhanden[minuten_zeile] = True
+
+        self.jahre = sorted(int(j) for j in einwohner["jahr"].dropna().unique())
+        zeile_nach_name = pd.Series(np.arange(len(self.namen)), index=self.namen)
+        zeile_nach_name = zeile_nach_name[~zeile_nach_name.index.duplicated()]
+        einwohner = einwohner.assign(name=einwohner["stadtteil"].map(stadtteil_name))
+        einwohner = einwohner[einwohner["name"].isin(zeile_nach_name.index) & einwohner["jahr"].isin(self.jahre)]
+        self.bevoelkerung = np.full((len(zeile), len(self.jahre)), np.nan)
+        self.bevoelkerung[
+            zeile_nach_name[einwohner["name"]].to_numpy(),
+            np.searchsorted(self.jahre, einwohner["jahr"].to_numpy()),
+        ] = einwohner["bevoelkerung"].to_numpy(dtype=np.float64)
+
+    @cached_property
+    def nach_bereich(self):
+        """(Bereiche, Minuten Stadtteil × Bereich) – beim ersten Zugriff aus ``agg_muster``."""
+        df = aggregate.nutzungsminuten_pro("stadtteil_id", "bereich")
+        df = df[df["stadtteil_id"].isin(self.zeile.index) & (df["bereich"].astype(str) != "")]
+        namen = df["bereich"].astype(str).to_numpy()
+        bereiche = sorted(set(namen))
+        minuten = np.zeros((len(self.stadtteil_ids), len(bereiche)))
+        np.add.at(
+            minuten,
+            (self.zeile[df["stadtteil_id"].astype(np.int64)].to_numpy(), np.searchsorted(bereiche, namen)),
+            df["minuten"].to_numpy(dtype=np.float64),
+        )
+        return bereiche, minuten
+
+    @property
+    def bereiche(self):
+        return self.nach_bereich[0]
+
+    def minuten(self, tag=None, bereich=None):
+        """Minuten je Stadtteil: gesamt, an Wochentag ``tag`` (0 = Mo) oder im Bereich ``bereich``."""
+        if bereich is not None:
+            bereiche, minuten = self.nach_bereich
+            if bereich not in bereiche:
+                return np.zeros(len(self.stadtteil_ids))
+            return minuten[:, bereiche.index(bereich)]
+        if tag is not None:
+            return self.belegte_minuten[:, tag]
+        return self.belegte_minuten.sum(axis=1)
+
+    def einwohner(self, jahr):
+        if jahr not in self.jahre:
+            return np.full(len(self.stadtteil_ids), np.nan)
+        return self.bevoelkerung[:, self.jahre.index(jahr)]
+
+    def kennzahlen(self, jahr, tag=None, bereich=None):
+        """``name``, ``belegte_minuten``, ``bevoelkerung``, ``minuten_pro_1000`` je Stadtteil-ID.
+
+        Stadtteile ohne Segmente haben ``NaN`` Minuten, ohne Einwohnerdaten
+        ``NaN`` Bevölkerung.
+        """
+        minuten = np.where(self.vorhanden, self.minuten(tag, bereich), np.nan)
+        bevoelkerung = self.einwohner(jahr)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pro_1000 = minuten / (bevoelkerung / 1000)
+        return pd.DataFrame({
+            "name": self.namen,
+            "belegte_minuten": minuten,
+            "bevoelkerung": bevoelkerung,
+            "minuten_pro_1000": pro_1000,
+        }, index=pd.Index(self.stadtteil_ids, name="id"))
+
+
+def _baue():
+    stadtteile, minuten, einwohner = datenzugriff.gleichzeitig(
+        datenzugriff.stadtteile, lambda: aggregate.minuten_pro("stadtteil_id", "tag"), datenzugriff.einwohner,
+    )
+    return Wuerfel(stadtteile, minuten, einwohner)
+
+
+def wuerfel():
+    """Gecachter ``Wuerfel`` zum aktuellen Datenstand."""
+    return datenzugriff.cache.hole(("wuerfel", "stadtteil_jahr"), _baue, tabellen=TABELLEN)
@@ -1,79 +1,53 @@
 import streamlit as st
 import pandas as pd
-import mysql.connector
 import sys, os
 
-# 🔄 DB Connection importieren
+# 🔄 Datenzugriff importieren
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from db import get_db_connection
+import datenzugriff
+import auslastung
+import instrumentierung
 
 st.set_page_config(page_title="Auslastungsanalyse", layout="wide")
+instrumentierung.seite("Auslastungsanalyse")
 st.title("Auslastungs-Analyse pro Halle")
 
 # 📅 Auswahl für Wochentag oder "Alle"
-wochentage = ["Alle", "Montag", "Dienstag", "Mittwoch", "Donnerstag", "Freitag", "Samstag", "Sonntag"]
+wochentage = ["Alle"] + datenzugriff.WOCHENTAGE
 auswahl_tag = st.selectbox("Wochentag auswählen", wochentage)
 
-# 🔍 Daten laden
-def lade_auslastung(wochentag=None):
-    db = get_db_connection()
-    cursor = db.cursor(dictionary=True)
+# 🏟️ Optional auf einzelne Hallen einschränken
+einrichtungen = datenzugriff.einrichtungen()[["id", "name"]]
+namen = dict(zip(einrichtungen["id"], einrichtungen["name"]))
+auswahl_hallen = st.multiselect("Hallen filtern (leer = alle)", list(namen), format_func=namen.get)
 
-    # SQL: Summiere Dauer aus belegungsplan
-    query = """
-        SELECT e.id AS einrichtung_id, e.name,
-               b.wochentag,
-               SUM(TIME_TO_SEC(b.dauer))/60 AS belegte_minuten
-        FROM belegungsplan b
-        JOIN segmente s ON b.segment_id = s.id
-        JOIN einrichtungen e ON s.einrichtung_id = e.id
-        GROUP BY e.id, b.wochentag
-    """
-    cursor.execute(query)
-    belegung = cursor.fetchall()
+# 🔍 Wochentag- und Hallenfilter gehen direkt in die Abfrage der Auslastungs-Engine
+def lade_auslastung(wochentag=None, einrichtung_ids=None):
+    tage = None if not wochentag or wochentag == "Alle" else [datenzugriff.WOCHENTAG_NR[wochentag]]
+    ergebnis = auslastung.berechne(tage, einrichtung_ids or None)
+    df = ergebnis.pro_einrichtung_tag()
 
-    # SQL: Summiere verfügbare Zeit aus verfugbarkeit
-    query2 = """
-        SELECT e.id AS einrichtung_id, e.name,
-               v.wochentag,
-               SUM(TIME_TO_SEC(TIMEDIFF(v.ende, v.start)))/60 AS verfuegbare_minuten
-        FROM verfugbarkeit v
-        JOIN segmente s ON v.segment_id = s.id
-        JOIN einrichtungen e ON s.einrichtung_id = e.id
-        GROUP BY e.id, v.wochentag
-    """
-    cursor.execute(query2)
-    verfuegbarkeit = cursor.fetchall()
+    # 🐛 Hilfstabellen nur im Diagnose-Panel (?diagnose=1)
+    instrumentierung.debug("Belegung", df[["einrichtung_id", "tag", "belegte_minuten"]])
+    instrumentierung.debug("Verfügbarkeit", df[["einrichtung_id", "tag", "verfuegbare_minuten"]])
 
-    db.close()
+    # Nur Tage mit Belegung und Verfügbarkeit (wie der frühere Inner Join)
+    df = df[(df["belegte_minuten"] > 0) & (df["verfuegbare_minuten"] > 0)]
+    df = df.merge(einrichtungen, left_on="einrichtung_id", right_on="id")
+    df["wochentag"] = [datenzugriff.WOCHENTAGE[t] for t in df["tag"]]
 
-    df_belegung = pd.DataFrame(belegung)
-    df_verf = pd.DataFrame(verfuegbarkeit)
-
-    st.write("Belegung", df_belegung.head())
-    st.write("Verfügbarkeit", df_verf.head())
-
-    map_kurz_zu_lang = {
-    "Mo": "Montag", "Di": "Dienstag", "Mi": "Mittwoch",
-    "Do": "Donnerstag", "Fr": "Freitag", "Sa": "Samstag", "So": "Sonntag"
-    }
-
-    df_belegung["wochentag"] = df_belegung["wochentag"].replace(map_kurz_zu_lang)
-
-    # Merge
-    df = pd.merge(df_belegung, df_verf, on=["einrichtung_id", "name", "wochentag"])
-    df["auslastung_%"] = (df["belegte_minuten"] / df["verfuegbare_minuten"]) * 100
-
-    if wochentag and wochentag != "Alle":
-        df = df[df["wochentag"] == wochentag]
-
-    return df
+    return ergebnis, df[["einrichtung_id", "name", "wochentag", "belegte_minuten", "verfuegbare_minuten", "auslastung_%"]]
 
 # Daten anzeigen
-df = lade_auslastung(auswahl_tag)
+ergebnis, df = lade_auslastung(auswahl_tag, auswahl_hallen)
 st.dataframe(df)
 
 #Ranking
-ranking = df.groupby("name")["auslastung_%"].mean().sort_values(ascending=False)
-st.subheader("Ranking der Hallen (Durchschnitt über alle Tage)")
+ranking = ergebnis.pro_einrichtung().merge(einrichtungen, left_on="einrichtung_id", right_on="id")
+ranking = ranking.dropna(subset=["auslastung_%"]).set_index("name")["auslastung_%"].sort_values(ascending=False)
+st.subheader("Ranking der Hallen (über die gewählten Tage)")
 st.bar_chart(ranking)
+
+# ⏰ Tagesverlauf
+st.subheader("Auslastung nach Uhrzeit")
+st.bar_chart(ergebnis.pro_stunde().set_index("stunde")["auslastung_%"])
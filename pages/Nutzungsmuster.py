@@ -1,17 +1,16 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import mysql.connector
 import sys, os
-from sklearn.preprocessing import StandardScaler
-from sklearn.cluster import KMeans
-import altair as alt
 
-# 🔄 DB Connection importieren
+# 🔄 Clusterdienst importieren
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from db import get_db_connection
+import clusterdienst
+import diagramme
+import instrumentierung
 
 st.set_page_config(page_title="Clusteranalyse", layout="wide")
+instrumentierung.seite("Nutzungsmuster")
 st.title("Clusteranalyse der Hallennutzung")
 
 st.markdown("""
@@ -21,55 +20,29 @@ Diese Analyse zeigt **ähnliche Nutzungsmuster** von Hallen-Segmenten.
 - **Farbe:** Cluster mit ähnlichem Verhalten
 """)
 
-#Daten laden
-def lade_nutzungsdaten():
-    db = get_db_connection()
-    cursor = db.cursor(dictionary=True)
+# Clustering für alle k wird einmal pro Datenstand gerechnet (clusterdienst)
+clusterung = clusterdienst.clustering("nutzung")
 
-    query = """
-        SELECT b.segment_id,
-               b.wochentag,
-               TIME_TO_SEC(b.start)/3600 AS start_stunde,
-               TIME_TO_SEC(b.dauer)/60 AS dauer_minuten,
-               b.bereich
-        FROM belegungsplan b
-    """
-    cursor.execute(query)
-    daten = cursor.fetchall()
-    db.close()
-    return pd.DataFrame(daten)
-
-df = lade_nutzungsdaten()
-
-if df.empty:
+if clusterung.frame.empty:
     st.warning("Keine Daten für die Clusteranalyse gefunden.")
     st.stop()
 
-# 🔧 Sicherstellen, dass numerische Spalten floats sind
-df["start_stunde"] = df["start_stunde"].astype(float)
-df["dauer_minuten"] = df["dauer_minuten"].astype(float)
-
-# Bereich in numerischen Wert umwandeln
-df["bereich_code"] = df["bereich"].astype("category").cat.codes
-
-# Features für Clustering
-features = df[["start_stunde", "dauer_minuten", "bereich_code"]]
-
-# Normalisieren
-scaler = StandardScaler()
-X_scaled = scaler.fit_transform(features)
+if not clusterung.k_werte:
+    st.warning("Zu wenige Nutzungsmuster für eine Clusteranalyse.")
+    st.stop()
 
-# Clusteranzahl wählbar
-k = st.slider("Anzahl der Cluster (k)", 2, 6, 4)
+# Clusteranzahl wählbar (nur k, für die es genug Muster gibt)
+k_min, k_max = clusterung.k_werte[0], min(6, clusterung.k_werte[-1])
+k = st.slider("Anzahl der Cluster (k)", k_min, k_max, min(4, k_max)) if k_max > k_min else k_min
 
-# KMeans anwenden
-kmeans = KMeans(n_clusters=k, random_state=42, n_init=10)
-df["cluster"] = kmeans.fit_predict(X_scaled)
+df = clusterung.frame.copy(deep=False)
+df["cluster"] = clusterung.labels(k)
 
-# Labels für Cluster automatisch basierend auf Mittelwert der Startzeit
+# Labels für Cluster automatisch basierend auf Mittelwert der Startzeit (gewichtet mit der Anzahl Belegungen)
 cluster_labels = {}
 for c in df["cluster"].unique():
-    avg_start = df[df["cluster"] == c]["start_stunde"].mean()
+    im_cluster = df[df["cluster"] == c]
+    avg_start = np.average(im_cluster["start_stunde"], weights=im_cluster["anzahl"])
     if avg_start < 12:
         cluster_labels[c] = "Vormittags-Nutzung"
     elif avg_start < 17:
@@ -81,21 +54,23 @@ df["cluster_label"] = df["cluster"].map(cluster_labels)
 
 # Tabelle mit Erklärung
 st.subheader("📋 Daten mit Clusterzuordnung")
-st.dataframe(df[["segment_id", "wochentag", "start_stunde", "dauer_minuten", "bereich", "cluster_label"]].head(50))
+st.dataframe(df[["wochentag", "start_stunde", "dauer_minuten", "bereich", "anzahl", "cluster_label"]].head(50))
 
 # Visualisierung
 st.subheader("⏱️ Cluster-Visualisierung")
-chart = alt.Chart(df).mark_circle(size=70).encode(
-    x=alt.X("start_stunde", title="Startzeit (Stunden)"),
-    y=alt.Y("dauer_minuten", title="Dauer (Minuten)"),
-    color=alt.Color("cluster_label", title="Cluster"),
-    tooltip=["wochentag", "bereich", "start_stunde", "dauer_minuten", "cluster_label"]
-).interactive()
-
+modus = st.radio("Darstellung", list(diagramme.MODI), format_func=diagramme.MODI.get, horizontal=True)
+chart, marks = diagramme.streudiagramm(
+    df, "start_stunde", "dauer_minuten", "cluster_label",
+    titel={"start_stunde": "Startzeit (Stunden)", "dauer_minuten": "Dauer (Minuten)", "cluster_label": "Cluster"},
+    tooltip=["wochentag", "bereich", "start_stunde", "dauer_minuten", "anzahl", "cluster_label"],
+    modus=modus,
+    gewicht="anzahl",
+)
+st.caption(f"{marks} Punkte für {df['anzahl'].sum()} Belegungen")
 st.altair_chart(chart, use_container_width=True)
 
 # Clustergrößen
 st.subheader("📊 Clustergrößen")
-cluster_counts = df["cluster_label"].value_counts().reset_index()
+cluster_counts = df.groupby("cluster_label")["anzahl"].sum().reset_index()
 cluster_counts.columns = ["Cluster", "Anzahl"]
 st.bar_chart(cluster_counts.set_index("Cluster"))
@@ -2,15 +2,15 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import sys, os
-from sklearn.preprocessing import StandardScaler
-from sklearn.cluster import KMeans
-import altair as alt
 
-# 🔄 DB Connection importieren
+# 🔄 Clusterdienst importieren
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from db import get_db_connection
+import clusterdienst
+import diagramme
+import instrumentierung
 
 st.set_page_config(page_title="Clusteranalyse Sportarten", layout="wide")
+instrumentierung.seite("Nutzungsmuster_Sportarten")
 st.title("🤾‍♂️ Clusteranalyse der Sportarten-Nutzungsmuster")
 
 st.markdown("""
@@ -27,51 +27,26 @@ st.markdown("""
 - **Y-Achse:** Dauer der Nutzung in Minuten  
 """)
 
-# 📥 Daten laden
-def lade_sportdaten():
-    db = get_db_connection()
-    cursor = db.cursor(dictionary=True)
+# 📥 Clustering für alle k einmal pro Datenstand (clusterdienst)
+clusterung = clusterdienst.clustering("sportarten")
 
-    query = """
-        SELECT b.taetigkeit,
-               b.wochentag_int,
-               TIME_TO_SEC(b.start)/3600 AS start_stunde,
-               TIME_TO_SEC(b.dauer)/60 AS dauer_minuten,
-               b.bereich
-        FROM belegungsplan b
-        WHERE b.taetigkeit IS NOT NULL AND b.taetigkeit <> ''
-    """
-    cursor.execute(query)
-    daten = cursor.fetchall()
-    db.close()
-    return pd.DataFrame(daten)
-
-df = lade_sportdaten()
-
-if df.empty:
+if clusterung.frame.empty:
     st.warning("Keine Daten mit Sportarten gefunden.")
     st.stop()
 
-# 🔧 Werte konvertieren
-df["start_stunde"] = df["start_stunde"].astype(float)
-df["dauer_minuten"] = df["dauer_minuten"].astype(float)
-
-# 🔄 Sportarten in Codes umwandeln
-df["sportart_code"] = df["taetigkeit"].astype("category").cat.codes
-
-# 📊 Features für Clustering
-features = df[["sportart_code", "wochentag_int", "start_stunde", "dauer_minuten"]]
-
-# 🔧 Normalisieren
-scaler = StandardScaler()
-X_scaled = scaler.fit_transform(features)
+if not clusterung.k_werte:
+    st.warning("Zu wenige Nutzungsmuster mit Sportarten für eine Clusteranalyse.")
+    st.stop()
 
-# 📌 Clusteranzahl
-k = st.slider("Anzahl der Cluster (k)", 2, 8, 4, help="Wie viele Gruppen sollen gebildet werden?")
+# 📌 Clusteranzahl (nur k, für die es genug Muster gibt)
+k_min, k_max = clusterung.k_werte[0], min(8, clusterung.k_werte[-1])
+k = (
+    st.slider("Anzahl der Cluster (k)", k_min, k_max, min(4, k_max), help="Wie viele Gruppen sollen gebildet werden?")
+    if k_max > k_min else k_min
+)
 
-# 🤖 KMeans
-kmeans = KMeans(n_clusters=k, random_state=42, n_init=10)
-df["cluster"] = kmeans.fit_predict(X_scaled)
+df = clusterung.frame.copy(deep=False)
+df["cluster"] = clusterung.labels(k)
 
 # 📋 Übersicht der Sportarten pro Cluster
 st.subheader("📋 Übersicht: Welche Sportarten gehören zu welchem Cluster?")
@@ -83,17 +58,20 @@ for cluster_id, sportarten in cluster_groups.items():
 
 # 📈 Visualisierung
 st.subheader("⏱️ Visualisierung der Cluster (Startzeit vs. Dauer)")
-chart = alt.Chart(df).mark_circle(size=70).encode(
-    x=alt.X("start_stunde:Q", title="Startzeit der Nutzung (Stunden)"),
-    y=alt.Y("dauer_minuten:Q", title="Dauer der Nutzung (Minuten)"),
-    color=alt.Color("cluster:N", title="Cluster"),
-    tooltip=["taetigkeit", "wochentag_int", "start_stunde", "dauer_minuten", "cluster"]
-).interactive()
-
+modus = st.radio("Darstellung", list(diagramme.MODI), format_func=diagramme.MODI.get, horizontal=True)
+chart, marks = diagramme.streudiagramm(
+    df, "start_stunde", "dauer_minuten", "cluster",
+    titel={"start_stunde": "Startzeit der Nutzung (Stunden)", "dauer_minuten": "Dauer der Nutzung (Minuten)",
+           "cluster": "Cluster"},
+    tooltip=["taetigkeit", "wochentag", "start_stunde", "dauer_minuten", "anzahl", "cluster"],
+    modus=modus,
+    gewicht="anzahl",
+)
+st.caption(f"{marks} Punkte für {df['anzahl'].sum()} Belegungen")
 st.altair_chart(chart, use_container_width=True)
 
 # 📊 Verteilung der Cluster
 st.subheader("📊 Wie viele Belegungen pro Cluster?")
-cluster_counts = df["cluster"].value_counts().reset_index()
+cluster_counts = df.groupby("cluster")["anzahl"].sum().reset_index()
 cluster_counts.columns = ["Cluster", "Anzahl Belegungen"]
 st.bar_chart(cluster_counts.set_index("Cluster"))
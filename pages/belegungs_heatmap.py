@@ -1,26 +1,35 @@
 import streamlit as st
 import folium
-from folium.plugins import HeatMap
+from folium.plugins import HeatMap, HeatMapWithTime
 from datetime import datetime, timedelta, time
-import streamlit.components.v1 as components
 import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from db import get_db_connection  # 🔄 zentrale Verbindungsfunktion
+import datenzugriff
+import belegungsindex  # 🔄 In-Memory-Index statt SQL pro Sliderschritt
+import belegungsverlauf
+import karten
+import instrumentierung
 
 # Seiteneinstellungen
 st.set_page_config(page_title="Belegungs-Heatmap", layout="wide")
+instrumentierung.seite("belegungs_heatmap")
 st.title("Belegungsdichte – Heatmap")
 
 # Auswahl des Wochentags
 wochentag_anzeige = st.selectbox("Wochentag auswählen", [
     "Montag", "Dienstag", "Mittwoch", "Donnerstag", "Freitag", "Samstag", "Sonntag"
 ])
-wochentag_map = {
-    "Montag": "Mo", "Dienstag": "Di", "Mittwoch": "Mi",
-    "Donnerstag": "Do", "Freitag": "Fr", "Samstag": "Sa", "Sonntag": "So"
-}
-wochentag_sql = wochentag_map[wochentag_anzeige]
+wochentag_nr = datenzugriff.WOCHENTAG_NR[wochentag_anzeige]
+
+# ⚖️ Ein Punkt pro Einrichtung, gewichtet nach aktiven Segmenten oder belegter Fläche
+gewicht = st.radio(
+    "Gewichtung", list(belegungsverlauf.GEWICHTE),
+    format_func=belegungsverlauf.GEWICHTE.get, horizontal=True,
+)
+
+# ⏯️ Ganzer Tag: alle Viertelstunden als eine animierte Ebene, Abspielen im Browser
+ganzer_tag = st.toggle("Ganzen Tag abspielen (06:00–22:00)")
 
 # Zeitslider (zwischen 06:00 und 22:00 Uhr)
 slider_value = st.slider(
@@ -28,43 +37,51 @@ slider_value = st.slider(
     min_value=time(6, 0),
     max_value=time(22, 0),
     value=time(16, 0),
-    step=timedelta(minutes=15)
+    step=timedelta(minutes=15),
+    disabled=ganzer_tag,
 )
-zeit_str = slider_value.strftime("%H:%M:%S")
-
-# 📥 Belegungsdaten abrufen
-def lade_belegungsdichte(wochentag, zeit):
-    db = get_db_connection()  # ✅ Verwendung der zentralen Funktion
-    cursor = db.cursor(dictionary=True)
+minute = slider_value.hour * 60 + slider_value.minute
 
-    query = """
-        SELECT g.breitengrad, g.laengengrad
-        FROM belegungsplan b
-        JOIN segmente s ON b.segment_id = s.id
-        JOIN adressen a ON s.einrichtung_id = a.einrichtung_id
-        JOIN geodaten g ON a.id = g.adressen_id
-        WHERE b.wochentag = %s
-          AND b.start <= %s
-          AND b.ende > %s
-    """
-    cursor.execute(query, (wochentag, zeit, zeit))
-    daten = cursor.fetchall()
-    cursor.close()
-    db.close()
-    return daten
+# 📥 Belegungsdaten abrufen (Stichabfrage im Belegungsindex, ein Punkt pro Einrichtung)
+def lade_belegungsdichte(wochentag, minute, gewicht):
+    belegt = belegungsindex.belegte_segmente(wochentag, minute)
+    return belegungsverlauf.heatpunkte(belegt, gewicht)
 
 # 🗺️ Heatmap anzeigen
-def zeige_heatmap_aggregiert(punkte):
+def baue_heatmap_aggregiert(punkte):
     m = folium.Map(location=[51.9607, 7.6261], zoom_start=12)
-    heat_data = [[p['breitengrad'], p['laengengrad']] for p in punkte]
+    # Gewichte auf 0..1 normieren, sonst sättigt leaflet.heat ab Gewicht 1
+    heat_data = punkte[["breitengrad", "laengengrad"]].assign(
+        gewicht=punkte["gewicht"] / punkte["gewicht"].max()
+    ).round(6).to_numpy().tolist()
 
     HeatMap(heat_data, radius=20, blur=15, max_zoom=13).add_to(m)
-    m.save("heatmap.html")
-    components.html(open("heatmap.html", "r", encoding="utf-8").read(), height=600)
+    return m
+
+# 🎞️ Alle Frames des Tages in einer HeatMapWithTime-Ebene
+def baue_heatmap_tag(verlauf):
+    m = folium.Map(location=[51.9607, 7.6261], zoom_start=12)
+    HeatMapWithTime(
+        verlauf.heatmap_frames(), index=verlauf.zeiten, radius=20, max_opacity=0.8, auto_play=True,
+    ).add_to(m)
+    return m
 
 # 🚀 Karte anzeigen
-daten = lade_belegungsdichte(wochentag_sql, zeit_str)
-if daten:
-    zeige_heatmap_aggregiert(daten)
+if ganzer_tag:
+    verlauf = belegungsverlauf.tagesverlauf(wochentag_nr, gewicht=gewicht)
+    karten.zeige_karte(
+        ("belegungs_heatmap_tag", wochentag_nr, gewicht),
+        lambda: baue_heatmap_tag(verlauf),
+        tabellen=("belegungsplan", "segmente", "adressen", "geodaten"),
+    )
+    st.stop()
+
+daten = lade_belegungsdichte(wochentag_nr, minute, gewicht)
+if not daten.empty:
+    karten.zeige_karte(
+        ("belegungs_heatmap", wochentag_nr, minute, gewicht),
+        lambda: baue_heatmap_aggregiert(daten),
+        tabellen=("belegungsplan", "segmente", "adressen", "geodaten"),
+    )
 else:
     st.info("Keine belegten Einrichtungen zum gewählten Zeitpunkt gefunden.")
@@ -1,14 +1,19 @@
 import streamlit as st
 import folium
-import streamlit.components.v1 as components
+import numpy as np
 from datetime import time
 import sys, os
 
 # 🔄 Zugriff auf db.py im Projekt-Hauptverzeichnis
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from db import get_db_connection
+import datenzugriff
+import belegungsindex
+import freie_fenster
+import karten
+import instrumentierung
 
 st.set_page_config(page_title="Freie Hallen", layout="wide")
+instrumentierung.seite("freie_hallen")
 st.title("Freie Hallen anzeigen")
 
 # 📅 UI: Wochentag, Uhrzeit & Segmentfilter
@@ -18,81 +23,51 @@ wochentag_anzeige = st.selectbox("Wochentag auswählen", [
 uhrzeit = st.time_input("Uhrzeit auswählen", value=time(16, 0))
 segment_filter = st.selectbox("Nur Hallen mit wie vielen Segmenten?", [1, 2, 3, 4])
 
-# 🔄 Doppelte Mapping-Lösung (wegen „Montag“ vs „Mo“)
-wochentag_map_verfugbarkeit = {
-    "Montag": "Montag", "Dienstag": "Dienstag", "Mittwoch": "Mittwoch",
-    "Donnerstag": "Donnerstag", "Freitag": "Freitag", "Samstag": "Samstag", "Sonntag": "Sonntag"
-}
-wochentag_map_belegung = {
-    "Montag": "Mo", "Dienstag": "Di", "Mittwoch": "Mi",
-    "Donnerstag": "Do", "Freitag": "Fr", "Samstag": "Sa", "Sonntag": "So"
-}
-
-v_tag = wochentag_map_verfugbarkeit[wochentag_anzeige]
-b_tag = wochentag_map_belegung[wochentag_anzeige]
-
-def get_freie_einrichtungen(wochentag_v, wochentag_b, uhrzeit, segmentanzahl):
-    db = get_db_connection()
-    cursor = db.cursor(dictionary=True)
-    zeit_str = uhrzeit.strftime("%H:%M:%S")
-
-    query = """
-        SELECT 
-            e.id AS einrichtung_id,
-            e.name,
-            e.typ,
-            COUNT(DISTINCT s.id) AS verfuegbare_segmente
-        FROM einrichtungen e
-        JOIN segmente s ON s.einrichtung_id = e.id
-        JOIN verfugbarkeit v ON v.segment_id = s.id
-        WHERE v.wochentag = %s
-          AND v.start <= %s
-          AND v.ende > %s
-          AND NOT EXISTS (
-              SELECT 1 FROM belegungsplan b
-              JOIN segmente s2 ON b.segment_id = s2.id
-              WHERE b.segment_id = s.id
-                AND b.wochentag = %s
-                AND b.start <= %s
-                AND b.ende > %s
-                AND s2.name = 'Gesamtspielfläche'
-          )
-        GROUP BY e.id
-        HAVING COUNT(DISTINCT s.id) = %s
-    """
-    params = (wochentag_v, zeit_str, zeit_str, wochentag_b, zeit_str, zeit_str, segmentanzahl)
-    print("DEBUG PARAMS:", params)
-    cursor.execute(query, params)
-    freie = cursor.fetchall()
-    cursor.close()
-    db.close()
-    return freie
-
-
-# 📍 Geodaten & Adressinfos laden
-def lade_geodaten_infos(einrichtung_ids):
+# 🔄 Ein Wochentag-Schlüssel für belegungsplan („Mo“) und verfugbarkeit („Montag“)
+wochentag_nr = datenzugriff.WOCHENTAG_NR[wochentag_anzeige]
+
+# 🔍 Freie Einrichtungen per Stichabfrage in den Intervallindizes
+def get_freie_einrichtungen(wochentag, uhrzeit, segmentanzahl):
+    minute = uhrzeit.hour * 60 + uhrzeit.minute
+
+    # ⚡ Unabhängige Lader parallel; die Standorte für lade_geodaten_infos gleich mit
+    segmente, verfuegbar, belegt, einrichtungen, standorte = datenzugriff.gleichzeitig(
+        datenzugriff.segmente,
+        lambda: belegungsindex.verfuegbare_segmente(wochentag, minute),
+        lambda: belegungsindex.belegte_segmente(wochentag, minute),
+        datenzugriff.einrichtungen,
+        datenzugriff.standorte,
+    )
+
+    # Verfügbare Segmente, außer belegten Gesamtspielflächen
+    gesamtspielflaechen = segmente.loc[segmente["name"] == "Gesamtspielfläche", "id"].to_numpy()
+    frei = np.setdiff1d(verfuegbar, np.intersect1d(belegt, gesamtspielflaechen))
+
+    freie = (
+        segmente[segmente["id"].isin(frei)]
+        .groupby("einrichtung_id", observed=True)["id"].nunique()
+        .rename("verfuegbare_segmente")
+        .reset_index()
+    )
+    freie = freie[freie["verfuegbare_segmente"] == segmentanzahl]
+    freie = freie.merge(
+        einrichtungen[["id", "name", "typ"]],
+        left_on="einrichtung_id", right_on="id"
+    )
+    return freie[["einrichtung_id", "name", "typ", "verfuegbare_segmente"]].to_dict("records"), standorte
+
+
+# 📍 Geodaten & Adressinfos der gefundenen Einrichtungen (Standorte aus get_freie_einrichtungen)
+def lade_geodaten_infos(standorte, einrichtung_ids):
     if not einrichtung_ids:
         return []
 
-    db = get_db_connection()
-    cursor = db.cursor(dictionary=True)
-    format_strings = ','.join(['%s'] * len(einrichtung_ids))
-
-    query = f"""
-        SELECT a.einrichtung_id, g.breitengrad, g.laengengrad,
-               a.strasse, a.hausnr, a.plz, a.ort
-        FROM geodaten g
-        JOIN adressen a ON g.adressen_id = a.id
-        WHERE a.einrichtung_id IN ({format_strings})
-    """
-    cursor.execute(query, einrichtung_ids)
-    daten = cursor.fetchall()
-    cursor.close()
-    db.close()
-    return daten
+    df = standorte[standorte["einrichtung_id"].isin(einrichtung_ids)]
+    spalten = ["einrichtung_id", "breitengrad", "laengengrad", "strasse", "hausnr", "plz", "ort"]
+    return df[spalten].to_dict("records")
 
 # 🗺️ Karte mit Popup-Infos (Typ, Name, Adresse)
-def zeige_karte(freie_infos, geo_infos):
+def baue_karte(freie_infos, geo_infos):
     m = folium.Map(location=[51.9607, 7.6261], zoom_start=12)
     geo_dict = {g["einrichtung_id"]: g for g in geo_infos}
 
@@ -112,15 +87,47 @@ def zeige_karte(freie_infos, geo_infos):
                 icon=folium.Icon(color="green")
             ).add_to(m)
 
-    m.save("karte.html")
-    components.html(open("karte.html", "r", encoding="utf-8").read(), height=600)
+    return m
 
 # 🚀 Aktion
 if st.button("Freie Hallen anzeigen"):
-    freie_infos = get_freie_einrichtungen(v_tag, b_tag, uhrzeit, segment_filter)
+    freie_infos, standorte = get_freie_einrichtungen(wochentag_nr, uhrzeit, segment_filter)
     ids = [e["einrichtung_id"] for e in freie_infos]
     if ids:
-        geo_infos = lade_geodaten_infos(ids)
-        zeige_karte(freie_infos, geo_infos)
+        geo_infos = lade_geodaten_infos(standorte, ids)
+        karten.zeige_karte(
+            ("freie_hallen", wochentag_nr, uhrzeit.hour * 60 + uhrzeit.minute, segment_filter),
+            lambda: baue_karte(freie_infos, geo_infos),
+            tabellen=("belegungsplan", "verfugbarkeit", "segmente", "einrichtungen", "adressen", "geodaten"),
+        )
     else:
         st.info("Keine freien Hallen mit dieser Segmentanzahl gefunden.")
+
+# 🔎 Freie Zeitfenster über die ganze Woche suchen
+st.subheader("Freie Zeitfenster suchen")
+fenster_tage = st.multiselect("Wochentage", datenzugriff.WOCHENTAGE, default=datenzugriff.WOCHENTAGE)
+col_von, col_bis = st.columns(2)
+fenster_von = col_von.time_input("Frühester Beginn", value=time(16, 0))
+fenster_bis = col_bis.time_input("Spätestes Ende", value=time(22, 0))
+col_dauer, col_segmente = st.columns(2)
+fenster_dauer = col_dauer.number_input("Mindestdauer (Minuten)", min_value=15, max_value=960, value=90, step=15)
+fenster_segmente = col_segmente.selectbox("Mindestens freie Segmente", [1, 2, 3, 4])
+
+def zeit_text(minuten):
+    return f"{minuten // 60:02d}:{minuten % 60:02d}"
+
+if st.button("Zeitfenster suchen"):
+    fenster = freie_fenster.suche_freie_fenster(
+        min_segmente=fenster_segmente,
+        min_dauer=fenster_dauer,
+        von=fenster_von.hour * 60 + fenster_von.minute,
+        bis=fenster_bis.hour * 60 + fenster_bis.minute,
+        tage=[datenzugriff.WOCHENTAG_NR[t] for t in fenster_tage],
+    )
+    if fenster.empty:
+        st.info("Keine passenden Zeitfenster gefunden.")
+    else:
+        fenster["von"] = fenster["start_min"].map(zeit_text)
+        fenster["bis"] = fenster["ende_min"].map(zeit_text)
+        st.write(f"{fenster['einrichtung_id'].nunique()} Einrichtungen, {len(fenster)} Zeitfenster")
+        st.dataframe(fenster[["name", "typ", "wochentag", "von", "bis", "dauer_min", "freie_segmente", "rang"]])
@@ -1,13 +1,19 @@
 import streamlit as st
 import folium
+import pandas as pd
 from folium import Map, CircleMarker
+from folium.plugins import TimestampedGeoJson
 from datetime import time, timedelta
-import streamlit.components.v1 as components
+from html import escape
 import sys, os
 
 # 🔄 Pfad zur zentralen DB-Verbindung aus db.py
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from db import get_db_connection  # zentrale Verbindung
+import datenzugriff
+import belegungsindex  # In-Memory-Index statt SQL pro Sliderschritt
+import belegungsverlauf
+import karten
+import instrumentierung
 
 # Farben pro Nutzergruppe
 nutzergruppen_farben = {
@@ -26,8 +32,11 @@ nutzergruppen_farben = {
     "außersp. Veranstaltungen": "darkgreen"
 }
 
+MAX_POPUP_TAETIGKEITEN = 5
+
 # Seiteneinstellungen
 st.set_page_config(page_title="Nutzergruppen-Karte", layout="wide")
+instrumentierung.seite("nutzergruppen_karte")
 st.title("Belegung nach Nutzergruppen – farblich dargestellt")
 
 col1, col2 = st.columns([3, 1])
@@ -37,41 +46,59 @@ with col1:
     wochentag_anzeige = st.selectbox("Wochentag auswählen", [
         "Montag", "Dienstag", "Mittwoch", "Donnerstag", "Freitag", "Samstag", "Sonntag"
     ])
-    wochentag_map = {
-        "Montag": "Mo", "Dienstag": "Di", "Mittwoch": "Mi",
-        "Donnerstag": "Do", "Freitag": "Fr", "Samstag": "Sa", "Sonntag": "So"
-    }
-    wochentag_sql = wochentag_map[wochentag_anzeige]
+    wochentag_nr = datenzugriff.WOCHENTAG_NR[wochentag_anzeige]
 
+    # ⏯️ Ganzer Tag: alle Viertelstunden als eine zeitabhängige Ebene, Abspielen im Browser
+    ganzer_tag = st.toggle("Ganzen Tag abspielen (06:00–22:00)")
     zeit = st.slider("Uhrzeit auswählen", min_value=time(6, 0), max_value=time(22, 0),
-                     value=time(16, 0), step=timedelta(minutes=15))
-    zeit_str = zeit.strftime("%H:%M:%S")
-
-# 📥 Belegungsdaten mit Nutzergruppe + Tätigkeit
-def lade_belegungen_mit_farbe(wochentag, zeit):
-    db = get_db_connection()
-    cursor = db.cursor(dictionary=True)
-
-    query = """
-        SELECT DISTINCT g.breitengrad, g.laengengrad,
-                        b.bereich, b.nutzer_gruppen, b.taetigkeit
-        FROM belegungsplan b
-        JOIN segmente s ON b.segment_id = s.id
-        JOIN adressen a ON s.einrichtung_id = a.einrichtung_id
-        JOIN geodaten g ON a.id = g.adressen_id
-        WHERE b.wochentag = %s
-          AND b.start <= %s
-          AND b.ende > %s
-          AND b.bereich IS NOT NULL
-    """
-    cursor.execute(query, (wochentag, zeit, zeit))
-    daten = cursor.fetchall()
-    cursor.close()
-    db.close()
-    return daten
+                     value=time(16, 0), step=timedelta(minutes=15), disabled=ganzer_tag)
+    minute = zeit.hour * 60 + zeit.minute
+    # 📍 Ein Marker pro Einrichtung mit Zusammenfassung, im Browser geclustert
+    gebuendelt = st.toggle("Pro Einrichtung bündeln", value=True, disabled=ganzer_tag)
+
+# 📥 Belegungsdaten mit Nutzergruppe + Tätigkeit (Stichabfrage im Belegungsindex)
+def lade_belegungen_mit_farbe(wochentag, minute):
+    belegt = belegungsindex.belegungen_zu(wochentag, minute)
+    belegt = belegt[belegt["bereich"].notna()][["segment_id", "bereich", "nutzer_gruppen", "taetigkeit"]]
+    punkte = belegt.merge(datenzugriff.segment_standorte(), on="segment_id")
+    spalten = ["breitengrad", "laengengrad", "bereich", "nutzer_gruppen", "taetigkeit"]
+    punkte = punkte[spalten].drop_duplicates()
+    return punkte.astype(object).where(punkte.notna(), None).to_dict("records")
+
+# 📥 Belegungen pro Einrichtung zusammengefasst: Farbe des häufigsten Bereichs, Popup mit Anzahlen
+def lade_einrichtungen_mit_farbe(wochentag, minute):
+    belegt = belegungsindex.belegungen_zu(wochentag, minute)
+    belegt = karten.pro_einrichtung(belegt[belegt["bereich"].notna()])
+    punkte = []
+    for _, gruppe in belegt.groupby("einrichtung_id", sort=False):
+        bereiche = gruppe["bereich"].astype(str).value_counts()
+        taetigkeiten = gruppe["taetigkeit"].dropna().astype(str).value_counts().index.tolist()
+        zeilen = [
+            f"<span style='color:{nutzergruppen_farben.get(b, 'gray')}'>●</span> {escape(b)}: {n}"
+            for b, n in bereiche.items()
+        ]
+        if taetigkeiten:
+            mehr = " …" if len(taetigkeiten) > MAX_POPUP_TAETIGKEITEN else ""
+            zeilen.append(f"<i>{escape(', '.join(taetigkeiten[:MAX_POPUP_TAETIGKEITEN]))}{mehr}</i>")
+        erste = gruppe.iloc[0]
+        adresse = " ".join(str(x) for x in (erste["strasse"], erste["hausnr"]) if pd.notna(x))
+        punkte.append({
+            "breitengrad": erste["breitengrad"],
+            "laengengrad": erste["laengengrad"],
+            "popup": f"<b>{escape(adresse)}</b><br>{len(gruppe)} Belegungen<br>"
+                     + "<br>".join(zeilen),
+            "farbe": nutzergruppen_farben.get(bereiche.index[0], "gray"),
+        })
+    return pd.DataFrame(punkte)
+
+# 🗺️ Ein geclusterter Marker pro Einrichtung
+def baue_karte_gebuendelt(punkte):
+    m = Map(location=[51.9607, 7.6261], zoom_start=12)
+    karten.marker_cluster(punkte).add_to(m)
+    return m
 
 # 🗺️ Karte mit farbigen Markern & Popups
-def zeige_karte_farbig(daten):
+def baue_karte_farbig(daten):
     m = Map(location=[51.9607, 7.6261], zoom_start=12)
 
     for eintrag in daten:
@@ -97,8 +124,33 @@ def zeige_karte_farbig(daten):
             fill_opacity=0.7
         ).add_to(m)
 
-    m.save("nutzergruppen_map.html")
-    components.html(open("nutzergruppen_map.html", "r", encoding="utf-8").read(), height=600)
+    return m
+
+# 🎞️ Ganzer Tag: ein Punkt pro Standort, Bereich und durchgehendem Belegungsabschnitt
+def baue_karte_tag(verlauf):
+    m = Map(location=[51.9607, 7.6261], zoom_start=12)
+    zeiten = [f"2000-01-03T{z}:00" for z in verlauf.zeiten]
+    features = [
+        {
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [p.laengengrad, p.breitengrad]},
+            "properties": {
+                "times": [zeiten[f] for f in p.frames],
+                "popup": p.gruppe,
+                "icon": "circle",
+                "iconstyle": {"color": nutzergruppen_farben.get(p.gruppe, "gray"),
+                              "fillColor": nutzergruppen_farben.get(p.gruppe, "gray"),
+                              "fillOpacity": 0.7, "radius": 8},
+            },
+        }
+        for p in verlauf.punkte().itertuples(index=False)
+    ]
+    TimestampedGeoJson(
+        {"type": "FeatureCollection", "features": features},
+        period=f"PT{belegungsverlauf.SCHRITT_MIN}M", duration=f"PT{belegungsverlauf.SCHRITT_MIN - 1}M",
+        add_last_point=False, auto_play=True, loop=True, date_options="HH:mm",
+    ).add_to(m)
+    return m
 
 # ℹ️ Legende anzeigen
 def zeige_glossar():
@@ -113,11 +165,33 @@ def zeige_glossar():
 
 # 🔄 Daten abrufen & anzeigen
 with col1:
-    daten = lade_belegungen_mit_farbe(wochentag_sql, zeit_str)
-    if daten:
-        zeige_karte_farbig(daten)
+    if ganzer_tag:
+        verlauf = belegungsverlauf.tagesverlauf(wochentag_nr, "bereich")
+        karten.zeige_karte(
+            ("nutzergruppen_karte_tag", wochentag_nr),
+            lambda: baue_karte_tag(verlauf),
+            tabellen=("belegungsplan", "segmente", "adressen", "geodaten"),
+        )
+    elif gebuendelt:
+        punkte = lade_einrichtungen_mit_farbe(wochentag_nr, minute)
+        if not punkte.empty:
+            karten.zeige_karte(
+                ("nutzergruppen_karte_gebuendelt", wochentag_nr, minute),
+                lambda: baue_karte_gebuendelt(punkte),
+                tabellen=("belegungsplan", "segmente", "adressen", "geodaten"),
+            )
+        else:
+            st.info("Keine Belegungen zum gewählten Zeitpunkt gefunden.")
     else:
-        st.info("Keine Belegungen zum gewählten Zeitpunkt gefunden.")
+        daten = lade_belegungen_mit_farbe(wochentag_nr, minute)
+        if daten:
+            karten.zeige_karte(
+                ("nutzergruppen_karte", wochentag_nr, minute),
+                lambda: baue_karte_farbig(daten),
+                tabellen=("belegungsplan", "segmente", "adressen", "geodaten"),
+            )
+        else:
+            st.info("Keine Belegungen zum gewählten Zeitpunkt gefunden.")
 
 with col2:
     zeige_glossar()
@@ -1,87 +1,102 @@
 import streamlit as st
-import mysql.connector
 import folium
 from folium import Marker
+import pandas as pd
 from datetime import time, timedelta
-import streamlit.components.v1 as components
-
-def lade_verfuegbare_taetigkeiten():
-    db = mysql.connector.connect(
-        host="localhost",
-        user="root",
-        password="Techlabs#2025",
-        database="techlabs_projekt"
-    )
-    cursor = db.cursor()
-    cursor.execute("""
-        SELECT DISTINCT taetigkeit
-        FROM belegungsplan
-        WHERE taetigkeit IS NOT NULL AND taetigkeit != ''
-        ORDER BY taetigkeit ASC
-    """)
-    taetigkeiten = [row[0] for row in cursor.fetchall()]
-    cursor.close()
-    db.close()
-    return taetigkeiten
+from html import escape
+import sys, os
+
+# 🔄 Zugriff auf die Module im Projekt-Hauptverzeichnis
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import datenzugriff
+import karten
+import taetigkeitssuche
+import instrumentierung
+
+# 🔎 Vorschläge kommen aus dem Tätigkeits-Index statt aus SELECT DISTINCT
+def lade_verfuegbare_taetigkeiten(suchtext=""):
+    return taetigkeitssuche.suche(suchtext)
+
+MAX_POPUP_STARTZEITEN = 8
 
 # Seiteneinstellungen
 st.set_page_config(page_title="Tätigkeit suchen", layout="wide")
+instrumentierung.seite("taetigkeit_suche")
 st.title("Sportmöglichkeit nach Tätigkeit finden")
 
 col1, col2 = st.columns([3, 1])
 
 # UI-Auswahl
 with col1:
-    verfuegbare_taetigkeiten = lade_verfuegbare_taetigkeiten()
+    suchtext = st.text_input("Tätigkeit suchen", placeholder="z. B. Badminton, fussball, Volley …")
+    verfuegbare_taetigkeiten = lade_verfuegbare_taetigkeiten(suchtext)
+    if not verfuegbare_taetigkeiten:
+        st.info("Keine passende Tätigkeit gefunden.")
+        st.stop()
     taetigkeit = st.selectbox("Tätigkeit auswählen", verfuegbare_taetigkeiten)
 
 
     wochentag_anzeige = st.selectbox("Wochentag auswählen", [
         "Montag", "Dienstag", "Mittwoch", "Donnerstag", "Freitag", "Samstag", "Sonntag"
     ])
-    wochentag_map = {
-        "Montag": "Mo", "Dienstag": "Di", "Mittwoch": "Mi",
-        "Donnerstag": "Do", "Freitag": "Fr", "Samstag": "Sa", "Sonntag": "So"
-    }
-    wochentag_sql = wochentag_map[wochentag_anzeige]
+    wochentag_nr = datenzugriff.WOCHENTAG_NR[wochentag_anzeige]
 
     startzeit = st.slider("Startzeit (von)", min_value=time(6, 0), max_value=time(22, 0), value=time(16, 0))
     endzeit = st.slider("Endzeit (bis)", min_value=time(6, 0), max_value=time(22, 0), value=time(18, 0))
 
-    start_str = startzeit.strftime("%H:%M:%S")
-    end_str = endzeit.strftime("%H:%M:%S")
+    start_min = startzeit.hour * 60 + startzeit.minute
+    end_min = endzeit.hour * 60 + endzeit.minute
+
+    # 📍 Ein Marker pro Einrichtung mit allen Startzeiten, im Browser geclustert
+    gebuendelt = st.toggle("Pro Einrichtung bündeln", value=True)
 
-# Datenbankabfrage
+# Belegungen über die Posting-Listen des Tätigkeits-Index, Orte aus den gecachten Stammdaten
 def lade_hallen_mit_taetigkeit(taetigkeit, wochentag, start, ende):
-    db = mysql.connector.connect(
-        host="localhost",
-        user="root",
-        password="Techlabs#2025",
-        database="techlabs_projekt"
-    )
-    cursor = db.cursor(dictionary=True)
-
-    query = """
-        SELECT DISTINCT g.breitengrad, g.laengengrad, b.start,
-                        b.nutzer_gruppen, b.taetigkeit, a.strasse, a.hausnr, a.ort
-        FROM belegungsplan b
-        JOIN segmente s ON b.segment_id = s.id
-        JOIN adressen a ON s.einrichtung_id = a.einrichtung_id
-        JOIN geodaten g ON a.id = g.adressen_id
-        WHERE b.wochentag = %s
-          AND b.taetigkeit LIKE %s
-          AND b.start >= %s
-          AND b.start <= %s
-    """
-    params = (wochentag, f"%{taetigkeit}%", start, ende)
-    cursor.execute(query, params)
-    daten = cursor.fetchall()
-    cursor.close()
-    db.close()
-    return daten
+    belegt = taetigkeitssuche.index().belegungen_zu(taetigkeit, tag=wochentag, von=start, bis=ende)
+    belegt = belegt[["segment_id", "start_min", "nutzer_gruppen", "taetigkeit"]]
+    orte = datenzugriff.segment_standorte()[
+        ["segment_id", "breitengrad", "laengengrad", "strasse", "hausnr", "ort"]
+    ]
+    df = belegt.merge(orte, on="segment_id")
+    df["start"] = [f"{m // 60:02d}:{m % 60:02d}:00" for m in df["start_min"].tolist()]
+    spalten = ["breitengrad", "laengengrad", "start", "nutzer_gruppen", "taetigkeit", "strasse", "hausnr", "ort"]
+    df = df[spalten].astype(object).drop_duplicates()
+    return df.where(df.notna(), None).to_dict("records")
+
+# Belegungen pro Einrichtung zusammengefasst: Startzeiten und Nutzergruppen im Popup
+def lade_einrichtungen_mit_taetigkeit(taetigkeit, wochentag, start, ende):
+    belegt = taetigkeitssuche.index().belegungen_zu(taetigkeit, tag=wochentag, von=start, bis=ende)
+    belegt = karten.pro_einrichtung(belegt[["segment_id", "start_min", "nutzer_gruppen", "taetigkeit"]])
+    punkte = []
+    for _, gruppe in belegt.groupby("einrichtung_id", sort=False):
+        startzeiten = sorted(set(gruppe["start_min"].tolist()))
+        zeiten = ", ".join(f"{m // 60:02d}:{m % 60:02d}" for m in startzeiten[:MAX_POPUP_STARTZEITEN])
+        if len(startzeiten) > MAX_POPUP_STARTZEITEN:
+            zeiten += " …"
+        gruppen = ", ".join(sorted(set(gruppe["nutzer_gruppen"].dropna().astype(str))))
+        # Die Teilstring-Suche kann mehrere Tätigkeiten am selben Standort treffen
+        taetigkeiten = ", ".join(sorted(set(gruppe["taetigkeit"].dropna().astype(str))))
+        erste = gruppe.iloc[0]
+        adresse = " ".join(str(x) for x in (erste["strasse"], erste["hausnr"]) if pd.notna(x))
+        if pd.notna(erste["ort"]):
+            adresse += f", {erste['ort']}"
+        punkte.append({
+            "breitengrad": erste["breitengrad"],
+            "laengengrad": erste["laengengrad"],
+            "popup": f"<b>{escape(taetigkeiten)}</b><br>{escape(gruppen)}<br>"
+                     f"Startzeiten: {zeiten}<br>{escape(adresse)}",
+            "farbe": "red",
+        })
+    return pd.DataFrame(punkte)
+
+# Karte mit einem geclusterten Marker pro Einrichtung
+def baue_karte_gebuendelt(punkte):
+    m = folium.Map(location=[51.9607, 7.6261], zoom_start=12)
+    karten.marker_cluster(punkte).add_to(m)
+    return m
 
 # Karte
-def zeige_karte(daten):
+def baue_karte(daten):
     m = folium.Map(location=[51.9607, 7.6261], zoom_start=12)
 
     for eintrag in daten:
@@ -97,16 +112,30 @@ def zeige_karte(daten):
             icon=folium.Icon(color="red")
         ).add_to(m)
 
-    m.save("taetigkeit_map.html")
-    components.html(open("taetigkeit_map.html", "r", encoding="utf-8").read(), height=600)
+    return m
 
 # Ausgabe
 with col1:
-    daten = lade_hallen_mit_taetigkeit(taetigkeit, wochentag_sql, start_str, end_str)
-    if daten:
-        zeige_karte(daten)
+    if gebuendelt:
+        punkte = lade_einrichtungen_mit_taetigkeit(taetigkeit, wochentag_nr, start_min, end_min)
+        if not punkte.empty:
+            karten.zeige_karte(
+                ("taetigkeit_suche_gebuendelt", taetigkeit, wochentag_nr, start_min, end_min),
+                lambda: baue_karte_gebuendelt(punkte),
+                tabellen=("belegungsplan", "segmente", "adressen", "geodaten"),
+            )
+        else:
+            st.info("Keine Hallen für diese Tätigkeit und Zeitspanne gefunden.")
     else:
-        st.info("Keine Hallen für diese Tätigkeit und Zeitspanne gefunden.")
+        daten = lade_hallen_mit_taetigkeit(taetigkeit, wochentag_nr, start_min, end_min)
+        if daten:
+            karten.zeige_karte(
+                ("taetigkeit_suche", taetigkeit, wochentag_nr, start_min, end_min),
+                lambda: baue_karte(daten),
+                tabellen=("belegungsplan", "segmente", "adressen", "geodaten"),
+            )
+        else:
+            st.info("Keine Hallen für diese Tätigkeit und Zeitspanne gefunden.")
 
 with col2:
     st.markdown("### ℹ Hinweis")
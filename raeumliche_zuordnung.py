@@ -0,0 +1,101 @@
+# raeumliche_zuordnung.py
+
+"""Räumliche Zuordnung der Standorte (``geodaten``) zu Stadtteilen (``stadtteile2``).
+
+Statt für jeden Punkt alle WKT-Polygone neu zu parsen und linear mit
+``contains`` zu testen, werden die Polygone einmal vektorisiert geparst,
+vorbereitet (``shapely.prepare``) und in einen STRtree gesteckt. Alle Punkte
+werden dann in einem Durchlauf gegen den Baum abgefragt.
+
+Das Ergebnis liegt persistent in ``geodaten_stadtteil`` (``adressen_id`` →
+``stadtteil_id``) und wird vom Importer nach jedem Stadtteil-Import neu
+berechnet (``python importer.py zuordnung``).
+"""
+
+import mysql.connector
+import numpy as np
+import pandas as pd
+import shapely
+from shapely import STRtree
+
+import datenzugriff
+from db import db_connection
+
+ZUORDNUNG_DDL = """
+    CREATE TABLE IF NOT EXISTS geodaten_stadtteil (
+        adressen_id INT NOT NULL PRIMARY KEY,
+        stadtteil_id INT NULL,
+        KEY idx_geodaten_stadtteil_stadtteil (stadtteil_id)
+    )
+"""
+
+
+def ordne_zu(stadtteile, geodaten):
+    """Stadtteil-ID für jeden Punkt in ``geodaten`` (NaN, wenn er in keinem Stadtteil liegt)."""
+    polygone = shapely.from_wkt(stadtteile["geom_wkt"].to_numpy())
+    shapely.prepare(polygone)
+    baum = STRtree(polygone)
+
+    punkte = shapely.points(
+        geodaten["laengengrad"].to_numpy(dtype=float),
+        geodaten["breitengrad"].to_numpy(dtype=float),
+    )
+    punkt_pos, polygon_pos = baum.query(punkte, predicate="within")
+
+    # Liegt ein Punkt auf einer gemeinsamen Grenze, gewinnt der erste Treffer
+    stadtteil_id = np.full(len(punkte), np.nan)
+    erste = np.unique(punkt_pos, return_index=True)[1]
+    stadtteil_id[punkt_pos[erste]] = stadtteile["id"].to_numpy()[polygon_pos[erste]]
+
+    return pd.DataFrame({
+        "adressen_id": geodaten["adressen_id"].to_numpy(),
+        "stadtteil_id": pd.array(stadtteil_id, dtype="Int32"),
+    })
+
+
+def speichere_zuordnung():
+    """Berechnet die Zuordnung neu und ersetzt ``geodaten_stadtteil`` in einer Transaktion."""
+    datenzugriff.invalidieren("stadtteile2")
+    datenzugriff.invalidieren("geodaten")
+    zuordnung = ordne_zu(datenzugriff.stadtteile(), datenzugriff.geodaten())
+    zeilen = [
+        (int(a), None if pd.isna(s) else int(s))
+        for a, s in zip(zuordnung["adressen_id"], zuordnung["stadtteil_id"])
+    ]
+
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(datenzugriff.VERSIONSTABELLE_DDL)
+        cursor.execute(ZUORDNUNG_DDL)
+        conn.commit()
+        cursor.execute("DELETE FROM geodaten_stadtteil")
+        cursor.executemany(
+            "INSERT INTO geodaten_stadtteil (adressen_id, stadtteil_id) VALUES (%s, %s)", zeilen
+        )
+        datenzugriff.version_erhoehen(cursor, "geodaten_stadtteil")
+        conn.commit()
+        cursor.close()
+
+    zugeordnet = int(zuordnung["stadtteil_id"].notna().sum())
+    return zugeordnet, len(zuordnung) - zugeordnet
+
+
+def _lade_zuordnung():
+    try:
+        return datenzugriff.lade_frame(
+            "SELECT adressen_id, stadtteil_id FROM geodaten_stadtteil",
+            spaltentypen={"adressen_id": "int32", "stadtteil_id": "Int32"},
+        )
+    except mysql.connector.Error:
+        # Noch nicht persistiert (Importer nicht gelaufen) → im Prozess berechnen
+        return ordne_zu(datenzugriff.stadtteile(), datenzugriff.geodaten())
+
+
+def zuordnung():
+    """``adressen_id`` → ``stadtteil_id`` aus ``geodaten_stadtteil`` (gecacht)."""
+    df = datenzugriff.cache.hole(
+        ("tabelle", "geodaten_stadtteil"),
+        datenzugriff.aus_schnappschuss("geodaten_stadtteil", _lade_zuordnung),
+        tabellen=("geodaten_stadtteil", "stadtteile2", "geodaten"),
+    )
+    return df.copy(deep=False)
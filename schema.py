@@ -0,0 +1,225 @@
+# schema.py
+
+"""Indizes für die Zugriffspfade der Seiten und ein Query-Plan-Audit.
+
+``python schema.py migrieren`` legt fehlende Indizes aus ``INDIZES`` an
+(idempotent, vorhandene werden übersprungen). ``python schema.py diagnose``
+führt für jede Abfrage aus ``_abfragen()`` ein ``EXPLAIN ANALYZE`` aus und
+meldet Full Table Scans, geschätzte und tatsächliche Zeilen sowie die
+Laufzeit. Der Exit-Code ist 1, sobald eine Abfrage einen Scan macht, der
+nicht ausdrücklich erlaubt ist – so fällt eine neue Seite ohne passenden
+Index auf, bevor sie ausgeliefert wird.
+
+Neue Abfragen einer Seite gehören in ``_abfragen()``, ihre Indizes in ``INDIZES``.
+"""
+
+import argparse
+import re
+import sys
+import time
+
+import mysql.connector
+
+import aggregate
+import auslastung
+import datenzugriff
+from db import db_connection
+
+# 🗂️ Tabelle → {Indexname: Spalten}
+INDIZES = {
+    "belegungsplan": {
+        # Zeitfenster-Suche: WHERE wochentag = ? AND start BETWEEN ? AND ?
+        "idx_belegungsplan_tag_zeit": ("wochentag", "start", "ende"),
+        # Auslastung/Index nach gespeichertem Wochentag-Schlüssel
+        "idx_belegungsplan_wochentag_int": ("wochentag_int", "segment_id"),
+        "idx_belegungsplan_segment": ("segment_id", "wochentag", "start"),
+    },
+    "verfugbarkeit": {
+        "idx_verfugbarkeit_tag_zeit": ("wochentag", "start", "ende"),
+        "idx_verfugbarkeit_wochentag_int": ("wochentag_int", "segment_id"),
+        "idx_verfugbarkeit_segment": ("segment_id", "wochentag", "start"),
+    },
+    "segmente": {
+        "idx_segmente_einrichtung": ("einrichtung_id", "id"),
+    },
+    "adressen": {
+        "idx_adressen_einrichtung": ("einrichtung_id", "id"),
+    },
+    "geodaten": {
+        "idx_geodaten_adressen": ("adressen_id",),
+    },
+}
+
+# Präfixlänge für TEXT-/BLOB-Spalten in Indizes (utf8mb4: 191 × 4 Byte < 767)
+TEXT_PRAEFIX = 191
+TEXT_TYPEN = {"text", "tinytext", "mediumtext", "longtext", "blob", "tinyblob", "mediumblob", "longblob"}
+
+
+def _abfragen():
+    """Name → (SQL, Parameter, Full Scan erlaubt). Beispielparameter wie auf den Seiten."""
+    abfragen = {
+        "versionen": ("SELECT tabelle, version FROM daten_version", None, True),
+        "segment_kennzahlen": (datenzugriff.SEGMENT_KENNZAHLEN_SQL, None, True),
+        "belegungen": (*datenzugriff.intervall_abfrage("belegungsplan", datenzugriff.BELEGUNG_ZUSATZSPALTEN), True),
+        "verfuegbarkeiten": (*datenzugriff.intervall_abfrage("verfugbarkeit"), True),
+        "auslastung_tag": (*auslastung.minuten_abfrage([0]), False),
+        "auslastung_tag_einrichtung": (*auslastung.minuten_abfrage([0], [1]), False),
+        "auslastung_roh_tag": (*auslastung.intervall_abfrage("belegungsplan", [0]), False),
+        "verfuegbarkeit_roh_tag": (*auslastung.intervall_abfrage("verfugbarkeit", [0]), False),
+        "aggregat_minuten": (f"SELECT {', '.join(aggregate.MINUTEN_SPALTEN)} FROM agg_minuten", None, True),
+        "aggregat_muster": (f"SELECT {', '.join(aggregate.MUSTER_SPALTEN)} FROM agg_muster", None, True),
+        "aggregat_segmente": (*datenzugriff.intervall_abfrage("belegungsplan", segment_ids=[1, 2, 3]), False),
+        "stadtteil_zuordnung": ("SELECT adressen_id, stadtteil_id FROM geodaten_stadtteil", None, True),
+    }
+    for name in datenzugriff.TABELLEN:
+        abfragen[f"tabelle_{name}"] = (f"SELECT * FROM {name}", None, True)
+    return abfragen
+
+
+# 🔧 Migration
+def _spalten(cursor, tabelle):
+    cursor.execute(
+        """
+        SELECT column_name, data_type FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = %s
+        """,
+        (tabelle,),
+    )
+    return {name.lower(): typ.lower() for name, typ in cursor.fetchall()}
+
+
+def _vorhandene_indizes(cursor, tabelle):
+    cursor.execute(
+        """
+        SELECT DISTINCT index_name FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s
+        """,
+        (tabelle,),
+    )
+    return {name for (name,) in cursor.fetchall()}
+
+
+def migrieren(cursor, ausgabe=print):
+    """Legt fehlende Indizes an; liefert die Anzahl neu angelegter."""
+    for tabelle in datenzugriff.WOCHENTAG_TABELLEN:
+        datenzugriff.wochentag_int_ergaenzen(cursor, tabelle)
+
+    angelegt = 0
+    for tabelle, indizes in INDIZES.items():
+        spalten = _spalten(cursor, tabelle)
+        if not spalten:
+            ausgabe(f"⚠️ {tabelle}: Tabelle fehlt, übersprungen")
+            continue
+        vorhanden = _vorhandene_indizes(cursor, tabelle)
+        for name, index_spalten in indizes.items():
+            if name in vorhanden:
+                continue
+            fehlend = [s for s in index_spalten if s not in spalten]
+            if fehlend:
+                ausgabe(f"⚠️ {tabelle}.{name}: Spalte(n) {', '.join(fehlend)} fehlen, übersprungen")
+                continue
+            definition = ", ".join(
+                f"`{s}`({TEXT_PRAEFIX})" if spalten[s] in TEXT_TYPEN else f"`{s}`" for s in index_spalten
+            )
+            start = time.perf_counter()
+            cursor.execute(f"CREATE INDEX {name} ON {tabelle} ({definition})")
+            ausgabe(f"✅ {tabelle}.{name} ({definition}) in {time.perf_counter() - start:.1f} s")
+            angelegt += 1
+    return angelegt
+
+
+# 🔍 Diagnose
+_SCAN = re.compile(r"Table scan on (\w+)")
+_SCHAETZUNG = re.compile(r"\(cost=[\d.e+]+(?:\.\.[\d.e+]+)? rows=([\d.e+]+)\)")
+_TATSAECHLICH = re.compile(r"\(actual time=[\d.]+\.\.([\d.]+) rows=([\d.e+]+) loops=(\d+)\)")
+
+
+def analysiere_plan(plan):
+    """Wertet den Baum von ``EXPLAIN ANALYZE`` aus (oberster Knoten = Gesamtergebnis)."""
+    scans = sorted(set(_SCAN.findall(plan)))
+    schaetzung = _SCHAETZUNG.search(plan)
+    tatsaechlich = _TATSAECHLICH.search(plan)
+    return {
+        "full_scans": scans,
+        "zeilen_geschaetzt": float(schaetzung.group(1)) if schaetzung else None,
+        "zeilen_tatsaechlich": float(tatsaechlich.group(2)) if tatsaechlich else None,
+        "zeit_ms": float(tatsaechlich.group(1)) if tatsaechlich else None,
+    }
+
+
+def _erklaeren(cursor, sql, params):
+    try:
+        cursor.execute(f"EXPLAIN ANALYZE {sql}", params)
+        return analysiere_plan("\n".join(zeile[0] for zeile in cursor.fetchall()))
+    except mysql.connector.Error as fehler:
+        if fehler.errno != 1064:  # Syntaxfehler → Server kennt EXPLAIN ANALYZE nicht (< MySQL 8.0.18)
+            raise
+    # Klassisches EXPLAIN: type = ALL ist ein Full Scan, rows die Schätzung
+    cursor.execute(f"EXPLAIN {sql}", params)
+    spalten = [s.lower() for s in cursor.column_names]
+    zeilen = [dict(zip(spalten, z)) for z in cursor.fetchall()]
+    return {
+        "full_scans": sorted({z["table"] for z in zeilen if z.get("type") == "ALL"}),
+        "zeilen_geschaetzt": float(sum(z.get("rows") or 0 for z in zeilen)),
+        "zeilen_tatsaechlich": None,
+        "zeit_ms": None,
+    }
+
+
+def _zahl(wert):
+    return "-" if wert is None else f"{wert:,.0f}"
+
+
+def diagnose(cursor, namen=None, ausgabe=print):
+    """Analysiert alle (oder die genannten) Abfragen; liefert die Namen mit unerlaubten Full Scans."""
+    auffaellig = []
+    for name, (sql, params, scan_erlaubt) in _abfragen().items():
+        if namen and name not in namen:
+            continue
+        try:
+            ergebnis = _erklaeren(cursor, sql, params)
+        except mysql.connector.Error as fehler:
+            ausgabe(f"❔ {name}: {fehler.msg}")
+            continue
+
+        zeit = "-" if ergebnis["zeit_ms"] is None else f"{ergebnis['zeit_ms']:.1f} ms"
+        scans = ", ".join(ergebnis["full_scans"]) or "-"
+        markierung = "✅"
+        if ergebnis["full_scans"] and not scan_erlaubt:
+            markierung = "❌"
+            auffaellig.append(name)
+        elif ergebnis["full_scans"]:
+            markierung = "➖"
+        ausgabe(
+            f"{markierung} {name:<28} Scans: {scans:<30} Zeilen geschätzt: {_zahl(ergebnis['zeilen_geschaetzt']):>10}"
+            f"  tatsächlich: {_zahl(ergebnis['zeilen_tatsaechlich']):>10}  Zeit: {zeit}"
+        )
+    return auffaellig
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Indizes anlegen und Query-Pläne der Seiten prüfen.")
+    unter = parser.add_subparsers(dest="befehl", required=True)
+    unter.add_parser("migrieren", help="Fehlende Indizes anlegen")
+    diagnose_parser = unter.add_parser("diagnose", help="EXPLAIN ANALYZE für alle registrierten Abfragen")
+    diagnose_parser.add_argument("abfrage", nargs="*", help="Nur diese Abfragen (Standard: alle)")
+    args = parser.parse_args(argv)
+
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        if args.befehl == "migrieren":
+            angelegt = migrieren(cursor)
+            conn.commit()
+            print(f"🗂️ {angelegt} Indizes angelegt")
+            return 0
+
+        auffaellig = diagnose(cursor, args.abfrage)
+        cursor.close()
+    if auffaellig:
+        print(f"❌ Unerwartete Full Table Scans in: {', '.join(auffaellig)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,213 @@
+# schnappschuss.py
+
+"""Gemeinsamer, schreibgeschützter Datenstand für mehrere Streamlit-Prozesse.
+
+Der Importer exportiert die Tabellen, die ``datenzugriff`` und ``aggregate``
+sonst aus MySQL laden, in ein Verzeichnis (``DATEN_SCHNAPPSCHUSS``). Jede
+Spalte liegt dort als ``.npy``-Datei(en), die Seiten öffnen sie per
+``np.load(..., mmap_mode="r")``:
+
+* Zahlen, Kategorie-Codes und Null-Masken werden direkt als Sicht auf die
+  Abbildung verwendet – alle Worker auf einem Rechner teilen sich dieselben
+  Seiten im Page-Cache. Das betrifft alle großen Tabellen (Belegungen,
+  Verfügbarkeiten, Aggregate), die nur solche Spalten haben.
+* Textspalten (Namen, Adressen, ``stadtteile2.geom_wkt``) liegen als
+  UTF-8-Bytes plus int64-Offsets vor, ebenfalls gemappt. Pandas braucht
+  dafür aber Python-Strings: Jeder Worker dekodiert sie beim Laden in eine
+  eigene Kopie. Das sind nur die Stammdaten (einige Tausend Zeilen und die
+  Stadtteilgrenzen); geparst wird dabei nichts, nur geschnitten.
+
+Aufbau::
+
+    <DATEN_SCHNAPPSCHUSS>/
+        aktuell.json              {"verzeichnis": "<stempel>"}
+        <stempel>/meta.json       Version, Zeilen und Spaltenbeschreibung je Tabelle
+        <stempel>/<tabelle>/<spalte>.npy           Werte, Codes oder Text-Offsets
+        <stempel>/<tabelle>/<spalte>.maske.npy     Null-Maske (nullable und Text)
+        <stempel>/<tabelle>/<spalte>.bytes.npy     UTF-8-Bytes (Text)
+
+Ein Export schreibt immer ein neues ``<stempel>``-Verzeichnis und tauscht
+danach ``aktuell.json`` atomar aus; unveränderte Tabellen werden aus dem
+vorigen Stand per Hardlink übernommen. Jede Tabelle trägt die
+``daten_version`` zum Zeitpunkt des Exports – passt sie nicht mehr zur
+Datenbank, lädt ``datenzugriff`` wie bisher aus MySQL.
+"""
+
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+VERZEICHNIS = os.environ.get("DATEN_SCHNAPPSCHUSS") or None
+AKTUELL = "aktuell.json"
+FORMAT = 3  # ändert sich die Ablage, gelten ältere Stände als nicht vorhanden
+BEHALTEN = 2  # ältere Stände bleiben kurz liegen, falls ein Worker sie noch offen hat
+
+
+# 📤 Export (Importer)
+def _quellen():
+    """Name im Schnappschuss → Lader aus MySQL (dieselben Frames wie in den Caches)."""
+    import aggregate
+    import datenzugriff
+    import raeumliche_zuordnung
+
+    quellen = {
+        name: (lambda name=name: datenzugriff.lade_frame(f"SELECT * FROM {name}", spaltentypen=typen))
+        for name, typen in datenzugriff.TABELLEN.items()
+    }
+    quellen["belegungsplan"] = lambda: datenzugriff.lade_intervalle(
+        "belegungsplan", datenzugriff.BELEGUNG_ZUSATZSPALTEN
+    )
+    quellen["verfugbarkeit"] = lambda: datenzugriff.lade_intervalle("verfugbarkeit")
+    quellen["agg_minuten"] = aggregate._lade_minuten
+    quellen["agg_muster"] = aggregate._lade_muster
+    quellen["geodaten_stadtteil"] = raeumliche_zuordnung._lade_zuordnung
+    return quellen
+
+
+def _schreibe_spalte(pfad, name, werte):
+    datei = os.path.join(pfad, f"{name}.npy")
+    if isinstance(werte.dtype, pd.CategoricalDtype):
+        np.save(datei, werte.cat.codes.to_numpy())
+        return {"name": name, "art": "kategorie", "kategorien": werte.cat.categories.tolist()}
+    if isinstance(werte.dtype, pd.api.extensions.ExtensionDtype) and werte.dtype.kind in "iuf":
+        # nullable Integer/Float: Werte + Maske
+        np.save(datei, werte.to_numpy(dtype=werte.dtype.numpy_dtype, na_value=0))
+        np.save(os.path.join(pfad, f"{name}.maske.npy"), werte.isna().to_numpy())
+        return {"name": name, "art": "nullable"}
+    if werte.dtype.kind in "biuf":
+        np.save(datei, werte.to_numpy())
+        return {"name": name, "art": "array"}
+    # Text: alle Werte hintereinander als UTF-8, Wert i liegt in bytes[offsets[i]:offsets[i + 1]]
+    fehlend = werte.isna().to_numpy()
+    kodiert = [b"" if f else str(w).encode("utf-8") for w, f in zip(werte.tolist(), fehlend)]
+    offsets = np.zeros(len(kodiert) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in kodiert], out=offsets[1:])
+    np.save(datei, offsets)
+    np.save(os.path.join(pfad, f"{name}.bytes.npy"), np.frombuffer(b"".join(kodiert), dtype=np.uint8))
+    np.save(os.path.join(pfad, f"{name}.maske.npy"), fehlend)
+    return {"name": name, "art": "text"}
+
+
+def _schreibe_tabelle(pfad, df):
+    os.makedirs(pfad)
+    return [_schreibe_spalte(pfad, spalte, df[spalte]) for spalte in df.columns]
+
+
+def _uebernehmen(alt, neu):
+    """Dateien eines unveränderten Tabellenverzeichnisses per Hardlink (sonst Kopie) übernehmen."""
+    os.makedirs(neu)
+    for datei in os.listdir(alt):
+        try:
+            os.link(os.path.join(alt, datei), os.path.join(neu, datei))
+        except OSError:
+            shutil.copy2(os.path.join(alt, datei), os.path.join(neu, datei))
+
+
+def exportieren(verzeichnis=None, ausgabe=print):
+    """Schreibt einen neuen Stand nach ``verzeichnis`` (Standard ``VERZEICHNIS``); liefert dessen Pfad."""
+    import datenzugriff
+
+    verzeichnis = verzeichnis or VERZEICHNIS
+    if not verzeichnis:
+        raise ValueError("Kein Schnappschuss-Verzeichnis – DATEN_SCHNAPPSCHUSS setzen")
+    os.makedirs(verzeichnis, exist_ok=True)
+    # Versionen vor dem Laden: ändert der Importer währenddessen etwas, gilt der Stand als veraltet
+    versionen = datenzugriff.lade_versionen()
+    vorher, vorher_meta = _aktueller_stand(verzeichnis)
+
+    stempel = time.strftime("%Y%m%d-%H%M%S") + f"-{os.getpid()}"
+    ziel = os.path.join(verzeichnis, stempel)
+    meta = {"format": FORMAT, "erstellt": time.strftime("%Y-%m-%dT%H:%M:%S"), "tabellen": {}}
+    for name, lader in _quellen().items():
+        version = versionen.get(name)
+        if version is None:
+            continue  # ohne Version könnte ein Worker den Stand nie als aktuell erkennen
+        alt = (vorher_meta or {}).get("tabellen", {}).get(name)
+        if alt is not None and alt["version"] == version:
+            _uebernehmen(os.path.join(vorher, name), os.path.join(ziel, name))
+            meta["tabellen"][name] = alt
+            continue
+        df = lader()
+        meta["tabellen"][name] = {
+            "version": version, "zeilen": len(df), "spalten": _schreibe_tabelle(os.path.join(ziel, name), df),
+        }
+        ausgabe(f"📸 {name}: {len(df)} Zeilen")
+
+    with open(os.path.join(ziel, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=1)
+    zeiger = os.path.join(verzeichnis, AKTUELL)
+    with open(zeiger + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"verzeichnis": stempel}, f)
+    os.replace(zeiger + ".tmp", zeiger)
+    _aufraeumen(verzeichnis, stempel)
+    return ziel
+
+
+def _aufraeumen(verzeichnis, aktuell):
+    staende = sorted(
+        d for d in os.listdir(verzeichnis) if d != aktuell and os.path.isdir(os.path.join(verzeichnis, d))
+    )
+    for alt in staende[:-BEHALTEN] if len(staende) > BEHALTEN else []:
+        shutil.rmtree(os.path.join(verzeichnis, alt), ignore_errors=True)
+
+
+# 📥 Lesen (Seiten)
+def _aktueller_stand(verzeichnis):
+    """(Pfad, Metadaten) des aktuellen Stands oder ``(None, None)``."""
+    try:
+        with open(os.path.join(verzeichnis, AKTUELL), encoding="utf-8") as f:
+            pfad = os.path.join(verzeichnis, json.load(f)["verzeichnis"])
+        with open(os.path.join(pfad, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError, KeyError):
+        return None, None
+    if meta.get("format") != FORMAT:
+        return None, None
+    return pfad, meta
+
+
+def _mappen(datei):
+    # Normales ndarray als Sicht auf die Abbildung (hält die Datei offen, kopiert nichts)
+    return np.asarray(np.load(datei, mmap_mode="r"))
+
+
+def _lies_text(datei):
+    offsets = _mappen(f"{datei}.npy").tolist()
+    maske = _mappen(f"{datei}.maske.npy")
+    daten = memoryview(_mappen(f"{datei}.bytes.npy"))
+    werte = np.empty(len(maske), dtype=object)
+    for i, (von, bis) in enumerate(zip(offsets, offsets[1:])):
+        werte[i] = None if maske[i] else str(daten[von:bis], "utf-8")
+    return pd.Series(werte, dtype=object).array
+
+
+def _lies_spalte(pfad, spalte):
+    datei = os.path.join(pfad, spalte["name"])
+    if spalte["art"] == "text":
+        return _lies_text(datei)
+    werte = _mappen(f"{datei}.npy")
+    if spalte["art"] == "kategorie":
+        return pd.Categorical.from_codes(werte, categories=spalte["kategorien"], validate=False)
+    if spalte["art"] == "nullable":
+        maske = _mappen(f"{datei}.maske.npy")
+        if werte.dtype.kind == "f":
+            return pd.arrays.FloatingArray(werte, maske)
+        return pd.arrays.IntegerArray(werte, maske)
+    return werte
+
+
+def lade(name, version):
+    """``name`` aus dem aktuellen Stand (Spalten per mmap), falls dort mit ``version`` exportiert; sonst ``None``."""
+    if not VERZEICHNIS or version is None:
+        return None
+    pfad, meta = _aktueller_stand(VERZEICHNIS)
+    tabelle = (meta or {}).get("tabellen", {}).get(name)
+    if tabelle is None or tabelle["version"] != version:
+        return None
+    pfad = os.path.join(pfad, name)
+    spalten = {s["name"]: _lies_spalte(pfad, s) for s in tabelle["spalten"]}
+    return pd.DataFrame(spalten, columns=[s["name"] for s in tabelle["spalten"]], copy=False)
@@ -0,0 +1,77 @@
+# segment_aehnlichkeit.py
+
+"""Vorberechneter Ähnlichkeitsdienst für Segmente (Größe & Nutzungsvielfalt).
+
+Skalierung, KMeans-Typisierung und ein KD-Baum über die skalierten Merkmale
+werden einmal pro Datenstand berechnet und gecacht. Eine Auswahl im UI ist
+danach nur noch eine k-Nächste-Nachbarn-Abfrage im Baum plus ein einziger
+Lookup der Einrichtungs- und Adressdaten für alle Treffer zusammen.
+"""
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans
+from sklearn.neighbors import KDTree
+from sklearn.preprocessing import StandardScaler
+
+import datenzugriff
+import instrumentierung
+
+MERKMALE = ["laenge", "breite", "flaeche", "sportarten_vielfalt", "bereichs_vielfalt"]
+ANZAHL_TYPEN = 5
+
+UNBEKANNT = {"einrichtung_name": "Unbekannt", "typ": "N/A", "strasse": "-", "plz": "-", "ort": "-"}
+
+
+class SegmentAehnlichkeit:
+    """Skalierte Merkmalsmatrix, Segment-Typen und KD-Baum für Top-k-Abfragen."""
+
+    def __init__(self, kennzahlen):
+        self.frame = kennzahlen.reset_index(drop=True)
+        merkmale = self.frame[MERKMALE].to_numpy(dtype=float)
+
+        with instrumentierung.stufe("modell", "segment_aehnlichkeit", zeilen=len(self.frame)):
+            self.scaler = StandardScaler().fit(merkmale)
+            self.X = self.scaler.transform(merkmale)
+            kmeans = KMeans(n_clusters=min(ANZAHL_TYPEN, len(self.frame)), random_state=42, n_init=10)
+            self.frame["segment_typ"] = kmeans.fit_predict(self.X)
+            self.baum = KDTree(self.X)
+        self._position = pd.Series(np.arange(len(self.frame)), index=self.frame["segment_id"].to_numpy())
+
+    def segment(self, segment_id):
+        return self.frame.iloc[self._position[segment_id]]
+
+    def aehnliche(self, segment_id, k=5):
+        """Die ``k`` ähnlichsten anderen Segmente, aufsteigend nach Distanz."""
+        pos = self._position[segment_id]
+        anzahl = min(k + 1, len(self.frame))
+        distanzen, treffer = self.baum.query(self.X[pos:pos + 1], k=anzahl)
+        ergebnis = self.frame.iloc[treffer[0]].assign(distanz=distanzen[0])
+        return ergebnis[ergebnis["segment_id"] != segment_id].head(k)
+
+
+def modell():
+    return datenzugriff.cache.hole(
+        ("modell", "segment_aehnlichkeit"),
+        lambda: SegmentAehnlichkeit(datenzugriff.segment_kennzahlen()),
+        tabellen=("segmente", "einrichtungen", "belegungsplan"),
+    )
+
+
+def einrichtungsinfos(segment_ids):
+    """Einrichtung und (erste) Adresse für alle ``segment_ids`` in einem Schritt, Index = Segment-ID."""
+    segmente = datenzugriff.segmente()
+    segmente = segmente[segmente["id"].isin(segment_ids)][["id", "einrichtung_id"]]
+    einrichtungen = datenzugriff.einrichtungen()[["id", "name", "typ"]].rename(
+        columns={"id": "einrichtung_id", "name": "einrichtung_name"}
+    )
+    adressen = datenzugriff.adressen().drop_duplicates("einrichtung_id")[["einrichtung_id", "strasse", "plz", "ort"]]
+
+    infos = (
+        segmente.merge(einrichtungen, on="einrichtung_id")
+        .merge(adressen, on="einrichtung_id")
+        .set_index("id")[list(UNBEKANNT)]
+        .astype(object)
+    )
+    infos = infos.reindex(pd.Index(segment_ids, name="segment_id"))
+    return infos.fillna(UNBEKANNT)
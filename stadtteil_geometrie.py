@@ -0,0 +1,93 @@
+# stadtteil_geometrie.py
+
+"""Vereinfachte, einmal aufbereitete Stadtteil-Geometrien für Choroplethen.
+
+``stadtteile2.geom_wkt`` wird pro Datenstand nur einmal geparst, passend
+zur Zoomstufe vereinfacht und als GeoJSON-FeatureCollection gecacht. Pro
+Request werden nur noch die Kennzahlen je Stadtteil in die Properties
+eingefügt; die Geometrien selbst werden geteilt, nicht kopiert.
+"""
+
+import folium
+import numpy as np
+import pandas as pd
+import shapely
+from shapely import wkt
+from shapely.geometry import mapping
+
+import datenzugriff
+
+STANDARD_ZOOM = 12
+KOORDINATEN_RASTER = 1e-5  # ~1 m, reicht für die Darstellung
+
+
+def toleranz_fuer_zoom(zoom):
+    """Vereinfachungstoleranz in Grad: ein halbes Pixel bei der gegebenen Zoomstufe."""
+    return 360 / (256 * 2 ** zoom) / 2
+
+
+def _baue_features(toleranz):
+    df = datenzugriff.stadtteile()
+    features = []
+    for stadtteil_id, name, geom_wkt in zip(df["id"].tolist(), df["name"].tolist(), df["geom_wkt"].tolist()):
+        if not geom_wkt:
+            continue
+        geometrie = wkt.loads(geom_wkt).simplify(toleranz, preserve_topology=True)
+        geometrie = shapely.set_precision(geometrie, KOORDINATEN_RASTER)
+        features.append({
+            "type": "Feature",
+            "id": stadtteil_id,
+            "geometry": mapping(geometrie),
+            "properties": {"stadtteil_id": stadtteil_id, "name": name},
+        })
+    return features
+
+
+def features(zoom=STANDARD_ZOOM):
+    """Gecachte, vereinfachte Features aller Stadtteile (nicht verändern)."""
+    toleranz = toleranz_fuer_zoom(zoom)
+    return datenzugriff.cache.hole(
+        ("geometrie", "stadtteile", toleranz),
+        lambda: _baue_features(toleranz),
+        tabellen=("stadtteile2",),
+    )
+
+
+def _json_wert(wert):
+    if isinstance(wert, np.integer):
+        return int(wert)
+    if isinstance(wert, (np.floating, float)):
+        return None if np.isnan(wert) else float(wert)
+    if wert is pd.NA or wert is pd.NaT:
+        return None
+    return wert
+
+
+def feature_collection(kennzahlen, zoom=STANDARD_ZOOM):
+    """FeatureCollection mit den Spalten von ``kennzahlen`` (Index = Stadtteil-ID) als Properties."""
+    spalten = list(kennzahlen.columns)
+    werte = {
+        stadtteil_id: {s: _json_wert(w) for s, w in zip(spalten, zeile)}
+        for stadtteil_id, zeile in zip(kennzahlen.index.tolist(), kennzahlen.itertuples(index=False))
+    }
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {**f, "properties": {**f["properties"], **werte.get(f["id"], {})}}
+            for f in features(zoom)
+        ],
+    }
+
+
+def choropleth_layer(kennzahlen, farbspalte="farbe", tooltipspalte="tooltip", zoom=STANDARD_ZOOM):
+    """Eine einzige GeoJSON-Ebene, deren Stil aus den Properties der Features kommt."""
+    return folium.GeoJson(
+        feature_collection(kennzahlen, zoom),
+        style_function=lambda feature: {
+            "fillColor": feature["properties"].get(farbspalte) or "#cccccc",
+            "color": "black",
+            "weight": 1,
+            "fillOpacity": 0.6,
+        },
+        tooltip=folium.GeoJsonTooltip(fields=[tooltipspalte], labels=False),
+    )
@@ -0,0 +1,141 @@
+# taetigkeitssuche.py
+
+"""Suchindex über die Tätigkeiten im Belegungsplan.
+
+Statt ``taetigkeit LIKE '%x%'`` über alle Belegungen (kein Index nutzbar)
+wird einmal pro Datenstand ein Index im Prozess aufgebaut:
+
+* Jede Tätigkeit wird normalisiert (Kleinschreibung, Umlaute und ß
+  ausgeschrieben, Akzente entfernt, Satz- und Leerzeichen ignoriert) –
+  "Fußball", "FUSSBALL" und "Fuss-Ball" landen auf demselben Schlüssel.
+* Ein Trigramm-Index (Trigramm → Tätigkeiten) liefert für Suchtexte ab drei
+  Zeichen die Kandidaten, eine sortierte Namensliste die Präfixtreffer.
+* Pro Tätigkeit gibt es eine Posting-Liste: die Zeilen der Tätigkeit im
+  gecachten ``datenzugriff.belegungen()``-Frame.
+
+Typeahead und "Hallen für Badminton" sind damit Set-Schnitte und ein
+``take`` auf die Posting-Liste statt eines Tabellenscans.
+"""
+
+import bisect
+import re
+import unicodedata
+
+import numpy as np
+
+import datenzugriff
+
+_ERSETZUNGEN = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"})
+_NICHT_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def normalisiere(text):
+    """Suchschlüssel: klein, Umlaute ausgeschrieben, ohne Akzente, Leer- und Satzzeichen."""
+    text = str(text).casefold().translate(_ERSETZUNGEN)
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+    return _NICHT_ALNUM.sub("", text)
+
+
+def trigramme(schluessel):
+    return {schluessel[i:i + 3] for i in range(len(schluessel) - 2)}
+
+
+class TaetigkeitsIndex:
+    """Normalisierte Namen, Trigramm-Index und Posting-Listen über ``belegungen``."""
+
+    def __init__(self, belegungen):
+        self.belegungen = belegungen
+        taetigkeit = belegungen["taetigkeit"]
+        namen = list(taetigkeit.cat.categories)
+        codes = taetigkeit.cat.codes.to_numpy()
+
+        # 📮 Posting-Listen: Zeilen pro Kategorie-Code, einmal sortiert statt pro Abfrage gesucht
+        reihenfolge = np.argsort(codes, kind="stable")
+        grenzen = np.searchsorted(codes[reihenfolge], np.arange(len(namen) + 1))
+        self._postings = {}
+        self.anzahl = {}
+        for code, name in enumerate(namen):
+            zeilen = reihenfolge[grenzen[code]:grenzen[code + 1]]
+            if name.strip() and len(zeilen):
+                self._postings[name] = zeilen
+                self.anzahl[name] = len(zeilen)
+
+        self.namen = sorted(self._postings, key=str.casefold)
+        self._schluessel = {name: normalisiere(name) for name in self.namen}
+        self._sortiert = sorted((s, name) for name, s in self._schluessel.items())
+        self._trigramme = {}
+        for name, schluessel in self._schluessel.items():
+            for tri in trigramme(schluessel):
+                self._trigramme.setdefault(tri, set()).add(name)
+
+    def suche(self, text, limit=None):
+        """Tätigkeiten, deren Schlüssel den normalisierten ``text`` enthält.
+
+        Reihenfolge: exakte Treffer, dann Präfixtreffer, dann übrige – jeweils
+        nach Anzahl Belegungen absteigend.
+        """
+        anfrage = normalisiere(text)
+        if not anfrage:
+            treffer = list(self.namen)
+        elif len(anfrage) < 3:
+            # Zu kurz für Trigramme: Präfixe per Binärsuche, Teilstrings über die (wenigen) Namen
+            von = bisect.bisect_left(self._sortiert, (anfrage,))
+            praefix = []
+            for schluessel, name in self._sortiert[von:]:
+                if not schluessel.startswith(anfrage):
+                    break
+                praefix.append(name)
+            treffer = praefix + [n for n, s in self._schluessel.items() if anfrage in s and n not in praefix]
+        else:
+            kandidaten = None
+            for tri in trigramme(anfrage):
+                namen = self._trigramme.get(tri, set())
+                kandidaten = namen if kandidaten is None else kandidaten & namen
+                if not kandidaten:
+                    return []
+            treffer = [n for n in kandidaten if anfrage in self._schluessel[n]]
+
+        def rang(name):
+            schluessel = self._schluessel[name]
+            return (schluessel != anfrage, not schluessel.startswith(anfrage), -self.anzahl[name], name.casefold())
+
+        treffer = sorted(treffer, key=rang) if anfrage else treffer
+        return treffer[:limit] if limit else treffer
+
+    def zeilen(self, namen):
+        """Vereinigte Posting-Listen der Tätigkeiten ``namen`` (Zeilenpositionen in ``belegungen``)."""
+        listen = [self._postings[n] for n in namen if n in self._postings]
+        if not listen:
+            return np.empty(0, dtype=np.intp)
+        return np.sort(np.concatenate(listen))
+
+    def belegungen_zu(self, text, tag=None, von=None, bis=None):
+        """Belegungen aller zu ``text`` passenden Tätigkeiten, optional nach Wochentag und Startzeit gefiltert.
+
+        ``von``/``bis`` sind Minuten seit Mitternacht; gefiltert wird wie bisher auf ``von <= start <= bis``.
+        """
+        df = self.belegungen.iloc[self.zeilen(self.suche(text))]
+        if tag is not None:
+            df = df[df["tag"] == tag]
+        if von is not None:
+            df = df[df["start_min"] >= von]
+        if bis is not None:
+            df = df[df["start_min"] <= bis]
+        return df
+
+
+def index():
+    return datenzugriff.cache.hole(
+        ("index", "taetigkeiten"),
+        lambda: TaetigkeitsIndex(datenzugriff.belegungen()),
+        tabellen=("belegungsplan",),
+    )
+
+
+def taetigkeiten():
+    """Alle vorkommenden Tätigkeiten, alphabetisch sortiert."""
+    return index().namen
+
+
+def suche(text, limit=None):
+    return index().suche(text, limit)